@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Action plugin to run cpm_* modules on the controller without AnsiballZ.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import importlib
+
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+
+display = Display()
+
+LOCAL_TRANSPORTS = ('local', 'ansible.builtin.local')
+
+
+class ActionModule(ActionBase):
+    """Run the cpm_* REST modules inside the worker process.
+
+    The modules are pure HTTP clients that run on the controller anyway, so
+    when the task uses a local (or wti.remote.wti httpapi) connection the
+    module's run_module() is called directly instead of zipping the module,
+    writing it to disk and forking a new Python interpreter for it.
+    Anything else (async tasks, task environment, other connections) goes
+    through the regular module execution path.
+    """
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        socket_path = getattr(self._connection, 'socket_path', None)
+        in_process = (self._connection.transport in LOCAL_TRANSPORTS or socket_path) and \
+            not self._task.async_val and not any(self._task.environment or [])
+
+        if not in_process:
+            result.update(self._execute_module(task_vars=task_vars))
+            return result
+
+        # resolved_action names this action plugin, the module is looked up separately
+        context = self._shared_loader_obj.module_loader.find_plugin_with_context(self._task.action,
+                                                                                 collection_list=self._task.collections)
+        namespace, collection, name = context.resolved_fqcn.split('.')
+        module = importlib.import_module('ansible_collections.%s.%s.plugins.modules.%s' % (namespace, collection, name))
+
+        host = task_vars.get('inventory_hostname') if task_vars else None
+        result.update(run_in_process(module.run_module, dict(self._task.args), check_mode=bool(self._task.check_mode),
+                                     verbosity=display.verbosity, socket_path=socket_path,
+                                     log=lambda msg: display.vvvv(msg, host=host)))
+        return result
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# HttpApi plugin for WTI OOB and PDU devices.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = """
+---
+author: "Western Telematic Inc. (@wtinetworkgear)"
+name: wti
+short_description: HttpApi Plugin for WTI OOB and PDU devices
+description:
+    - "This HttpApi plugin keeps one authenticated, keep-alive session to a WTI OOB or PDU device open for the whole play."
+    - "The cpm_* modules send their requests through it when the task uses C(connection: ansible.netcommon.httpapi)."
+version_added: "1.1.0"
+notes:
+    - Set C(ansible_network_os=wti.remote.wti) and C(ansible_connection=ansible.netcommon.httpapi) for the WTI hosts.
+    - The device address, credentials, C(ansible_httpapi_use_ssl), C(ansible_httpapi_validate_certs) and C(ansible_httpapi_use_proxy)
+      are taken from the connection, so C(cpm_url), C(cpm_username) and C(cpm_password) can be left out of the tasks.
+"""
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible_collections.ansible.netcommon.plugins.plugin_utils.httpapi_base import HttpApiBase
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import WtiClient, WtiSession, connection_host
+
+
+class HttpApi(HttpApiBase):
+    def __init__(self, connection):
+        super(HttpApi, self).__init__(connection)
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            host = connection_host(self.connection)
+            session = WtiSession(validate_certs=self.connection.get_option('validate_certs'),
+                                 use_proxy=self.connection.get_option('use_proxy'),
+                                 timeout=self.connection.get_option('persistent_command_timeout'))
+            self._client = WtiClient(host, self.connection.get_option('remote_user'), self.connection.get_option('password'),
+                                     use_https=self.connection.get_option('use_ssl'), session=session)
+        return self._client
+
+    def send_request(self, data, path, method='GET', content_type='application/json'):
+        if data is not None:
+            data = to_bytes(data, errors='surrogate_or_strict')
+
+        try:
+            response = self._get_client().request(path, method=method, data=data, content_type=content_type)
+        except HTTPError as e:
+            return e.code, to_text(e.read(), errors='surrogate_or_strict')
+
+        return response.status, to_text(response.read(), errors='surrogate_or_strict')
+
+    def logout(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Inventory plugin that discovers WTI OOB and PDU devices.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = """
+---
+author: "Western Telematic Inc. (@wtinetworkgear)"
+name: cpm
+short_description: Discover WTI OOB and PDU devices
+description:
+    - "Probe a list of addresses and CIDR ranges for WTI OOB and PDU devices, concurrently."
+    - "Every device that answers C(/api/v2/status/status) is added to the C(wti) group and grouped by family, firmware version,
+       power unit, ATS, site id and installed modem."
+    - "Uses a YAML configuration file that ends with C(wti.yml), C(wti.yaml), C(cpm.yml) or C(cpm.yaml)."
+version_added: "1.1.0"
+extends_documentation_fragment:
+    - constructed
+    - inventory_cache
+options:
+    plugin:
+        description:
+            - The name of this plugin, it should always be set to C(wti.remote.cpm) for this plugin to recognize it as its own.
+        type: str
+        required: true
+        choices: ["wti.remote.cpm"]
+    hosts:
+        description:
+            - Addresses, names and CIDR ranges to probe, for example C(192.168.0.158), C(pdu1.example.com:8443) or C(10.10.0.0/24).
+        type: list
+        elements: str
+        required: true
+    cpm_username:
+        description:
+            - This is the Username of the WTI devices.
+        type: str
+        env:
+            - name: WTI_CPM_USERNAME
+    cpm_password:
+        description:
+            - This is the Password of the WTI devices.
+        type: str
+        required: true
+        env:
+            - name: WTI_CPM_PASSWORD
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        default: false
+    timeout:
+        description:
+            - Seconds to wait for an address to connect or answer, addresses without a WTI device cost this much.
+        type: int
+        default: 3
+    max_workers:
+        description:
+            - The maximum number of addresses probed at the same time.
+        type: int
+        default: 50
+    endpoints:
+        description:
+            - The REST endpoints read from every device, below C(/api/v2/). C(status/status) is always read.
+            - C(status/firmware) provides the family and firmware groups, C(status/current) the power unit and ATS groups.
+        type: list
+        elements: str
+        default: ["status/status", "status/firmware"]
+"""
+
+EXAMPLES = """
+# wti.yml
+plugin: wti.remote.cpm
+hosts:
+  - 192.168.0.158
+  - 10.10.0.0/28
+cpm_username: super
+cpm_password: super
+validate_certs: false
+endpoints:
+  - status/status
+  - status/firmware
+  - status/current
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: /tmp/wti_inventory
+cache_timeout: 3600
+keyed_groups:
+  - key: wti_status.product
+    prefix: product
+"""
+
+import ipaddress
+
+from ansible.errors import AnsibleParserError
+from ansible.module_utils._text import to_text
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import WtiClient
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_map, query_device
+
+STATUS_ENDPOINT = "status/status"
+
+FAMILIES = {"0": "power", "1": "console"}
+
+
+def expand_hosts(hosts):
+    """Addresses for every entry of hosts, CIDR ranges expanded to their host addresses."""
+    addresses = []
+    for entry in hosts:
+        try:
+            network = ipaddress.ip_network(to_text(entry), strict=False)
+        except ValueError:
+            addresses.append(entry)
+            continue
+        if network.num_addresses == 1:
+            addresses.append(str(network.network_address))
+        else:
+            addresses.extend(str(address) for address in network.hosts())
+    return list(dict.fromkeys(addresses))
+
+
+def device_url(address):
+    """cpm_url for an address, IPv6 addresses need brackets in a URL."""
+    if address.count(':') > 1 and not address.startswith('['):
+        return '[%s]' % address
+    return address
+
+
+def device_host(address):
+    """ansible_host for an address, without the port."""
+    if address.startswith('['):
+        return address[1:address.index(']')]
+    if address.count(':') == 1:
+        return address.split(':')[0]
+    return address
+
+
+def find_value(data, key):
+    """First value stored under key in any of the endpoint replies, one level deep."""
+    for reply in data.values():
+        if not isinstance(reply, dict):
+            continue
+        if key in reply:
+            return reply[key]
+        for value in reply.values():
+            if isinstance(value, dict) and key in value:
+                return value[key]
+    return None
+
+
+def is_set(value):
+    return to_text(value).strip().lower() in ("1", "yes", "true", "on") or to_text(value).lower().startswith("yes")
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'wti.remote.cpm'
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(('wti.yml', 'wti.yaml', 'cpm.yml', 'cpm.yaml'))
+
+    def _probe(self, address):
+        client = WtiClient(device_url(address), self.get_option('cpm_username'), self.get_option('cpm_password'),
+                           use_https=self.get_option('use_https'), validate_certs=self.get_option('validate_certs'),
+                           use_proxy=self.get_option('use_proxy'), timeout=self.get_option('timeout'))
+        endpoints = [STATUS_ENDPOINT] + [e for e in self.get_option('endpoints') if e != STATUS_ENDPOINT]
+        data, errors = query_device(client, ["/api/v2/%s" % endpoint for endpoint in endpoints])
+        if "/api/v2/%s" % STATUS_ENDPOINT not in data:
+            self.display.vvv('wti.remote.cpm: skipping %s, %s' % (address, errors["/api/v2/%s" % STATUS_ENDPOINT]))
+            return None
+        for error in errors.values():
+            self.display.warning('wti.remote.cpm: %s' % error)
+        return dict((path[len('/api/v2/'):], value) for path, value in data.items())
+
+    def discover(self):
+        """Probe every address and return the endpoint replies of the WTI devices, keyed by address."""
+        addresses = expand_hosts(self.get_option('hosts'))
+        results = fleet_map(self._probe, addresses, self.get_option('max_workers'))
+        return dict((address, data) for address, data in zip(addresses, results) if data is not None)
+
+    def _device_groups(self, data):
+        groups = []
+        family = find_value(data, 'family')
+        if family is not None:
+            groups.append('wti_family_%s' % FAMILIES.get(to_text(family), to_text(family)))
+        firmware = find_value(data, 'firmware')
+        if firmware:
+            groups.append('wti_firmware_%s' % to_text(firmware))
+        if is_set(find_value(data, 'powerunit')):
+            groups.append('wti_powerunit')
+        if is_set(find_value(data, 'ats')):
+            groups.append('wti_ats')
+        siteid = find_value(data, 'siteid')
+        if siteid and to_text(siteid).strip():
+            groups.append('wti_site_%s' % to_text(siteid).strip())
+        if is_set(find_value(data, 'modeminstalled')):
+            groups.append('wti_modem')
+        return [self._sanitize_group_name(group) for group in groups]
+
+    def populate(self, devices):
+        strict = self.get_option('strict')
+        self.inventory.add_group('wti')
+        for address, data in devices.items():
+            self.inventory.add_host(address, group='wti')
+            self.inventory.set_variable(address, 'ansible_host', device_host(address))
+            self.inventory.set_variable(address, 'cpm_url', device_url(address))
+            for endpoint, reply in data.items():
+                self.inventory.set_variable(address, 'wti_%s' % endpoint.split('/')[-1], reply)
+
+            for group in self._device_groups(data):
+                self.inventory.add_group(group)
+                self.inventory.add_child(group, address)
+
+            hostvars = self.inventory.get_host(address).get_vars()
+            self._set_composite_vars(self.get_option('compose'), hostvars, address, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), hostvars, address, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, address, strict=strict)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path)
+        self._read_config_data(path)
+
+        if self.get_option('max_workers') < 1:
+            raise AnsibleParserError('max_workers must be at least 1')
+
+        cache_key = self.get_cache_key(path)
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        devices = None
+        if attempt_to_read_cache:
+            try:
+                devices = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+
+        if devices is None:
+            devices = self.discover()
+
+        if cache_needs_update:
+            self._cache[cache_key] = devices
+
+        self.populate(devices)
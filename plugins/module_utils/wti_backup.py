@@ -0,0 +1,640 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Configuration backup handling shared by the WTI backup and restore modules.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import datetime
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from contextlib import contextmanager
+from xml.etree import ElementTree
+from xml.parsers import expat
+
+from ansible.module_utils._text import to_bytes, to_native, to_text
+
+try:
+    import lzma
+    HAS_LZMA = True
+except ImportError:
+    HAS_LZMA = False
+
+BACKUP_PATH = "/cgi-bin/gethtml?formWTIDownloadConfigXML.html"
+RESTORE_PATH = "/cgi-bin/getfile"
+
+WRITE_CHUNK = 1024 * 1024
+RESTORE_CHUNK = 64 * 1024
+
+COMPRESSIONS = {'none': '', 'gzip': '.gz', 'xz': '.xz'}
+
+MARKER_PREFIX = '.wti_backup-'
+
+CATALOG_FILE = '.wti_backup_catalog.jsonl'
+
+STORE_LOCK = '.wti_backup_store.lock'
+
+# the fields of a backup entry kept in the catalog
+CATALOG_KEYS = ('file', 'url', 'unit_type', 'saved', 'last_seen', 'size', 'stored_size', 'sha256', 'compress', 'backend')
+
+
+def unit_type(data):
+    """The unit_type_info of a backup, "wti" when there is none, as get_unit_type() in cpm_config_backup."""
+    match = re.search(r'unit_type_info="([^"]{0,16})">', to_text(data, errors='surrogate_or_strict'))
+    return match.group(1) if match else "wti"
+
+
+def _escape(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _canonical(element, ignore, out):
+    out.append('<%s' % element.tag)
+    for name in sorted(element.attrib):
+        if name not in ignore:
+            out.append(' %s="%s"' % (name, _escape(element.attrib[name])))
+    out.append('>')
+    if element.text and element.text.strip():
+        out.append(_escape(element.text))
+    for child in element:
+        if child.tag not in ignore:
+            _canonical(child, ignore, out)
+        if child.tail and child.tail.strip():
+            out.append(_escape(child.tail))
+    out.append('</%s>' % element.tag)
+
+
+def canonical_xml(data, ignore=()):
+    """Canonical form of a backup, equal for backups that only differ in layout.
+
+    Attributes are sorted, whitespace between elements, comments and the
+    XML declaration are dropped, and attributes and elements named in
+    ignore are left out. A backup that is no XML is only stripped of
+    carriage returns and trailing whitespace. data is the backup, or a
+    seekable file object the backup is parsed from while it is read.
+    """
+    try:
+        if hasattr(data, 'read'):
+            root = ElementTree.parse(data).getroot()
+        else:
+            root = ElementTree.fromstring(to_bytes(data))
+    except ElementTree.ParseError:
+        if hasattr(data, 'read'):
+            data.seek(0)
+            data = data.read()
+        return to_bytes(data).replace(b'\r\n', b'\n').rstrip()
+    out = []
+    _canonical(root, frozenset(ignore), out)
+    return to_bytes(''.join(out), errors='surrogate_or_strict')
+
+
+def canonical_sha256(data, ignore=()):
+    return hashlib.sha256(canonical_xml(data, ignore)).hexdigest()
+
+
+def backup_name(unit, url, stamp, compress='none', path=None):
+    """File name of a backup, <unit type>-<device URL>-<ISO time>.xml as cpm_config_backup names them.
+
+    When path is given and already holds a backup of that name, for a
+    second backup within the same second, a -<n> suffix is added to the time.
+    """
+    name = '%s-%s-%s.xml%s' % (unit, _safe(url), stamp, COMPRESSIONS[compress])
+    count = 0
+    while path is not None and os.path.exists(os.path.join(path, name)):
+        count += 1
+        name = '%s-%s-%s-%d.xml%s' % (unit, _safe(url), stamp, count, COMPRESSIONS[compress])
+    return name
+
+
+def _safe(url):
+    return to_native(url).replace('/', '-')
+
+
+def open_compressed(handle, compress, mode='rb'):
+    """File object that compresses to or decompresses from handle, handle itself for none."""
+    if compress == 'gzip':
+        return gzip.GzipFile(fileobj=handle, mode=mode, filename='', mtime=0)
+    if compress == 'xz':
+        if not HAS_LZMA:
+            raise IOError('xz compression requires the lzma module')
+        return lzma.LZMAFile(handle, mode)
+    return handle
+
+
+def backup_compression(name):
+    """The compression of a backup file by its name, .gz gzip, .xz xz, anything else none."""
+    for compress, suffix in COMPRESSIONS.items():
+        if suffix and name.endswith(suffix):
+            return compress
+    return 'none'
+
+
+def write_backup(path, name, data, compress='none'):
+    """Write data to path/name compressed on the fly, atomically. Returns the size on disk."""
+    target = os.path.join(path, name)
+    fd, tmp = tempfile.mkstemp(dir=path, prefix='.' + name, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            writer = open_compressed(raw, compress, 'wb')
+            for offset in range(0, len(data), WRITE_CHUNK):
+                writer.write(data[offset:offset + WRITE_CHUNK])
+            if writer is not raw:
+                writer.close()
+        os.rename(tmp, target)
+    except Exception:
+        os.unlink(tmp)
+        raise
+    return os.path.getsize(target)
+
+
+class BackupFiles(object):
+    """Backups as one XML file each, compressed with compress, named as cpm_config_backup names them."""
+
+    backend = 'files'
+
+    def __init__(self, path, compress='none'):
+        self.path = os.path.expanduser(path)
+        self.compress = compress
+
+    def name(self, unit, url, stamp):
+        return backup_name(unit, url, stamp, self.compress, self.path)
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.path, name))
+
+    def write(self, name, data, entry):
+        return write_backup(self.path, name, data, self.compress)
+
+    def remove(self, name):
+        os.unlink(os.path.join(self.path, name))
+
+
+def split_sections(data):
+    """Split an XML backup before every child of its root element.
+
+    The first section holds everything up to the first child, the last
+    one the closing root tag, so joining the sections gives data back
+    byte for byte. Data that is no XML is a single section.
+    """
+    starts = []
+    depth = [0]
+    parser = expat.ParserCreate()
+
+    def start(name, attrs):
+        if depth[0] == 1:
+            starts.append(parser.CurrentByteIndex)
+        depth[0] += 1
+
+    def end(name):
+        depth[0] -= 1
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.Parse(data, True)
+    except expat.ExpatError:
+        return [data]
+    bounds = [0] + starts + [len(data)]
+    return [data[begin:end] for begin, end in zip(bounds, bounds[1:]) if end > begin]
+
+
+class BackupBody(object):
+    """The XML of a backup as a streamed request body.
+
+    A file ending in .gz or .xz is decompressed while it is sent and a
+    backup in a BackupStore is rebuilt from its sections, so only one
+    chunk is in memory and no uncompressed copy is written. The length is
+    known up front for the Content-Length header, for a compressed file
+    from one extra decompressing pass over it.
+    """
+
+    def __init__(self, filename, store=None, chunk_size=RESTORE_CHUNK):
+        self.filename = filename
+        self.store = store
+        self.chunk_size = chunk_size
+        self._handles = []
+        if store is not None:
+            self.length = store.manifest(filename)['size']
+        elif backup_compression(filename) == 'none':
+            self.length = os.path.getsize(filename)
+        else:
+            self._open()
+            self.length = sum(len(chunk) for chunk in iter(lambda: self._reader.read(chunk_size), b''))
+        self._open()
+
+    def _open(self):
+        self.close()
+        if self.store is not None:
+            self._reader = self.store.open(self.filename)
+            self._handles = [self._reader]
+        else:
+            raw = open(self.filename, 'rb')
+            self._reader = open_compressed(raw, backup_compression(self.filename))
+            self._handles = [self._reader, raw] if self._reader is not raw else [raw]
+        self._pos = 0
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=0):
+        if whence != 0:
+            raise IOError('BackupBody only seeks from the start')
+        self._open()
+        while self._pos < pos:
+            data = self._reader.read(min(pos - self._pos, self.chunk_size))
+            if not data:
+                break
+            self._pos += len(data)
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length - self._pos
+        size = max(size, self.chunk_size) if size else 0
+        data = self._reader.read(size)
+        # the readers only return less than asked for at the end, which has to be where it was when the length was taken
+        if len(data) != min(size, self.length - self._pos):
+            raise IOError('%s changed while it was sent' % self.filename)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+
+
+class BackupStore(object):
+    """Content addressed store of backups, shared by all devices.
+
+    Every backup is split into the sections of split_sections(), each
+    section is stored once under objects/<sha256> however many backups
+    hold it, and every backup gets a manifest under manifests/<device>/
+    listing its sections. Sections such as users or syslog settings that
+    are the same on many devices are therefore only kept once. Objects
+    are verified against their digest when read.
+    """
+
+    backend = 'store'
+
+    def __init__(self, path, compress='gzip'):
+        self.path = os.path.expanduser(path)
+        self.compress = compress
+
+    def name(self, unit, url, stamp):
+        name = 'manifests/%s/%s.json' % (_safe(url), stamp)
+        count = 0
+        while self.exists(name):
+            count += 1
+            name = 'manifests/%s/%s-%d.json' % (_safe(url), stamp, count)
+        return name
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.path, name))
+
+    def _object(self, digest, compress):
+        return os.path.join(self.path, 'objects', digest[:2], digest + COMPRESSIONS[compress])
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        # writers share the lock, collect() takes it alone so it never removes a section a new manifest is about to use
+        fd = os.open(os.path.join(self.path, STORE_LOCK), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def write(self, name, data, entry):
+        with self._locked():
+            return self._write(name, data, entry)
+
+    def _write(self, name, data, entry):
+        """Store the sections of data that are not stored yet and the manifest name. Returns the bytes written."""
+        written = 0
+        sections = []
+        for section in split_sections(data):
+            digest = hashlib.sha256(section).hexdigest()
+            sections.append(digest)
+            target = self._object(digest, self.compress)
+            if not os.path.exists(target):
+                if not os.path.isdir(os.path.dirname(target)):
+                    _makedirs(os.path.dirname(target))
+                # concurrent writers of the same section write the same bytes, the last rename wins
+                written += write_backup(os.path.dirname(target), os.path.basename(target), section, self.compress)
+
+        manifest = dict(entry, sections=sections, compress=self.compress, xml_sha256=hashlib.sha256(data).hexdigest())
+        manifest.pop('status', None)
+        manifest.pop('last_seen', None)
+        target = os.path.join(self.path, name)
+        if not os.path.isdir(os.path.dirname(target)):
+            _makedirs(os.path.dirname(target))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.', suffix='.part')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, sort_keys=True)
+        os.rename(tmp, target)
+        return written + os.path.getsize(target)
+
+    def manifest(self, name):
+        with open(os.path.join(self.path, name), 'r') as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict) or not isinstance(manifest.get('sections'), list):
+            raise ValueError('%s is no backup manifest' % name)
+        return manifest
+
+    def section(self, digest, compress):
+        with open(self._object(digest, compress), 'rb') as raw:
+            reader = open_compressed(raw, compress)
+            data = reader.read()
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise IOError('section %s of the backup store %s is damaged' % (digest, self.path))
+        return data
+
+    def remove(self, name):
+        os.unlink(os.path.join(self.path, name))
+
+    def collect(self):
+        """Remove the sections no manifest refers to anymore. Returns the number of sections removed."""
+        removed = 0
+        with self._locked(exclusive=True):
+            used = set()
+            for folder, dummy, names in os.walk(os.path.join(self.path, 'manifests')):
+                for name in names:
+                    if name.endswith('.json'):
+                        manifest = self.manifest(os.path.relpath(os.path.join(folder, name), self.path))
+                        used.update(digest + COMPRESSIONS[manifest.get('compress', 'none')] for digest in manifest['sections'])
+            for folder, dummy, names in os.walk(os.path.join(self.path, 'objects')):
+                for name in names:
+                    if name not in used:
+                        os.unlink(os.path.join(folder, name))
+                        removed += 1
+        return removed
+
+    def open(self, name):
+        """Readable file object of the XML of backup name, rebuilt from its sections as it is read."""
+        return SnapshotReader(self, self.manifest(name))
+
+    def read(self, name):
+        return self.open(name).read()
+
+
+class SnapshotReader(object):
+    """File object over the sections of a store manifest, checked against the digest of the whole backup."""
+
+    def __init__(self, store, manifest):
+        self.store = store
+        self.manifest = manifest
+        self.size = manifest.get('size')
+        self._sections = iter(manifest['sections'])
+        self._buffer = b''
+        self._digest = hashlib.sha256()
+        self._done = False
+
+    def _next(self):
+        if self._done:
+            return False
+        try:
+            digest = next(self._sections)
+        except StopIteration:
+            self._done = True
+            if self._digest.hexdigest() != self.manifest.get('xml_sha256'):
+                raise IOError('the backup rebuilt from %s does not match its digest' % self.store.path)
+            return False
+        data = self.store.section(digest, self.manifest.get('compress', 'none'))
+        self._digest.update(data)
+        self._buffer += data
+        return True
+
+    def read(self, size=-1):
+        while (size is None or size < 0 or len(self._buffer) < size) and self._next():
+            pass
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._done = True
+        self._buffer = b''
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
+class BackupMarker(object):
+    """The last backup written for a device, kept in a hidden JSON file in the backup directory.
+
+    It records the canonical hash of that backup, so an unchanged
+    configuration only moves last_seen instead of writing another file.
+    Each backend, the files or the store, keeps a marker of its own, as
+    a backup one of them wrote is no backup in the other.
+    """
+
+    def __init__(self, path, url, backend='files'):
+        self.path = os.path.join(path, '%s%s-%s.json' % (MARKER_PREFIX, backend, _safe(url)))
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                marker = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        return marker if isinstance(marker, dict) else None
+
+    def save(self, marker):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=os.path.basename(self.path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(marker, f, sort_keys=True)
+        os.rename(tmp, self.path)
+
+
+def save_backup(store, url, data, ignore=(), save=True, now=None):
+    """Store the backup of one device in store, a BackupFiles or BackupStore, unless it matches the last one.
+
+    Returns the backup entry, its status is "written" for a new backup and
+    "unchanged" when the canonical hash equals the last backup of the
+    device, which is then only marked as seen again. Nothing is written
+    when save is false.
+    """
+    now = time.time() if now is None else now
+    digest = canonical_sha256(data, ignore)
+    marker = BackupMarker(store.path, url, store.backend)
+    last = marker.load()
+
+    if last and last.get('sha256') == digest and store.exists(last.get('file', '')):
+        entry = dict(last, status='unchanged', last_seen=now)
+    else:
+        unit = unit_type(data)
+        stamp = datetime.datetime.fromtimestamp(now).replace(microsecond=0).isoformat()
+        entry = dict(url=to_native(url), unit_type=unit, sha256=digest, size=len(data), file=store.name(unit, url, stamp),
+                     compress=store.compress, saved=now, last_seen=now, status='written')
+        if save:
+            entry['stored_size'] = store.write(entry['file'], data, entry)
+    if save:
+        marker.save(dict((key, value) for key, value in entry.items() if key != 'status'))
+    return entry
+
+
+def parse_time(value):
+    """Seconds since the epoch of a local ISO 8601 date or time such as 2026-10-18 or 2026-10-18T02:00:03."""
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return time.mktime(datetime.datetime.strptime(value, fmt).timetuple())
+        except ValueError:
+            pass
+    raise ValueError('%s is no ISO 8601 date or time' % value)
+
+
+class BackupCatalog(object):
+    """Append-only JSON lines index of the backups in a directory.
+
+    Every backup adds a line with its device, unit type, time, size and
+    hash, so backups are found without listing the directory or reading
+    them. Later lines for the same file update it, a line with deleted
+    set removes it. prune() compacts the file to one line per backup.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.file = os.path.join(self.path, CATALOG_FILE)
+
+    @contextmanager
+    def _locked(self):
+        fd = os.open(self.file + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def record(self, entries, backend='files'):
+        """Append the backup entries returned by save_backup()."""
+        lines = []
+        for entry in entries:
+            line = dict((key, entry[key]) for key in CATALOG_KEYS if key in entry)
+            line.setdefault('backend', backend)
+            lines.append(json.dumps(line, sort_keys=True) + '\n')
+        if not lines:
+            return
+        with self._locked():
+            fd = os.open(self.file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, to_bytes(''.join(lines)))
+            finally:
+                os.close(fd)
+
+    def _read(self):
+        entries = {}
+        try:
+            f = open(self.file, 'r')
+        except (IOError, OSError):
+            return entries
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a line cut short by a full disk or a killed fork
+                    continue
+                if not isinstance(entry, dict) or 'file' not in entry:
+                    continue
+                if entry.get('deleted'):
+                    entries.pop(entry['file'], None)
+                else:
+                    entries.setdefault(entry['file'], {}).update(entry)
+        return entries
+
+    def entries(self):
+        """Every backup in the catalog, oldest first."""
+        return sorted(self._read().values(), key=lambda entry: (entry.get('saved', 0), entry['file']))
+
+    def query(self, urls=None, unit_types=None, since=None, until=None, latest=False):
+        """The backups of the devices in urls and of the unit_types, saved between since and until, oldest first.
+
+        With latest only the newest of those backups per device is returned.
+        """
+        found = [entry for entry in self.entries()
+                 if (not urls or entry.get('url') in urls) and (not unit_types or entry.get('unit_type') in unit_types)
+                 and (since is None or entry.get('saved', 0) >= since) and (until is None or entry.get('saved', 0) <= until)]
+        if latest:
+            newest = {}
+            for entry in found:
+                newest[entry.get('url')] = entry
+            found = sorted(newest.values(), key=lambda entry: (entry.get('saved', 0), entry['file']))
+        return found
+
+    def prune(self, remove, save=True):
+        """Delete the backups in remove, the files and their catalog entries, and compact the catalog."""
+        if not save or not remove:
+            return
+        stores = set()
+        with self._locked():
+            entries = self._read()
+            for entry in remove:
+                storage = BackupStore(self.path) if entry.get('backend') == 'store' else BackupFiles(self.path)
+                try:
+                    storage.remove(entry['file'])
+                except OSError:
+                    if storage.exists(entry['file']):
+                        raise
+                entries.pop(entry['file'], None)
+                if entry.get('backend') == 'store':
+                    stores.add(storage.path)
+            fd, tmp = tempfile.mkstemp(dir=self.path, prefix=CATALOG_FILE)
+            with os.fdopen(fd, 'w') as f:
+                for entry in sorted(entries.values(), key=lambda entry: (entry.get('saved', 0), entry['file'])):
+                    f.write(json.dumps(entry, sort_keys=True) + '\n')
+            os.rename(tmp, self.file)
+        for path in stores:
+            BackupStore(path).collect()
+
+
+def expired(entries, count=None, days=None, now=None):
+    """The entries beyond the count newest backups of their device that are also older than days, none without either.
+
+    A backup is as old as the last time a backup of the same configuration
+    was taken, its last_seen, not the time it was written. The newest
+    backup of every device is always kept.
+    """
+    if count is None and days is None:
+        return []
+    now = time.time() if now is None else now
+    devices = {}
+    for entry in entries:
+        devices.setdefault(entry.get('url'), []).append(entry)
+    remove = []
+    for backups in devices.values():
+        backups.sort(key=lambda entry: entry.get('saved', 0), reverse=True)
+        for index, entry in enumerate(backups):
+            if index < max(count or 0, 1):
+                continue
+            if days is not None and entry.get('last_seen', entry.get('saved', 0)) >= now - days * 86400:
+                continue
+            remove.append(entry)
+    return sorted(remove, key=lambda entry: (entry.get('saved', 0), entry['file']))
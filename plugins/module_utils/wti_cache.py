@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Controller side response cache for the read-only cpm_* modules.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from ansible.module_utils._text import to_bytes, to_text
+
+RESPONSE_CACHE_PATH = os.environ.get('WTI_RESPONSE_CACHE', '~/.ansible/wti_response_cache')
+RESPONSE_CACHE_SIZE = int(os.environ.get('WTI_RESPONSE_CACHE_SIZE', '1000'))
+
+
+class ResponseCache(object):
+    """GET responses kept in one file per device, credentials and path.
+
+    The files live on the controller, so the cache carries over between
+    tasks and back-to-back plays. Every hit refreshes the modification
+    time of its file and the least recently used files are removed once
+    there are more than max_entries, so the directory stays bounded.
+    """
+
+    def __init__(self, ttl, path=None, max_entries=None):
+        self.ttl = ttl
+        self.path = os.path.expanduser(path or RESPONSE_CACHE_PATH)
+        self.max_entries = max_entries or RESPONSE_CACHE_SIZE
+
+    @staticmethod
+    def key(url, auth_headers):
+        identity = json.dumps([url, sorted(auth_headers.items())])
+        return hashlib.sha256(to_bytes(identity, errors='surrogate_or_strict')).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, '%s.json' % key)
+
+    def get(self, key):
+        """Cached body for key, or None when there is none younger than the TTL."""
+        try:
+            with open(self._file(key), 'r') as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('stored', 0) + self.ttl <= time.time():
+            return None
+        try:
+            os.utime(self._file(key), None)
+        except OSError:
+            pass
+        return to_bytes(entry['data'], errors='surrogate_or_strict')
+
+    def put(self, key, data):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.response')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'stored': time.time(), 'data': to_text(data, errors='surrogate_or_strict')}, f)
+        os.rename(tmp, self._file(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                try:
+                    entries.append((os.stat(os.path.join(self.path, name)).st_mtime, name))
+                except OSError:
+                    pass
+        entries.sort()
+        for dummy, name in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Shared REST client for WTI OOB and PDU devices.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import base64
+import copy
+import json
+import socket
+import ssl
+
+from io import BytesIO
+
+from ansible.module_utils._text import to_bytes, to_native, to_text
+from ansible.module_utils.connection import Connection, ConnectionError as ConnectionRpcError
+from ansible.module_utils.six.moves import http_client
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.six.moves.urllib.parse import unquote, urljoin, urlparse
+from ansible.module_utils.six.moves.urllib.request import getproxies, proxy_bypass
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_cache import ResponseCache
+from ansible_collections.wti.remote.plugins.module_utils.wti_token import TOKEN_API_PATH, TokenCache, acquire_token
+
+DEFAULT_TIMEOUT = 10
+MAX_REDIRECTS = 5
+USER_AGENT = 'ansible-httpget'
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class WtiResponse(object):
+    """Fully read HTTP response, so the connection can be reused right away."""
+
+    def __init__(self, url, status, reason, headers, data):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._data = data
+
+    def read(self):
+        return self._data
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+
+class WtiSession(object):
+    """Keep-alive HTTP/1.1 connection to a WTI device.
+
+    The first request opens the TCP (and TLS) connection, every following
+    request to the same scheme/host/port is sent over that same socket.
+    A connection the device dropped while idle is reopened transparently.
+    """
+
+    def __init__(self, validate_certs=True, use_proxy=False, timeout=DEFAULT_TIMEOUT):
+        self.validate_certs = validate_certs
+        self.use_proxy = use_proxy
+        self.timeout = timeout
+        self.connects = 0
+        self._conn = None
+        self._origin = None
+        self._absolute_uri = False
+        self._proxy_headers = {}
+
+    def copy(self):
+        """New session with the same settings, for use from another thread."""
+        return WtiSession(validate_certs=self.validate_certs, use_proxy=self.use_proxy, timeout=self.timeout)
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._origin = None
+
+    def request(self, method, url, body=None, headers=None):
+        for dummy in range(MAX_REDIRECTS + 1):
+            response = self._request(method, url, body, headers)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_CODES or method not in ('GET', 'HEAD') or not location:
+                break
+            url = urljoin(url, location)
+
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.headers, BytesIO(response.read()))
+        return response
+
+    def _request(self, method, url, body, headers):
+        parts = urlparse(url)
+        if parts.scheme not in ('http', 'https'):
+            raise URLError('unsupported scheme %s' % parts.scheme)
+
+        origin = (parts.scheme, parts.hostname, parts.port)
+        if origin != self._origin:
+            self.close()
+
+        target = parts.path or '/'
+        if parts.query:
+            target = '%s?%s' % (target, parts.query)
+
+        send_headers = {'User-Agent': USER_AGENT}
+        send_headers.update(headers or {})
+
+        if body is not None and not hasattr(body, 'read'):
+            body = to_bytes(body, errors='surrogate_or_strict')
+        rewind = body.tell() if hasattr(body, 'tell') else None
+
+        # A reused socket may have been closed by the device while we were idle,
+        # so a failure there gets exactly one retry on a fresh connection.
+        for attempt in (0, 1):
+            reused = self._conn is not None
+            if not reused:
+                self._connect(parts)
+                send_headers.update(self._proxy_headers)
+            try:
+                self._conn.request(method, url if self._absolute_uri else target, body=body, headers=send_headers)
+                resp = self._conn.getresponse()
+                data = resp.read()
+            except socket.timeout as e:
+                self.close()
+                raise ConnectionError('timed out: %s' % to_native(e))
+            except (http_client.HTTPException, socket.error) as e:
+                self.close()
+                if reused and attempt == 0 and (body is None or isinstance(body, bytes) or rewind is not None):
+                    if rewind is not None:
+                        body.seek(rewind)
+                    continue
+                raise ConnectionError(to_native(e))
+            break
+
+        if resp.will_close:
+            self.close()
+        return WtiResponse(url, resp.status, resp.reason, resp.msg, data)
+
+    def _connect(self, parts):
+        host = parts.hostname
+        port = parts.port
+        proxy = self._get_proxy(parts)
+
+        self._absolute_uri = False
+        self._proxy_headers = {}
+        try:
+            if parts.scheme == 'https':
+                context = ssl.create_default_context()
+                if not self.validate_certs:
+                    context.check_hostname = False
+                    context.verify_mode = ssl.CERT_NONE
+                if proxy is not None:
+                    conn = http_client.HTTPSConnection(proxy.hostname, proxy.port or 8080, timeout=self.timeout, context=context)
+                    conn.set_tunnel(host, port or 443, headers=self._proxy_auth(proxy))
+                else:
+                    conn = http_client.HTTPSConnection(host, port or 443, timeout=self.timeout, context=context)
+            else:
+                if proxy is not None:
+                    conn = http_client.HTTPConnection(proxy.hostname, proxy.port or 8080, timeout=self.timeout)
+                    self._absolute_uri = True
+                    self._proxy_headers = self._proxy_auth(proxy)
+                else:
+                    conn = http_client.HTTPConnection(host, port or 80, timeout=self.timeout)
+            conn.connect()
+        except socket.gaierror as e:
+            raise URLError(e)
+        except ssl.CertificateError as e:
+            raise SSLValidationError(to_native(e))
+        except ssl.SSLError as e:
+            if 'CERTIFICATE_VERIFY_FAILED' in to_native(e):
+                raise SSLValidationError(to_native(e))
+            raise ConnectionError(to_native(e))
+        except (http_client.HTTPException, socket.error) as e:
+            raise ConnectionError(to_native(e))
+
+        self.connects += 1
+        self._conn = conn
+        self._origin = (parts.scheme, parts.hostname, parts.port)
+
+    def _get_proxy(self, parts):
+        if not self.use_proxy:
+            return None
+        proxy_url = getproxies().get(parts.scheme)
+        if not proxy_url or proxy_bypass(parts.hostname):
+            return None
+        if '://' not in proxy_url:
+            proxy_url = 'http://%s' % proxy_url
+        return urlparse(proxy_url)
+
+    @staticmethod
+    def _proxy_auth(proxy):
+        if proxy.username is None:
+            return {}
+        credentials = '%s:%s' % (unquote(proxy.username), unquote(proxy.password or ''))
+        return {'Proxy-Authorization': 'Basic %s' % to_text(base64.b64encode(to_bytes(credentials, errors='surrogate_or_strict')))}
+
+
+class HttpApiSession(object):
+    """Sends requests over the persistent wti.remote.wti httpapi connection.
+
+    Authentication and the device session are owned by ansible-connection,
+    so only the path, method and body of each request cross the socket.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.connects = 0
+
+    def copy(self):
+        return HttpApiSession(self.connection)
+
+    def close(self):
+        pass
+
+    def request(self, method, url, body=None, headers=None):
+        parts = urlparse(url)
+        target = parts.path or '/'
+        if parts.query:
+            target = '%s?%s' % (target, parts.query)
+
+        if hasattr(body, 'read'):
+            body = body.read()
+        if body is not None:
+            body = to_text(body, errors='surrogate_or_strict')
+        content_type = (headers or {}).get('Content-Type', 'application/json')
+
+        try:
+            status, data = self.connection.send_request(body, path=target, method=method, content_type=content_type)
+        except ConnectionRpcError as e:
+            raise ConnectionError(to_native(e))
+
+        data = to_bytes(data, errors='surrogate_or_strict')
+        if status >= 400:
+            raise HTTPError(url, status, http_client.responses.get(status, ''), {}, BytesIO(data))
+        return WtiResponse(url, status, http_client.responses.get(status, ''), {}, data)
+
+
+class WtiClient(object):
+    """REST client for one WTI device, sharing a single keep-alive session.
+
+    When ``cpm_username`` is empty the password is treated as a User Token,
+    which is sent in the X-WTI-API-KEY header on the ``/api/v2/token`` paths.
+    Without a password no credentials are sent, the session authenticates.
+    """
+
+    def __init__(self, cpm_url, cpm_username=None, cpm_password=None, use_https=True, validate_certs=True,
+                 use_proxy=False, timeout=DEFAULT_TIMEOUT, session=None):
+        if use_https is True:
+            self.protocol = "https://"
+        else:
+            self.protocol = "http://"
+        self.cpm_url = to_native(cpm_url)
+        self.session = session or WtiSession(validate_certs=validate_certs, use_proxy=use_proxy, timeout=timeout)
+
+        self.use_token = cpm_password is not None and not cpm_username
+        self._renew = None
+        self.cache = None
+        if cpm_password is None:
+            self.auth_headers = {}
+        elif self.use_token:
+            self.auth_headers = {'X-WTI-API-KEY': "%s" % to_native(cpm_password)}
+        else:
+            auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(cpm_username), to_native(cpm_password)),
+                           errors='surrogate_or_strict')))
+            self.auth_headers = {'Authorization': "Basic %s" % auth}
+
+    def copy(self):
+        """Client for the same device on a new session, WtiSession is not thread safe."""
+        client = copy.copy(self)
+        client.session = self.session.copy()
+        return client
+
+    def use_api_token(self, token, renew=None):
+        """Authenticate with an API token instead of Basic auth from now on.
+
+        renew(client, token) is called for a replacement when the device
+        rejects the token, with the client, or the copy of it, that sent it.
+        The request is then retried once.
+        """
+        self.use_token = True
+        self.auth_headers = {'X-WTI-API-KEY': "%s" % to_native(token)}
+        self._renew = renew
+
+    def url(self, path):
+        if self.use_token and path.startswith('/api/v2/') and not path.startswith(TOKEN_API_PATH):
+            path = '%s%s' % (TOKEN_API_PATH, path[len('/api/v2/'):])
+        return "%s%s%s" % (self.protocol, self.cpm_url, path)
+
+    def request(self, path, method='GET', data=None, content_type='application/json', headers=None):
+        if method != 'GET' or self.cache is None:
+            return self._authenticated_request(path, method, data, content_type, headers)
+
+        key = self.cache.key(self.url(path), self.auth_headers)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return WtiResponse(self.url(path), 200, 'OK', {}, cached)
+        response = self._authenticated_request(path, method, data, content_type, headers)
+        try:
+            self.cache.put(key, response.read())
+        except (IOError, OSError):
+            pass
+        return response
+
+    def _authenticated_request(self, path, method, data, content_type, headers):
+        rewind = data.tell() if hasattr(data, 'tell') else None
+        try:
+            return self._request(path, method, data, content_type, headers)
+        except HTTPError as e:
+            if e.code not in (401, 403) or self._renew is None or (hasattr(data, 'read') and rewind is None):
+                raise
+            try:
+                token = self._renew(self, self.auth_headers['X-WTI-API-KEY'])
+            except (HTTPError, URLError):
+                raise
+            except (IOError, OSError, ValueError):
+                # no replacement token, e.g. a cached failure or an unwritable cache, report the rejection itself
+                raise e
+            self.use_api_token(token, renew=self._renew)
+            if rewind is not None:
+                data.seek(rewind)
+            return self._request(path, method, data, content_type, headers)
+
+    def _request(self, path, method, data, content_type, headers):
+        send_headers = {'Content-Type': content_type}
+        send_headers.update(self.auth_headers)
+        send_headers.update(headers or {})
+        return self.session.request(method, self.url(path), body=data, headers=send_headers)
+
+    def get_json(self, path):
+        raw = self.request(path).read()
+        return json.loads(to_text(raw, errors='surrogate_or_strict'))
+
+    def close(self):
+        self.session.close()
+
+
+def wti_client(module):
+    """Build a WtiClient from the common cpm_* module parameters.
+
+    When the task runs over the wti.remote.wti httpapi connection the
+    requests go through its persistent session instead.
+    """
+    socket_path = getattr(module, '_socket_path', None)
+    if socket_path:
+        connection = Connection(socket_path)
+        if not module.params.get('cpm_url'):
+            module.params['cpm_url'] = connection.get_option('host')
+        client = WtiClient(module.params['cpm_url'], use_https=module.params['use_https'], session=HttpApiSession(connection))
+        if module.params.get('cache_ttl'):
+            client.cache = ResponseCache(module.params['cache_ttl'])
+        return client
+
+    missing = [name for name in ('cpm_url', 'cpm_password') if module.params.get(name) is None]
+    if missing:
+        module.fail_json(msg='missing required arguments: %s' % ', '.join(missing), changed=False)
+
+    client = WtiClient(module.params['cpm_url'], module.params.get('cpm_username'), module.params['cpm_password'],
+                       use_https=module.params['use_https'], validate_certs=module.params['validate_certs'],
+                       use_proxy=module.params['use_proxy'])
+
+    if module.params.get('token_cache') and not client.use_token:
+        try:
+            cache_token(client, TokenCache(module.params['token_cache'], module.params['token_cache_ttl']),
+                        module.params.get('cpm_username'), module.params['cpm_password'])
+        except (HTTPError, URLError, SSLValidationError, ConnectionError, ValueError) as e:
+            module.warn('Could not get an API token, using Basic authentication: %s' % to_native(e))
+        except (IOError, OSError) as e:
+            module.warn('Could not use the token cache %s, using Basic authentication: %s' % (module.params['token_cache'], to_native(e)))
+
+    if module.params.get('cache_ttl'):
+        client.cache = ResponseCache(module.params['cache_ttl'])
+    return client
+
+
+def connection_host(connection):
+    """Device address of a wti.remote.wti httpapi connection, with its port."""
+    host = connection.get_option('host')
+    if ':' in host and not host.startswith('['):
+        host = '[%s]' % host
+    port = connection.get_option('port')
+    if port:
+        host = '%s:%s' % (host, port)
+    return host
+
+
+def wti_direct_client(module, timeout=DEFAULT_TIMEOUT):
+    """Build a WtiClient with a connection of its own to the device.
+
+    For requests that cannot cross the wti.remote.wti httpapi socket, such
+    as streamed image uploads. Over httpapi the address, credentials and
+    TLS options are those of the connection unless cpm_password is set.
+    """
+    params = dict(module.params)
+    socket_path = getattr(module, '_socket_path', None)
+    if socket_path and params.get('cpm_password') is None:
+        connection = Connection(socket_path)
+        params.update(cpm_url=connection_host(connection), cpm_username=connection.get_option('remote_user'),
+                      cpm_password=connection.get_option('password'), use_https=connection.get_option('use_ssl'),
+                      validate_certs=connection.get_option('validate_certs'), use_proxy=connection.get_option('use_proxy'))
+
+    if params.get('cpm_password') is None:
+        module.fail_json(msg='No password to connect to {0} directly, set cpm_password or the password of the connection'.format(params.get('cpm_url')),
+                         changed=False)
+
+    return WtiClient(params['cpm_url'], params.get('cpm_username'), params['cpm_password'], use_https=params['use_https'],
+                     validate_certs=params['validate_certs'], use_proxy=params['use_proxy'], timeout=timeout)
+
+
+def cache_token(client, cache, cpm_username, cpm_password):
+    """Switch a Basic auth client to the device API token kept in cache."""
+    key = cache.key(client.url(''), to_native(cpm_username), to_native(cpm_password))
+    basic_headers = client.auth_headers
+
+    def renew(owner, stale):
+        # Basic auth view of the client that was rejected, on its own connection, copies run in other threads
+        basic = copy.copy(owner)
+        basic.use_token = False
+        basic.auth_headers = basic_headers
+        basic._renew = None
+        return cache.renew(key, stale, lambda: acquire_token(basic))
+
+    client.use_api_token(cache.get(key, lambda: acquire_token(client)), renew=renew)
+
+
+def wti_error(method, fullurl, e):
+    """Message for a transport exception raised by WtiClient.request(), in the cpm_* module wording."""
+    if isinstance(e, HTTPError):
+        return '{0}: Received HTTP error for {1} : {2}'.format(method, fullurl, to_native(e))
+    if isinstance(e, URLError):
+        return '{0}: Failed lookup url for {1} : {2}'.format(method, fullurl, to_native(e))
+    if isinstance(e, SSLValidationError):
+        return '{0}: Error validating the server''s certificate for {1} : {2}'.format(method, fullurl, to_native(e))
+    return '{0}: Error connecting to {1} : {2}'.format(method, fullurl, to_native(e))
+
+
+def wti_request(module, client, path, method='GET', data=None, content_type='application/json', headers=None):
+    """Send a request through client, failing the module on any transport error."""
+    try:
+        return client.request(path, method=method, data=data, content_type=content_type, headers=headers)
+    except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+        module.fail_json(msg=wti_error(method, client.url(path), e), changed=False)
@@ -0,0 +1,950 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Firmware image handling shared by the WTI firmware modules.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import binascii
+import fcntl
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from contextlib import contextmanager
+try:
+    from concurrent.futures import ThreadPoolExecutor
+    HAS_FUTURES = True
+except ImportError:
+    HAS_FUTURES = False
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_wait import FIRMWARE_PATH, parse_version, wait_for_device
+
+HASH_CHUNK = 1024 * 1024
+
+DOWNLOAD_CHUNK = 1024 * 1024
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_TIMEOUT = 60
+
+UPLOAD_PATH = "/cgi-bin/getfile"
+UPLOAD_CHUNK = 1024 * 1024
+# the device answers an upload only after it has checked the whole image
+UPLOAD_TIMEOUT = 600
+REBOOT_PATH = "/api/v2/config/rebootlocalunit"
+UPLOAD_LIMITS_PATH = os.environ.get('WTI_UPLOAD_LIMITS', '~/.ansible/wti_upload_limits')
+
+VERSION_URL = "https://my.wti.com/update/version.aspx"
+VERSION_CACHE_PATH = os.environ.get('WTI_VERSION_CACHE', '~/.ansible/wti_version_cache')
+
+CONSOLE = 1
+POWER = 0
+INCREMENTAL = 2
+
+CATALOG_INDEX = '.wti_firmware_index.json'
+# markers in the last bytes of an image that tell its family
+IMAGE_MARKERS = ((b"TSM", CONSOLE), (b"VMR", POWER), (b"INCUPDATE", INCREMENTAL))
+IMAGE_TAIL = 20
+
+# oldest firmware that can be upgraded remotely, and that takes incremental updates
+MIN_REMOTE_VERSION = {CONSOLE: 6.58, POWER: 2.15}
+MIN_INCREMENTAL_VERSION = {CONSOLE: 8.09, POWER: 4.05}
+
+
+@contextmanager
+def timed(timings, key):
+    """Add the seconds spent in the block to timings[key], when timings is a dict."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[key] = round(timings.get(key, 0) + time.time() - start, 3)
+
+
+class ProgressLog(object):
+    """Progress events of a firmware run, appended as JSON lines to path.
+
+    Every line carries the time, the event and the context given here,
+    such as the device URL, so the forks of a play can share one file.
+    Without a path events are dropped.
+    """
+
+    def __init__(self, path=None, **context):
+        self.path = os.path.expanduser(path) if path else None
+        self.context = context
+
+    def event(self, event, **fields):
+        if self.path is None:
+            return
+        entry = dict(self.context, time=round(time.time(), 3), event=event)
+        entry.update(fields)
+        # one write of a whole line to an O_APPEND file does not interleave with other forks
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, to_bytes(json.dumps(entry, sort_keys=True) + '\n'))
+        finally:
+            os.close(fd)
+
+
+def file_sha256(handle):
+    """SHA-256 hex digest of an open binary file, read from the start."""
+    digest = hashlib.sha256()
+    handle.seek(0)
+    for chunk in iter(lambda: handle.read(HASH_CHUNK), b''):
+        digest.update(chunk)
+    handle.seek(0)
+    return digest.hexdigest()
+
+
+class ImageCache(object):
+    """Content addressed cache of downloaded firmware images, shared by all forks.
+
+    Images are stored once under objects/<sha256>, and urls/<hash of the
+    download URL> records which object a URL resolved to and its size. A
+    lock per URL makes every image and incremental part download exactly
+    once while any number of forks wait for it. Objects are verified
+    against their digest when they are stored, later uses only check the
+    size, a truncated object is downloaded again. Once the objects exceed
+    max_size bytes the least recently used ones are removed.
+    """
+
+    def __init__(self, path, max_size):
+        self.path = os.path.expanduser(path)
+        self.max_size = max_size
+
+    def _dir(self, name):
+        path = os.path.join(self.path, name)
+        if not os.path.isdir(path):
+            try:
+                os.makedirs(path, 0o700)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+        return path
+
+    @staticmethod
+    def _url_key(url):
+        return hashlib.sha256(to_bytes(url, errors='surrogate_or_strict')).hexdigest()
+
+    def _lock(self, name):
+        fd = os.open(os.path.join(self._dir('locks'), '%s.lock' % name), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    @staticmethod
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _record(self, url_key, digest, size):
+        fd, tmp = tempfile.mkstemp(dir=self._dir('urls'), prefix='.url')
+        with os.fdopen(fd, 'w') as f:
+            f.write('%s %d' % (digest, size))
+        os.rename(tmp, os.path.join(self._dir('urls'), url_key))
+
+    def _lookup(self, url_key, timings=None):
+        """Open object recorded for url_key, or None when it is missing or its size changed."""
+        try:
+            with open(os.path.join(self._dir('urls'), url_key), 'r') as f:
+                record = f.read().split()
+            handle = open(os.path.join(self._dir('objects'), record[0]), 'rb')
+        except (IOError, OSError, IndexError):
+            return None
+        size = os.fstat(handle.fileno()).st_size
+        if len(record) > 1:
+            valid = record[1] == str(size)
+        else:
+            # recorded without a size by an older release, verified once
+            with timed(timings, 'verify'):
+                valid = file_sha256(handle) == record[0]
+            if valid:
+                self._record(url_key, record[0], size)
+        if not valid:
+            handle.close()
+            os.remove(os.path.join(self._dir('objects'), record[0]))
+            return None
+        os.utime(handle.name, None)
+        return handle
+
+    def _store(self, url_key, download, sha256, timings=None):
+        # a fixed name per URL, so an interrupted download of an image with a known SHA-256 is resumed by the next fork
+        tmp = os.path.join(self._dir('objects'), '.%s' % url_key)
+        with timed(timings, 'download'):
+            download(tmp)
+        try:
+            with open(tmp, 'rb') as handle, timed(timings, 'verify'):
+                digest = file_sha256(handle)
+            if sha256 is not None and digest != sha256.lower():
+                raise ValueError('downloaded image has SHA-256 %s, expected %s' % (digest, sha256))
+            os.rename(tmp, os.path.join(self._dir('objects'), digest))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        handle = open(os.path.join(self._dir('objects'), digest), 'rb')
+        self._record(url_key, digest, os.fstat(handle.fileno()).st_size)
+        return handle
+
+    def fetch(self, url, download, sha256=None, timings=None):
+        """Open the cached image for url, calling download(path) to fill the cache on a miss.
+
+        The returned file stays readable even if another fork evicts the
+        object while it is being uploaded. The seconds spent downloading
+        and verifying are added to the timings dict when one is given.
+        """
+        url_key = self._url_key(url)
+        fd = self._lock(url_key)
+        try:
+            handle = self._lookup(url_key, timings)
+            # objects are named by their verified digest
+            if handle is not None and sha256 is not None and os.path.basename(handle.name) != sha256.lower():
+                handle.close()
+                handle = None
+            if handle is None:
+                handle = self._store(url_key, download, sha256, timings)
+        finally:
+            self._unlock(fd)
+        self.evict(keep=os.path.basename(handle.name))
+        return handle
+
+    def evict(self, keep=None):
+        """Remove the least recently used objects beyond max_size, never keep."""
+        fd = self._lock('evict')
+        try:
+            objects = self._dir('objects')
+            entries = []
+            for name in os.listdir(objects):
+                if name.startswith('.'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(objects, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(entry[1] for entry in entries)
+            for dummy, size, name in sorted(entries):
+                if total <= self.max_size:
+                    break
+                if name == keep:
+                    continue
+                try:
+                    os.remove(os.path.join(objects, name))
+                    total -= size
+                except OSError:
+                    pass
+        finally:
+            self._unlock(fd)
+
+
+def version_cap(family, max_console_version=None, max_power_version=None):
+    """The highest version to look for on a device of family, or None."""
+    cap = max_power_version if family == POWER else max_console_version
+    if cap is not None and float(cap) > 0:
+        return float(cap)
+    return None
+
+
+def version_url(family, cap=None):
+    """version.aspx URL listing the latest OS image and incremental parts of family."""
+    if cap is None:
+        return "%s?fam=%s" % (VERSION_URL, family)
+    return "%s?fam=%s&versioncap=%s" % (VERSION_URL, family, cap)
+
+
+def index_incrementals(items):
+    """Incremental parts keyed by vpart, the highest vinc of every part wins."""
+    index = {}
+    for item in items or []:
+        vpart = int(item['vpart'])
+        if vpart not in index or int(item['vinc']) > int(index[vpart]['vinc']):
+            index[vpart] = item
+    return index
+
+
+def select_incrementals(online, installed):
+    """Online incremental parts that are missing or newer than the installed ones, in online order."""
+    installed = index_incrementals(installed)
+    selected = []
+    for item in online or []:
+        local = installed.get(int(item['vpart']))
+        if local is None or int(item['vinc']) > int(local['vinc']):
+            selected.append(item)
+    return selected
+
+
+def item_sha256(item):
+    value = item.get('sha256')
+    if value and len(to_text(value).strip()) == 64:
+        return to_text(value).strip().lower()
+    return None
+
+
+def item_size(item):
+    for key in ('size', 'filesize', 'filelength'):
+        if item.get(key) not in (None, ''):
+            try:
+                return int(item[key])
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def plan_upgrade(device, online, force=False, ignoreincremental=False, bootafterincremental=True, cap=None):
+    """Ordered upgrade plan for a device, the way cpm_firmware_update would carry it out.
+
+    device is the status/firmware reply of the device and online the
+    version.aspx reply for its family. The plan action is one of none,
+    full, incremental or unsupported, steps lists every image to upload
+    and whether the device reboots after it.
+    """
+    config = device.get('config', {})
+    family = int(config.get('family', CONSOLE))
+    current = parse_version(config.get('firmware'))
+    target = parse_version(online['config']['firmware'])
+    if cap is not None and cap < target:
+        target = cap
+
+    plan = dict(family=family, current=current, target=target, action='none', steps=[], size=0)
+    if current is None or current < MIN_REMOTE_VERSION.get(family, MIN_REMOTE_VERSION[CONSOLE]):
+        plan['action'] = 'unsupported'
+        return plan
+
+    parts = []
+    if current == target and not ignoreincremental and current >= MIN_INCREMENTAL_VERSION.get(family, MIN_INCREMENTAL_VERSION[CONSOLE]):
+        parts = select_incrementals(online['config'].get('incremental'), config.get('incremental'))
+
+    if parts:
+        plan['action'] = 'incremental'
+        for index, item in enumerate(parts):
+            plan['steps'].append(dict(type='incremental', title=to_text(item.get('title', '')), vpart=int(item['vpart']),
+                                      vinc=int(item['vinc']), imageurl=item['imageurl'], size=item_size(item), sha256=item_sha256(item),
+                                      reboot=bool(bootafterincremental) and index == len(parts) - 1))
+    elif current < target or force:
+        plan['action'] = 'full'
+        plan['steps'].append(dict(type='full', title=to_text(online['config']['firmware']), imageurl=online['config']['imageurl'],
+                                  size=item_size(online['config']), sha256=item_sha256(online['config']), reboot=True))
+    plan['size'] = sum(step['size'] or 0 for step in plan['steps'])
+    return plan
+
+
+def plan_image(device, path, target=None):
+    """Upgrade plan that uploads the full image at path, or nothing when path is None.
+
+    For a local image, such as one from a firmware catalog, target is its
+    version when that is known. The steps are marked local, the image is
+    read from path instead of being downloaded.
+    """
+    config = device.get('config', {})
+    plan = dict(family=int(config.get('family', CONSOLE)), current=parse_version(config.get('firmware')), target=target,
+                action='none', steps=[], size=0)
+    if path is not None:
+        plan['action'] = 'full'
+        plan['size'] = os.path.getsize(path)
+        plan['steps'].append(dict(type='full', title=os.path.basename(path), imageurl=path, size=plan['size'], sha256=None,
+                                  reboot=True, local=True))
+    return plan
+
+
+def fetch_versions(session, family, cap=None):
+    """The version.aspx reply for family, read through session."""
+    response = session.request('GET', version_url(family, cap), headers={'Content-Type': 'application/json'})
+    return json.loads(to_text(response.read(), errors='surrogate_or_strict'))
+
+
+def load_versions(path, family):
+    """version.aspx reply for family from a local file.
+
+    The file holds either one version.aspx reply, used for every family,
+    or replies keyed by family, for example {"0": {...}, "1": {...}}.
+    """
+    with open(os.path.expanduser(path), 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError('%s does not hold a version.aspx reply' % path)
+    if 'config' not in data:
+        if to_text(family) not in data:
+            raise ValueError('%s has no entry for family %s' % (path, family))
+        data = data[to_text(family)]
+    return data
+
+
+class VersionCache(object):
+    """version.aspx replies kept on the controller per family and version cap.
+
+    The first fork that needs a family looks it up under a lock, the other
+    forks wait for it and reuse the reply until it is ttl seconds old.
+    """
+
+    def __init__(self, ttl, path=None):
+        self.ttl = ttl
+        self.path = os.path.expanduser(path or VERSION_CACHE_PATH)
+
+    def _file(self, family, cap):
+        return os.path.join(self.path, 'fam%s-cap%s.json' % (family, cap if cap is not None else 'none'))
+
+    def get(self, family, cap, fetch):
+        """Cached reply for family and cap, calling fetch() under the lock when there is none."""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+        name = self._file(family, cap)
+        fd = os.open(name + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(name, 'r') as f:
+                    entry = json.load(f)
+                if entry.get('stored', 0) + self.ttl > time.time():
+                    return entry['data']
+            except (IOError, OSError, ValueError, KeyError):
+                pass
+            data = fetch()
+            tmp_fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.version')
+            with os.fdopen(tmp_fd, 'w') as f:
+                json.dump({'stored': time.time(), 'data': data}, f)
+            os.rename(tmp, name)
+            return data
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def lookup_versions(session, family, cap=None, cache=None, override=None):
+    """version.aspx reply for family, from the override file, the cache or my.wti.com."""
+    if override:
+        return load_versions(override, family)
+    if cache is None:
+        return fetch_versions(session, family, cap)
+    return cache.get(family, cap, lambda: fetch_versions(session, family, cap))
+
+
+def image_size(session, url):
+    """Size of the image at url from a HEAD request, or None when the server does not tell."""
+    response = session.request('HEAD', url)
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+class MultipartFile(object):
+    """multipart/form-data body with one file field, read from disk while it is sent.
+
+    Only the part headers are held in memory, so the size of the image does
+    not matter. read() hands out at least chunk_size bytes at a time,
+    http.client would otherwise send the body in 8 KiB pieces.
+    """
+
+    def __init__(self, handle, field='file', filename='name.binary', content_type='application/octet-stream', chunk_size=UPLOAD_CHUNK,
+                 bandwidth=None):
+        self.boundary = to_text(binascii.hexlify(os.urandom(16)))
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+        self.chunk_size = chunk_size
+        self._head = to_bytes('--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\nContent-Type: %s\r\n\r\n'
+                              % (self.boundary, field, filename, content_type))
+        self._tail = to_bytes('\r\n--%s--\r\n' % self.boundary)
+        self._handle = handle
+        self._bandwidth = bandwidth
+        self.file_size = os.fstat(handle.fileno()).st_size
+        self.length = len(self._head) + self.file_size + len(self._tail)
+        self._pos = 0
+        self.sent = None
+        handle.seek(0)
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=0):
+        if whence != 0:
+            raise IOError('MultipartFile only seeks from the start')
+        self._pos = max(0, min(pos, self.length))
+        self._handle.seek(min(max(0, self._pos - len(self._head)), self.file_size))
+        return self._pos
+
+    def read(self, size=-1):
+        remaining = self.length - self._pos
+        if size is None or size < 0:
+            size = remaining
+        size = min(max(size, self.chunk_size), remaining)
+        if self._bandwidth is not None:
+            size = min(size, self._bandwidth.chunk)
+            self._bandwidth.take(size)
+        pieces = []
+        file_end = len(self._head) + self.file_size
+        while size > 0:
+            if self._pos < len(self._head):
+                piece = self._head[self._pos:self._pos + size]
+            elif self._pos < file_end:
+                piece = self._handle.read(min(size, file_end - self._pos))
+                if not piece:
+                    raise IOError('%s is shorter than when the upload started' % getattr(self._handle, 'name', 'the image'))
+            else:
+                piece = self._tail[self._pos - file_end:self._pos - file_end + size]
+            pieces.append(piece)
+            self._pos += len(piece)
+            size -= len(piece)
+        if self._pos == self.length and self.sent is None:
+            self.sent = time.time()
+        return b''.join(pieces)
+
+
+def _limits_dir(path):
+    path = os.path.expanduser(path or UPLOAD_LIMITS_PATH)
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path, 0o700)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+    return path
+
+
+class TokenBucket(object):
+    """Upload bandwidth shared by every fork and thread on the controller that uses the same name.
+
+    The bucket is a small state file under a lock and refills at rate
+    bytes per second, up to one second worth. A take larger than what is
+    left borrows from the future and sleeps until it is paid off, so the
+    uploads of all tasks together stay at rate and none of them starves.
+    """
+
+    def __init__(self, rate, name='default', path=None, clock=time.time, pause=time.sleep):
+        self.rate = rate
+        self.name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+        self.path = path
+        # a tenth of a second per read keeps the link busy without bursts
+        self.chunk = max(8192, int(rate / 10))
+        self._clock = clock
+        self._pause = pause
+
+    def take(self, amount):
+        fd = os.open(os.path.join(_limits_dir(self.path), '%s.bucket' % self.name), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            now = self._clock()
+            try:
+                tokens, updated = json.loads(to_text(os.read(fd, 256)))
+            except ValueError:
+                tokens, updated = self.rate, now
+            tokens = min(self.rate, tokens + max(0, now - updated) * self.rate) - amount
+            os.lseek(fd, 0, 0)
+            os.ftruncate(fd, 0)
+            os.write(fd, to_bytes(json.dumps([tokens, now])))
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        if tokens < 0:
+            self._pause(-tokens / float(self.rate))
+
+
+@contextmanager
+def upload_slot(key, slots=1, path=None, poll=1, pause=time.sleep):
+    """Hold one of the slots upload slots of the device key, from every fork and thread on the controller."""
+    directory = _limits_dir(path)
+    name = hashlib.sha256(to_bytes(key, errors='surrogate_or_strict')).hexdigest()
+    while True:
+        for slot in range(slots):
+            fd = os.open(os.path.join(directory, '%s.%d.slot' % (name, slot)), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                os.close(fd)
+                continue
+            try:
+                yield slot
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            return
+        pause(poll)
+
+
+def upload_image(client, handle, name=None, chunk_size=UPLOAD_CHUNK, bandwidth=None, slots=None):
+    """POST the open image file to the device as a streamed multipart body.
+
+    bandwidth is a TokenBucket the upload is paced by, with slots the
+    upload first waits until fewer than slots uploads go to the device.
+    Returns the JSON reply of the device and the transfer statistics: the
+    seconds spent waiting for a slot, sending the image, and waiting for
+    the device to check it and answer, and the throughput while sending.
+    """
+    if slots:
+        queued = time.time()
+        with upload_slot(client.url(UPLOAD_PATH), slots):
+            queued = time.time() - queued
+            reply, stats = upload_image(client, handle, name=name, chunk_size=chunk_size, bandwidth=bandwidth)
+        stats['queued_seconds'] = round(queued, 3)
+        return reply, stats
+
+    body = MultipartFile(handle, chunk_size=chunk_size, bandwidth=bandwidth)
+    start = time.time()
+    response = client.request(UPLOAD_PATH, method='POST', data=body, content_type=body.content_type,
+                              headers={'Content-Length': str(body.length)})
+    reply = json.loads(to_text(response.read(), errors='surrogate_or_strict'))
+    end = time.time()
+    sent = body.sent or end
+    stats = dict(file=name or os.path.basename(getattr(handle, 'name', '')), bytes=body.file_size, seconds=round(end - start, 3),
+                 queued_seconds=0, send_seconds=round(sent - start, 3), processing_seconds=round(end - sent, 3),
+                 bytes_per_second=int(body.file_size / max(sent - start, 0.001)))
+    return reply, stats
+
+
+def prefetched(items, fetch, enabled=True, discard=None):
+    """Yield fetch(item) for every item in order, fetching the next item while the caller uses the current one.
+
+    A result that was fetched ahead but never handed out, because the
+    caller stopped early, is passed to discard(). Without concurrent.futures,
+    as on Python 2.7, every item is fetched when it is needed.
+    """
+    if not enabled or len(items) < 2 or not HAS_FUTURES:
+        for item in items:
+            yield fetch(item)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    pending = pool.submit(fetch, items[0])
+    try:
+        for item in items[1:]:
+            current = pending.result()
+            pending = pool.submit(fetch, item)
+            yield current
+        current, pending = pending.result(), None
+        yield current
+    finally:
+        pool.shutdown(wait=True)
+        if pending is not None and discard is not None and pending.exception() is None:
+            discard(pending.result())
+
+
+class UpgradeFailed(Exception):
+    """The device refused an image, or did not report it installed after the upgrade."""
+
+
+def apply_plan(client, uploader, plan, fetch, wait_timeout=600, wait=wait_for_device, bandwidth=None, slots=None, progress=None,
+               uploads=None, pipeline=False, check=True):
+    """Carry out the upgrade plan of one device and check that it took.
+
+    fetch(step, timings) returns the open image file of a step and adds
+    the seconds it spent downloading and verifying to timings, with
+    pipeline the next image is fetched while the current one is sent.
+    Incremental parts are sent once the device is ready again after the
+    previous one, and the device is rebooted after the last one when the
+    plan says so. With check, the device then has to report the target
+    firmware, and every uploaded part when it rebooted. bandwidth and
+    slots are passed on to upload_image(), events go to the ProgressLog
+    progress. A failed upload raises UpgradeFailed. Returns the statistics
+    of every upload, with the fetch timings and the seconds the device took
+    to be ready after it, and the last status reply, or without check the
+    reply to the last upload. The statistics of every image the device
+    accepted are appended to the uploads list when one is given, so they
+    are known when a later step fails.
+    """
+    progress = progress or ProgressLog()
+    uploads = [] if uploads is None else uploads
+
+    def fetch_step(step):
+        timings = dict(download=0, verify=0)
+        return fetch(step, timings), timings
+
+    reply = None
+    fetched = prefetched(plan['steps'], fetch_step, enabled=pipeline, discard=lambda item: item[0].close())
+    try:
+        for index, (step, (handle, timings)) in enumerate(zip(plan['steps'], fetched)):
+            try:
+                if index > 0:
+                    with timed(uploads[-1], 'ready_seconds'):
+                        wait(client, wait_timeout)
+                try:
+                    reply, stats = upload_image(uploader, handle, name=step['imageurl'][step['imageurl'].rfind('/') + 1:],
+                                                bandwidth=bandwidth, slots=slots)
+                except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+                    raise UpgradeFailed(wti_error('POST', uploader.url(UPLOAD_PATH), e))
+                except ValueError as e:
+                    raise UpgradeFailed('POST: Unexpected reply from {0} : {1}'.format(uploader.url(UPLOAD_PATH), to_text(e)))
+            finally:
+                handle.close()
+            stats.update(type=step['type'], vpart=step.get('vpart'), title=step.get('title', ''), download_seconds=timings['download'],
+                         verify_seconds=timings['verify'], ready_seconds=0)
+            progress.event('upload', **stats)
+            status = reply.get('status') if isinstance(reply, dict) else None
+            if not isinstance(status, dict) or to_text(status.get('code')) != '0':
+                raise UpgradeFailed('FAIL: Upgrade Failed for {0} : {1}'.format(uploader.url(UPLOAD_PATH), to_text(status)))
+            uploads.append(stats)
+            if step['type'] == 'incremental' and step['reboot']:
+                try:
+                    client.request(REBOOT_PATH)
+                except (HTTPError, SSLValidationError) as e:
+                    raise UpgradeFailed(wti_error('GET', client.url(REBOOT_PATH), e))
+                except (URLError, ConnectionError):
+                    # the device may drop the connection as it goes down, the wait for it to go down tells
+                    pass
+                progress.event('reboot')
+    finally:
+        fetched.close()
+
+    if not plan['steps'] or not check:
+        return uploads, reply
+    last = plan['steps'][-1]
+    with timed(uploads[-1], 'ready_seconds'):
+        if not last['reboot']:
+            data, dummy = wait(client, wait_timeout)
+        else:
+            # a full image reboots the device by itself and is done once the new version answers,
+            # incremental parts keep the version so the device first has to go down
+            firmware = to_text(plan['target']) if plan['target'] is not None else None
+            data, dummy = wait(client, wait_timeout, firmware=firmware, down=last['type'] == 'incremental')
+    progress.event('ready', seconds=uploads[-1]['ready_seconds'])
+    if last['reboot'] and last['type'] == 'incremental':
+        config = data.get('config', {}) if isinstance(data, dict) else {}
+        missing = select_incrementals(plan['steps'], config.get('incremental'))
+        if missing:
+            raise UpgradeFailed('FAIL: {0} does not report incremental part {1} after the reboot'.format(
+                client.url(FIRMWARE_PATH), ', '.join(to_text(step['vpart']) for step in missing)))
+    return uploads, data
+
+
+def load_requests():
+    """Import requests, which is only needed to download images, on first use.
+
+    Returns the module, None when it is not installed, and the seconds the
+    import took, so a run that downloads nothing never pays for it.
+    """
+    start = time.time()
+    try:
+        import requests
+    except ImportError:
+        return None, 0
+    return requests, round(time.time() - start, 3)
+
+
+def _expected_size(response, offset):
+    """Full size of the file from a 200 or 206 reply, or None."""
+    content_range = response.headers.get('Content-Range', '')
+    if '/' in content_range and content_range.rsplit('/', 1)[1].strip().isdigit():
+        return int(content_range.rsplit('/', 1)[1])
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit():
+        return offset + int(length)
+    return None
+
+
+def resumable_download(get, url, path, chunk_size=DOWNLOAD_CHUNK, retries=DOWNLOAD_RETRIES, sha256=None, size=None,
+                       timeout=DOWNLOAD_TIMEOUT, timings=None):
+    """Download url to path through a .part file, resuming it with Range requests.
+
+    get is requests.get or a function with the same signature. A dropped
+    transfer is resumed where it stopped, up to retries times. With sha256
+    the part file is path.part, which is also resumed when an earlier run
+    left it behind, as the digest tells a stale file, and a lock next to
+    it keeps parallel processes from writing it at the same time. Without
+    it every process downloads into a part file of its own, which is
+    removed when the download fails. The file is checked against sha256
+    when given, otherwise against size or the size the server sent, and
+    only moved to path when it matches. The seconds spent downloading and
+    verifying are added to the timings dict when one is given.
+    """
+    fd = None
+    if sha256 is not None:
+        part = path + '.part'
+        fd = os.open(os.path.join(os.path.dirname(path), '.%s.part.lock' % os.path.basename(path)), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        part = '%s.%d.part' % (path, os.getpid())
+    try:
+        with timed(timings, 'download'):
+            expected = _resume(get, url, part, chunk_size, retries, size, timeout)
+        with timed(timings, 'verify'):
+            _verify(url, part, sha256, expected)
+        os.rename(part, path)
+    except BaseException:
+        if sha256 is None and os.path.exists(part):
+            os.remove(part)
+        raise
+    finally:
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+    return path
+
+
+def _resume(get, url, part, chunk_size, retries, expected, timeout):
+    error = None
+    for dummy in range(retries + 1):
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if expected is not None and offset >= expected:
+            break
+        headers = {'Range': 'bytes=%d-' % offset} if offset else {}
+        try:
+            response = get(url, stream=True, headers=headers, timeout=timeout)
+        except (IOError, OSError) as e:
+            error = e
+            continue
+        if response.status_code == 416 and offset:
+            # nothing left to send, the part file is complete
+            break
+        if response.status_code >= 400:
+            raise IOError('HTTP Error %d: %s' % (response.status_code, response.reason))
+        if response.status_code != 206:
+            offset = 0
+        if expected is None:
+            expected = _expected_size(response, offset)
+        try:
+            with open(part, 'ab' if offset else 'wb') as handle:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:  # filter out keep-alive new chunks
+                        handle.write(chunk)
+        except (IOError, OSError) as e:
+            error = e
+            continue
+        if expected is None or os.path.getsize(part) >= expected:
+            break
+        error = IOError('transfer ended after %d of %d bytes' % (os.path.getsize(part), expected))
+    else:
+        raise error
+    return expected
+
+
+def _verify(url, part, sha256, expected):
+    actual = os.path.getsize(part)
+    if sha256 is not None:
+        with open(part, 'rb') as handle:
+            digest = file_sha256(handle)
+        if digest != sha256.lower():
+            os.remove(part)
+            raise ValueError('%s has SHA-256 %s, expected %s' % (url, digest, sha256))
+    elif expected is not None and actual != expected:
+        os.remove(part)
+        raise ValueError('%s has %d bytes, expected %d' % (url, actual, expected))
+
+
+def image_family(handle):
+    """Family of an open image from the marker in its last bytes, CONSOLE, POWER, INCREMENTAL or None."""
+    handle.seek(0, 2)
+    handle.seek(max(0, handle.tell() - IMAGE_TAIL))
+    tail = handle.read()
+    handle.seek(0)
+    for marker, family in IMAGE_MARKERS:
+        if tail.find(marker) >= 0:
+            return family
+    return None
+
+
+def name_version(name):
+    """Firmware version in an image file name such as wti_tsm_8.09.bin, or None."""
+    match = re.search(r'(?<![\d.])(\d{1,2}\.\d{2})(?![\d])', name)
+    return float(match.group(1)) if match else None
+
+
+class FirmwareCatalog(object):
+    """Metadata of the firmware images in a directory, kept in a sidecar index.
+
+    Every image is read once for its family and SHA-256, the index entry
+    is reused for as long as the size and modification time of the file
+    are unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.index_path = os.path.join(self.path, CATALOG_INDEX)
+        self.scanned = 0
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _save(self, index):
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.wti_firmware_index')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.rename(tmp, self.index_path)
+
+    def _entry(self, name, stat, cached):
+        if cached and cached.get('size') == stat.st_size and cached.get('mtime') == stat.st_mtime:
+            return cached
+        self.scanned += 1
+        with open(os.path.join(self.path, name), 'rb') as handle:
+            family = image_family(handle)
+            digest = file_sha256(handle)
+        return dict(name=name, size=stat.st_size, mtime=stat.st_mtime, sha256=digest, family=family,
+                    type='incremental' if family == INCREMENTAL else 'full' if family is not None else None,
+                    version=name_version(name))
+
+    def _update(self, names, save=True, prune=False):
+        fd = None
+        if save:
+            try:
+                fd = os.open(self.index_path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            except OSError:
+                # a read-only directory is listed, just not indexed
+                save = False
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            index = self._load()
+            entries = {}
+            for name in names:
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except OSError:
+                    continue
+                entries[name] = self._entry(name, stat, index.get(name))
+            updated = dict(index)
+            if prune:
+                updated = {}
+            updated.update(entries)
+            if save and updated != index:
+                self._save(updated)
+            return entries
+        finally:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def scan(self, save=True):
+        """Entries of every image in the directory, sorted by name."""
+        names = [name for name in os.listdir(self.path)
+                 if not name.startswith('.') and not name.endswith('.part') and os.path.isfile(os.path.join(self.path, name))]
+        entries = self._update(names, save=save, prune=True)
+        return [entries[name] for name in sorted(entries)]
+
+    def entry(self, name, save=True):
+        """Entry of one image, without scanning the rest of the directory."""
+        entries = self._update([name], save=save)
+        if name not in entries:
+            raise IOError('%s does not exist' % os.path.join(self.path, name))
+        return entries[name]
+
+    def select(self, family, version=None, save=True):
+        """The full image for family at version, or the newest one, None when there is none."""
+        return select_image(self.scan(save=save), family, version)
+
+
+def select_image(images, family, version=None):
+    """The catalog entry of the full image for family at version, or the newest one, None when there is none."""
+    images = [entry for entry in images if entry['family'] == family]
+    if version is not None:
+        images = [entry for entry in images if entry['version'] == float(version)]
+    if not images:
+        return None
+    return max(images, key=lambda entry: (entry['version'] or 0, entry['mtime']))
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Concurrent access to many WTI OOB and PDU devices from one module.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+    HAS_FUTURES = True
+except ImportError:
+    HAS_FUTURES = False
+
+from ansible.module_utils._text import to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import DEFAULT_TIMEOUT, WtiClient, cache_token, wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_token import DEFAULT_TOKEN_TTL, TokenCache
+
+DEFAULT_WORKERS = 10
+
+DEVICE_KEYS = ('cpm_username', 'cpm_password', 'use_https', 'validate_certs', 'use_proxy')
+
+
+def fleet_argument_spec():
+    """Options shared by the modules that talk to a list of devices."""
+    device_options = dict(
+        cpm_url=dict(type='str', required=True),
+        cpm_username=dict(type='str'),
+        cpm_password=dict(type='str', no_log=True),
+        use_https=dict(type='bool'),
+        validate_certs=dict(type='bool'),
+        use_proxy=dict(type='bool'),
+    )
+    return dict(
+        cpm_url=dict(type='list', elements='str', default=[]),
+        devices=dict(type='list', elements='dict', options=device_options, default=[]),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
+        use_https=dict(type='bool', default=True),
+        validate_certs=dict(type='bool', default=True),
+        use_proxy=dict(type='bool', default=False),
+        max_workers=dict(type='int', default=DEFAULT_WORKERS),
+        timeout=dict(type='int', default=DEFAULT_TIMEOUT),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=DEFAULT_TOKEN_TTL),
+    )
+
+
+def fleet_devices(module):
+    """Merge cpm_url and devices into one list of per-device settings.
+
+    Settings a device entry leaves out are taken from the module level
+    options, so only the exceptions need to be listed per device.
+    """
+    devices = [dict(cpm_url=url) for url in module.params['cpm_url']]
+    devices.extend(dict(device) for device in module.params['devices'])
+    if not devices:
+        module.fail_json(msg='one of the following is required: cpm_url, devices', changed=False)
+    if module.params['max_workers'] < 1:
+        module.fail_json(msg='max_workers must be at least 1', changed=False)
+
+    for device in devices:
+        for key in DEVICE_KEYS:
+            if device.get(key) is None:
+                device[key] = module.params[key]
+        if device['cpm_password'] is None:
+            module.fail_json(msg='missing required arguments: cpm_password for %s' % device['cpm_url'], changed=False)
+    return devices
+
+
+def fleet_token_cache(module):
+    if not module.params['token_cache']:
+        return None
+    return TokenCache(module.params['token_cache'], module.params['token_cache_ttl'])
+
+
+def fleet_client(device, timeout=DEFAULT_TIMEOUT, token_cache=None):
+    """WtiClient for one device, on the cached API token when token_cache is given.
+
+    A device that hands out no token keeps using Basic auth, any real
+    connection problem is reported by the first request made with it.
+    """
+    client = WtiClient(device['cpm_url'], device['cpm_username'], device['cpm_password'], use_https=device['use_https'],
+                       validate_certs=device['validate_certs'], use_proxy=device['use_proxy'], timeout=timeout)
+    if token_cache is not None and not client.use_token:
+        try:
+            cache_token(client, token_cache, device['cpm_username'], device['cpm_password'])
+        except (HTTPError, URLError, SSLValidationError, ConnectionError, ValueError, IOError, OSError):
+            pass
+    return client
+
+
+def fleet_map(func, items, max_workers=DEFAULT_WORKERS):
+    """Call func for every item on at most max_workers threads, results in item order.
+
+    Without concurrent.futures, as on Python 2.7, the items are done one after the other.
+    """
+    if not items:
+        return []
+    if not HAS_FUTURES:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(func, items))
+
+
+def query_device(client, paths):
+    """GET every path over the client's single connection.
+
+    Returns (data, errors), both keyed by path. An HTTP error only fails
+    that path, a device that cannot be reached fails the remaining ones.
+    """
+    data = {}
+    errors = {}
+    try:
+        for index, path in enumerate(paths):
+            try:
+                raw = client.request(path).read()
+            except HTTPError as e:
+                errors[path] = wti_error('GET', client.url(path), e)
+                continue
+            except (URLError, SSLValidationError, ConnectionError) as e:
+                message = wti_error('GET', client.url(path), e)
+                for remaining in paths[index:]:
+                    errors[remaining] = message
+                break
+            try:
+                data[path] = json.loads(to_text(raw, errors='surrogate_or_strict'))
+            except ValueError as e:
+                errors[path] = 'GET: Invalid JSON from %s : %s' % (client.url(path), e)
+    finally:
+        client.close()
+    return data, errors
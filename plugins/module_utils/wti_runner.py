@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Run cpm_* module code in-process, without AnsiballZ packaging.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import traceback
+
+from ansible.module_utils._text import to_native
+from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+from ansible.module_utils.common.parameters import remove_values
+from ansible.module_utils.errors import UnsupportedError
+
+
+class ModuleExit(BaseException):
+    """Raised by exit_json/fail_json, like SystemExit is for AnsibleModule."""
+
+    def __init__(self, result):
+        super(ModuleExit, self).__init__()
+        self.result = result
+
+
+class InProcessModule(object):
+    """The subset of AnsibleModule the cpm_* modules use, backed by plain arguments.
+
+    Parameters are validated against the module's argument_spec the same
+    way AnsibleModule does it, and exit_json/fail_json raise ModuleExit
+    with the result instead of printing it and exiting the process.
+    """
+
+    def __init__(self, args, argument_spec, supports_check_mode=False, check_mode=False, verbosity=0, socket_path=None, log=None,
+                 name='module'):
+        self._name = name
+        self.argument_spec = argument_spec
+        self.check_mode = check_mode
+        self._verbosity = verbosity
+        self._socket_path = socket_path
+        self._log = log
+        self._warnings = []
+
+        validation = ArgumentSpecValidator(argument_spec).validate(args)
+        self.params = validation.validated_parameters
+        self.no_log_values = validation._no_log_values
+
+        if validation.error_messages:
+            msg = validation.error_messages[0]
+            if isinstance(validation.errors[0], UnsupportedError):
+                msg = "Unsupported parameters for (%s) module: %s" % (name, msg)
+            self.fail_json(msg=msg, errors=validation.error_messages)
+        if check_mode and not supports_check_mode:
+            self.exit_json(skipped=True, msg="remote module (%s) does not support check mode" % name)
+
+    def warn(self, warning):
+        self._warnings.append(warning)
+
+    def log(self, msg, log_args=None):
+        if self._log is not None:
+            self._log(msg)
+
+    def _result(self, kwargs):
+        result = dict(changed=False)
+        result.update(kwargs)
+        if self._warnings:
+            result['warnings'] = list(self._warnings)
+        result['invocation'] = {'module_args': self.params}
+        return remove_values(result, self.no_log_values)
+
+    def exit_json(self, **kwargs):
+        raise ModuleExit(self._result(kwargs))
+
+    def fail_json(self, msg, **kwargs):
+        kwargs['failed'] = True
+        kwargs['msg'] = msg
+        raise ModuleExit(self._result(kwargs))
+
+
+def run_in_process(run_module, args, check_mode=False, verbosity=0, socket_path=None, log=None):
+    """Call a module's run_module() in this process and return its result dict."""
+    def module_class(argument_spec, supports_check_mode=False):
+        return InProcessModule(args, argument_spec, supports_check_mode=supports_check_mode, check_mode=check_mode,
+                               verbosity=verbosity, socket_path=socket_path, log=log, name=run_module.__module__.rsplit('.', 1)[-1])
+
+    try:
+        returned = run_module(module_class=module_class)
+    except ModuleExit as e:
+        return e.result
+    except Exception as e:
+        return dict(failed=True, msg='MODULE FAILURE: %s' % to_native(e), exception=traceback.format_exc())
+
+    # run_module() returned without calling exit_json
+    result = dict(changed=False)
+    if isinstance(returned, dict):
+        result.update(returned)
+    return result
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# API token acquisition and controller side token cache for WTI devices.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six import string_types
+
+# Requests authenticated with an API token go to the /api/v2/token/ tree
+# of the REST API, which also hands out the token for Basic auth credentials.
+# The token request is overridable with WTI_TOKEN_PATH for firmware that
+# serves it elsewhere.
+TOKEN_API_PATH = '/api/v2/token/'
+TOKEN_PATH = os.environ.get('WTI_TOKEN_PATH', TOKEN_API_PATH)
+TOKEN_KEYS = ('token', 'apikey', 'api_key', 'key')
+DEFAULT_TOKEN_TTL = 3600
+# a device that did not hand out a token is asked again after this many seconds
+FAILURE_TTL = 60
+
+
+def find_token(payload):
+    """First non-empty string stored under one of TOKEN_KEYS in the device reply."""
+    if isinstance(payload, dict):
+        for key in TOKEN_KEYS:
+            if isinstance(payload.get(key), string_types) and payload[key]:
+                return payload[key]
+        payload = list(payload.values())
+    if isinstance(payload, list):
+        for value in payload:
+            token = find_token(value)
+            if token:
+                return token
+    return None
+
+
+def acquire_token(client):
+    """Ask the device for an API token with the client's Basic auth credentials."""
+    raw = client.request(TOKEN_PATH).read()
+    token = find_token(json.loads(to_text(raw, errors='surrogate_or_strict')))
+    if token is None:
+        raise ValueError('no token in the reply from %s' % client.url(TOKEN_PATH))
+    return token
+
+
+class TokenCache(object):
+    """API tokens kept in one small file per device and credentials.
+
+    The file name is a hash of the device URL, user name and password, so
+    the password itself is never written and a changed password simply
+    misses the cache. Each file is guarded by its own lock, so parallel
+    forks for different devices never wait on each other, and forks for
+    the same device acquire one token between them. When the device rejects
+    the credentials that is remembered for FAILURE_TTL seconds, so the forks
+    after it do not ask the device again.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TOKEN_TTL):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+
+    def _file(self, key):
+        return os.path.join(self.path, '%s.json' % key)
+
+    @staticmethod
+    def key(cpm_url, cpm_username, cpm_password):
+        return hashlib.sha256(to_bytes('\0'.join((cpm_url, cpm_username, cpm_password)), errors='surrogate_or_strict')).hexdigest()
+
+    def _lock(self, key):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+        fd = os.open(self._file(key) + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    @staticmethod
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _read(self, key):
+        try:
+            with open(self._file(key), 'r') as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('expires', 0) <= time.time():
+            return None
+        return entry
+
+    def _write(self, key, ttl, **entry):
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.token')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(entry, expires=time.time() + ttl), f)
+        os.rename(tmp, self._file(key))
+
+    def _acquire(self, key, acquire):
+        try:
+            token = acquire()
+        except Exception as e:
+            # only a rejection of the credentials is remembered, the device is asked again after anything else
+            if getattr(e, 'code', None) in (401, 403):
+                self._write(key, FAILURE_TTL, error=to_text(e))
+            raise
+        self._write(key, self.ttl, token=token)
+        return token
+
+    def get(self, key, acquire):
+        """Cached token for key, calling acquire() under the lock when there is none.
+
+        Raises ValueError while an earlier rejection by the device is cached.
+        """
+        fd = self._lock(key)
+        try:
+            entry = self._read(key)
+            if entry is None:
+                return self._acquire(key, acquire)
+            if not entry.get('token'):
+                raise ValueError('%s (retried after %d seconds)' % (entry.get('error'), FAILURE_TTL))
+            return entry['token']
+        finally:
+            self._unlock(fd)
+
+    def renew(self, key, stale, acquire):
+        """Replace a token the device rejected, unless another fork already did."""
+        fd = self._lock(key)
+        try:
+            entry = self._read(key) or {}
+            if not entry.get('token') or entry['token'] == stale:
+                return self._acquire(key, acquire)
+            return entry['token']
+        finally:
+            self._unlock(fd)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Wait for WTI devices to answer again, after a reboot or a firmware upload.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import random
+import re
+import time
+
+from ansible.module_utils._text import to_native, to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+
+STATUS_PATH = "/api/v2/status/status"
+FIRMWARE_PATH = "/api/v2/status/firmware"
+# replies that waiting longer does not change
+REJECTED = (401, 403)
+
+
+class WaitTimeout(Exception):
+    """The device was not ready before the timeout, last_error is the last failed poll if any."""
+
+    def __init__(self, msg, attempts, last_error=None):
+        super(WaitTimeout, self).__init__(msg)
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+def parse_version(version):
+    """Numeric part of a firmware version such as 8.09 or 6.60a, or None."""
+    match = re.match(r"^\d+(\.\d+)?", to_text(version or '').strip())
+    if match:
+        return float(match.group())
+    return None
+
+
+def device_ready(data, firmware=None):
+    """True when a status reply reports OK and, if given, at least the firmware version."""
+    if not isinstance(data, dict):
+        return False
+    status = data.get('status')
+    if isinstance(status, dict) and to_text(status.get('code', '0')) != '0':
+        return False
+    if firmware is None:
+        return True
+    config = data.get('config')
+    reported = parse_version(config.get('firmware') if isinstance(config, dict) else data.get('firmware'))
+    return reported is not None and reported >= parse_version(firmware)
+
+
+def backoff_delays(sleep, max_sleep, rand=random.random):
+    """Exponential backoff from sleep up to max_sleep, each delay jittered down by up to half."""
+    delay = sleep
+    while True:
+        yield delay / 2.0 + rand() * delay / 2.0
+        delay = min(max_sleep, delay * 2)
+
+
+def wait_for_device(client, timeout, firmware=None, down=False, sleep=1, max_sleep=30, poll_timeout=10,
+                    clock=time.time, pause=time.sleep):
+    """Poll the device behind client until it is ready, returning (data, attempts).
+
+    Polls status/status, or status/firmware when a firmware version is
+    awaited. With down set, the device first has to stop answering, so a
+    reboot that has not started yet is not mistaken for a finished one.
+    Raises WaitTimeout when timeout seconds pass first, and the HTTPError
+    right away when the device rejects the credentials.
+    """
+    path = FIRMWARE_PATH if firmware is not None else STATUS_PATH
+    deadline = clock() + timeout
+    delays = backoff_delays(sleep, max_sleep)
+    attempts = 0
+    last_error = None
+
+    while True:
+        attempts += 1
+        if hasattr(client.session, 'timeout'):
+            client.session.timeout = max(1, min(poll_timeout, deadline - clock()))
+        try:
+            data = client.get_json(path)
+        except HTTPError as e:
+            if e.code in REJECTED:
+                raise
+            data = None
+            last_error = to_native(e)
+        except (URLError, SSLValidationError, ConnectionError, ValueError) as e:
+            data = None
+            last_error = to_native(e)
+
+        if down:
+            if data is None:
+                down = False
+        elif device_ready(data, firmware):
+            return data, attempts
+        elif data is not None:
+            last_error = 'device replied %s' % to_text(data)
+
+        remaining = deadline - clock()
+        if remaining <= 0:
+            if down:
+                msg = 'Timeout waiting for {0} to go down after {1} attempts'.format(client.url(path), attempts)
+            elif firmware is not None:
+                msg = 'Timeout waiting for {0} to report firmware {1} after {2} attempts'.format(client.url(path), firmware, attempts)
+            else:
+                msg = 'Timeout waiting for {0} to answer after {1} attempts'.format(client.url(path), attempts)
+            if last_error:
+                msg = '{0} : {1}'.format(msg, last_error)
+            raise WaitTimeout(msg, attempts, last_error)
+        pause(min(next(delays), remaining))
@@ -0,0 +1,217 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to find and prune WTI configuration backups in a backup catalog.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_backup_catalog
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Find and prune WTI configuration backups
+description:
+    - "Look up the WTI configuration backups recorded in the C(.wti_backup_catalog.jsonl) catalog of a backup directory, by device,
+       unit type and time, without listing the directory or reading the backups."
+    - "Optionally remove the backups beyond a retention of I(retain_count) backups or I(retain_days) days per device."
+    - "The catalog is written by M(wti.remote.cpm_fleet_backup), and by M(wti.remote.cpm_config_backup) with I(catalog)."
+options:
+    cpm_path:
+        description:
+            - The directory of the backups and the catalog.
+        type: path
+        required: false
+        default: "/tmp/"
+    cpm_url:
+        description:
+            - Only return the backups of these devices.
+        type: list
+        elements: str
+        required: false
+        default: []
+    unit_type:
+        description:
+            - Only return the backups of these unit types, for example C(VMR-8HD20-1).
+        type: list
+        elements: str
+        required: false
+        default: []
+    since:
+        description:
+            - Only return the backups saved at or after this local time, for example C(2026-10-11) or C(2026-10-11T00:00:00).
+        type: str
+        required: false
+    until:
+        description:
+            - Only return the backups saved at or before this local time.
+        type: str
+        required: false
+    latest:
+        description:
+            - Only return the newest of the matching backups of every device.
+        type: bool
+        required: false
+        default: false
+    retain_count:
+        description:
+            - The number of newest backups to keep per device when I(prune) is set, at least C(1).
+            - The newest backup of a device is never removed, also when only I(retain_days) is set.
+        type: int
+        required: false
+    retain_days:
+        description:
+            - Keep every backup of the last this many days when I(prune) is set, besides the I(retain_count) newest ones.
+            - A backup counts from the last time the device still had that configuration, its C(last_seen), not from when it was written.
+        type: int
+        required: false
+    prune:
+        description:
+            - Remove the backups of the devices in I(cpm_url) and I(unit_type), or of every device, that are neither among
+              the I(retain_count) newest ones nor younger than I(retain_days), and compact the catalog.
+            - Sections of a backup store that no backup uses anymore are removed too.
+        type: bool
+        required: false
+        default: false
+notes:
+ - Backups removed from the directory by other means stay in the catalog until the next I(prune).
+ - In check mode the backups that would be removed are returned in C(pruned), nothing is removed.
+"""
+
+EXAMPLES = """
+- name: Find the latest backup of a WTI device
+  cpm_backup_catalog:
+    cpm_path: "/srv/wti/backup"
+    cpm_url:
+      - "rest.wti.com"
+    latest: true
+  register: latest
+
+- name: Find every backup of a unit type from last week
+  cpm_backup_catalog:
+    cpm_path: "/srv/wti/backup"
+    unit_type:
+      - "VMR-8HD20-1"
+    since: "2026-10-11"
+    until: "2026-10-18"
+
+- name: Keep the last 7 backups and the backups of the last 30 days of every device
+  cpm_backup_catalog:
+    cpm_path: "/srv/wti/backup"
+    retain_count: 7
+    retain_days: 30
+    prune: true
+"""
+
+RETURN = """
+backups:
+    description: The matching backups, oldest first, after I(prune).
+    returned: always
+    type: list
+    sample: [ { "file": "VMR-8HD20-1-rest.wti.com-2026-10-18T02:00:03.xml.gz", "url": "rest.wti.com", "unit_type": "VMR-8HD20-1",
+                "saved": 1760752803.1, "last_seen": 1760839205.4, "size": 329439, "stored_size": 31207, "compress": "gzip",
+                "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", "backend": "files" } ]
+pruned:
+    description: The backups removed by I(prune), or that would be removed in check mode.
+    returned: always
+    type: list
+    sample: [ { "file": "VMR-8HD20-1-rest.wti.com-2026-08-01T02:00:04.xml.gz", "url": "rest.wti.com", "unit_type": "VMR-8HD20-1",
+                "saved": 1754013604.2, "last_seen": 1754013604.2, "size": 329120, "stored_size": 31188, "compress": "gzip",
+                "sha256": "60303ae22b998861bce3b28f33eec1be758a213c86c93c076dbe9f558c11c752", "backend": "files" } ]
+catalog:
+    description: The path of the catalog file.
+    returned: always
+    type: str
+    sample: "/srv/wti/backup/.wti_backup_catalog.jsonl"
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import BackupCatalog, expired, parse_time
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = dict(
+        cpm_path=dict(type='path', default="/tmp/"),
+        cpm_url=dict(type='list', elements='str', default=[]),
+        unit_type=dict(type='list', elements='str', default=[]),
+        since=dict(type='str', required=False),
+        until=dict(type='str', required=False),
+        latest=dict(type='bool', default=False),
+        retain_count=dict(type='int', required=False),
+        retain_days=dict(type='int', required=False),
+        prune=dict(type='bool', default=False)
+    )
+
+    result = dict(
+        changed=False,
+        backups=[],
+        pruned=[]
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    if module.params['prune'] and module.params['retain_count'] is None and module.params['retain_days'] is None:
+        module.fail_json(msg='prune requires retain_count or retain_days', changed=False)
+    if module.params['retain_count'] is not None and module.params['retain_count'] < 1:
+        module.fail_json(msg='retain_count must be at least 1', changed=False)
+    if module.params['retain_days'] is not None and module.params['retain_days'] < 0:
+        module.fail_json(msg='retain_days must not be negative', changed=False)
+
+    times = {}
+    for key in ('since', 'until'):
+        if module.params[key]:
+            try:
+                times[key] = parse_time(module.params[key])
+            except ValueError as e:
+                module.fail_json(msg='{0}: {1}'.format(key, to_native(e)), changed=False)
+
+    catalog = BackupCatalog(module.params['cpm_path'])
+    result['catalog'] = catalog.file
+    urls = set(module.params['cpm_url'])
+    unit_types = set(module.params['unit_type'])
+
+    try:
+        if module.params['prune']:
+            result['pruned'] = expired(catalog.query(urls, unit_types), module.params['retain_count'], module.params['retain_days'])
+            catalog.prune(result['pruned'], save=not module.check_mode)
+            result['changed'] = bool(result['pruned'])
+        result['backups'] = catalog.query(urls, unit_types, since=times.get('since'), until=times.get('until'), latest=module.params['latest'])
+    except (IOError, OSError, ValueError) as e:
+        module.fail_json(msg='CATALOG: Could not use the backup catalog {0} : {1}'.format(catalog.file, to_native(e)), **result)
+
+    if module.check_mode and result['pruned']:
+        pruned = set(entry['file'] for entry in result['pruned'])
+        result['backups'] = [entry for entry in result['backups'] if entry['file'] not in pruned]
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
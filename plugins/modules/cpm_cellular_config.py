@@ -40,17 +40,17 @@ options:
         description:
             - This is the URL of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     cpm_username:
         description:
             - This is the Username of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     cpm_password:
         description:
             - This is the Password of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     use_https:
         description:
             - Designates to use an https connection or http connection.
@@ -166,8 +166,21 @@ options:
         type: str
         required: false
 
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
 notes:
   - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.
+  - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
 """
 
 EXAMPLES = """
@@ -236,14 +249,11 @@ data:
               "bandclass": "EUTRAN-4", "band": "4", "frequency": "1700", "channel": "2100"}
 """
 
-import base64
 import json
-import socket
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
-from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_request
 
 
 def assemble_json(cpmmodule, existing):
@@ -525,13 +535,13 @@ def assemble_json(cpmmodule, existing):
     return json_load
 
 
-def run_module():
+def run_module(module_class=None):
     # define the available arguments/parameters that a user can pass to
     # the module
     module_args = dict(
-        cpm_url=dict(type='str', required=True),
-        cpm_username=dict(type='str', required=True),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
         apn=dict(type='str', required=False, default=None),
         cellenable=dict(type='int', required=False, default=None, choices=[0, 1]),
         wof_host1=dict(type='str', required=False, default=None),
@@ -557,7 +567,9 @@ def run_module():
         ipthru_sshterm=dict(type='int', required=False, default=None),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
     )
 
     result = dict(
@@ -565,37 +577,13 @@ def run_module():
         data=''
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
-    auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                   errors='surrogate_or_strict')))
-
-    if module.params['use_https'] is True:
-        protocol = "https://"
-    else:
-        protocol = "http://"
+    client = wti_client(module)
 
-    fullurl = ("%s%s/api/v2/config/cellular" % (protocol, to_native(module.params['cpm_url'])))
+    path = "/api/v2/config/cellular"
     method = 'GET'
-    try:
-        response = open_url(fullurl, data=None, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
-
-    except HTTPError as e:
-        fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='GET: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except socket.timeout as e:
-        fail_json = dict(msg='POST: Connection timed out for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='GET: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='GET: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+    response = wti_request(module, client, path, method=method)
 
     result['data'] = response.read()
     payload = assemble_json(module, json.loads(result['data']))
@@ -605,28 +593,10 @@ def run_module():
             result['changed'] = True
     else:
         if payload is not None:
-            fullurl = ("%s%s/api/v2/config/cellular" % (protocol, to_native(module.params['cpm_url'])))
+            path = "/api/v2/config/cellular"
             method = 'POST'
 
-            try:
-                response = open_url(fullurl, data=payload, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                                    headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
-
-            except HTTPError as e:
-                fail_json = dict(msg='POST: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except URLError as e:
-                fail_json = dict(msg='POST: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except socket.timeout as e:
-                fail_json = dict(msg='POST: Connection timed out for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except SSLValidationError as e:
-                fail_json = dict(msg='POST: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except ConnectionError as e:
-                fail_json = dict(msg='POST: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
+            response = wti_request(module, client, path, method=method, data=payload)
 
             result['changed'] = True
             result['data'] = json.loads(response.read())
@@ -38,23 +38,30 @@ options:
         description:
             - This is the URL of the WTI device to get the parameters from.
         type: str
-        required: true
+        required: false
     cpm_username:
         description:
             - This is the Username of the WTI device to get the parameters from.
         type: str
-        required: true
+        required: false
     cpm_password:
         description:
             - This is the Password of the WTI device to get the parameters from.
         type: str
-        required: true
+        required: false
     cpm_path:
         description:
             - This is the directory path to store the WTI device configuration file.
         type: str
         required: false
         default: "/tmp/"
+    catalog:
+        description:
+            - Record the backup in the C(.wti_backup_catalog.jsonl) catalog in I(cpm_path), with the device, unit type, time,
+              size and hash, for M(wti.remote.cpm_backup_catalog).
+        type: bool
+        required: false
+        default: false
     use_https:
         description:
             - Designates to use an https connection or http connection.
@@ -73,8 +80,21 @@ options:
         type: bool
         required: false
         default: false
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
 notes:
   - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+  - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
 """
 
 EXAMPLES = """
@@ -85,6 +105,14 @@ EXAMPLES = """
     cpm_password: "super"
     use_https: true
     validate_certs: false
+
+- name: Back up a WTI device and record it in the backup catalog
+  cpm_config_backup:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    cpm_path: "/srv/wti/backup/"
+    catalog: true
 """
 
 RETURN = """
@@ -103,13 +131,14 @@ data:
           text: "ok"
 """
 
-import base64
 import datetime
+import os
+import time
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
-from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import BackupCatalog, canonical_sha256
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_request
 
 
 def get_unit_type(filedata):
@@ -129,17 +158,20 @@ def normalize_string(filedata):
     return (filedata)
 
 
-def run_module():
+def run_module(module_class=None):
     # define the available arguments/parameters that a user can pass to
     # the module
     module_args = dict(
-        cpm_url=dict(type='str', required=True),
-        cpm_username=dict(type='str', required=True),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
         cpm_path=dict(type='str', default="/tmp/"),
+        catalog=dict(type='bool', default=False),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
     )
 
     result = dict(
@@ -147,45 +179,29 @@ def run_module():
         data=''
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
-
-    auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                   errors='surrogate_or_strict')))
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
-    if module.params['use_https'] is True:
-        protocol = "https://"
-    else:
-        protocol = "http://"
+    client = wti_client(module)
 
-    fullurl = ("%s%s/cgi-bin/gethtml?formWTIDownloadConfigXML.html" % (protocol, to_native(module.params['cpm_url'])))
+    path = "/cgi-bin/gethtml?formWTIDownloadConfigXML.html"
 
-    try:
-        response = open_url(fullurl, data=None, method='GET', validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers={'Content-Type': 'application/xml', 'Authorization': "Basic %s" % auth})
-
-    except HTTPError as e:
-        fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='GET: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='GET: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='GET: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+    response = wti_request(module, client, path, method='GET', content_type='application/xml')
 
     json_string = response.read()
 
     try:
-        f = open(normalize_string(to_native(module.params['cpm_path'])) + get_unit_type(to_native(json_string)) + "-" + to_native(module.params['cpm_url']) +
-                 "-" + datetime.datetime.now().replace(microsecond=0).isoformat() + ".xml", "wb")
+        saved = time.time()
+        filename = normalize_string(to_native(module.params['cpm_path'])) + get_unit_type(to_native(json_string)) + "-" + \
+            to_native(module.params['cpm_url']) + "-" + datetime.datetime.fromtimestamp(saved).replace(microsecond=0).isoformat() + ".xml"
+        f = open(filename, "wb")
         f.write(json_string)
         f.close()
-        json_string = '{\"status\": { \"code\": \"0\", \"text\": \"ok\", \"savedfilename\": \"%s%s-%s-%s.xml\"  }}' \
-                      % (normalize_string(to_native(module.params['cpm_path'])), get_unit_type(to_native(json_string)),
-                         to_native(module.params['cpm_url']), datetime.datetime.now().replace(microsecond=0).isoformat())
+        if module.params['catalog']:
+            BackupCatalog(os.path.dirname(filename)).record([dict(file=os.path.basename(filename), url=to_native(module.params['cpm_url']),
+                                                                  unit_type=get_unit_type(to_native(json_string)), saved=saved, last_seen=saved,
+                                                                  size=len(json_string), stored_size=len(json_string), compress='none',
+                                                                  sha256=canonical_sha256(json_string))])
+        json_string = '{\"status\": { \"code\": \"0\", \"text\": \"ok\", \"savedfilename\": \"%s\"  }}' % filename
 
     except Exception as e:
         json_string = "{\"status\": { \"code\": \"1\", \"text\": \"error: " + str(e) + "\", \"savedfilename\": \"\"  }}"
@@ -38,17 +38,17 @@ options:
         description:
             - This is the URL of the WTI device to get the parameters from.
         type: str
-        required: true
+        required: false
     cpm_username:
         description:
             - This is the Username of the WTI device to get the parameters from.
         type: str
-        required: true
+        required: false
     cpm_password:
         description:
             - This is the Password of the WTI device to get the parameters from.
         type: str
-        required: true
+        required: false
     cpm_path:
         description:
             - This is the directory path to the existing the WTI device configuration file.
@@ -58,8 +58,17 @@ options:
     cpm_filename:
         description:
             - This is the filename of the existing WTI device configuration file.
+            - Files ending in C(.gz) or C(.xz), as written by M(wti.remote.cpm_fleet_backup), are decompressed while they are sent.
+            - With I(backup_store), the C(file) of the backup returned by M(wti.remote.cpm_fleet_backup), the path of its manifest.
         type: str
         required: true
+    backup_store:
+        description:
+            - I(cpm_path) is a backup store written by M(wti.remote.cpm_fleet_backup) with C(backend=store),
+              the configuration file is rebuilt from the sections in the store.
+        type: bool
+        required: false
+        default: false
     use_https:
         description:
             - Designates to use an https connection or http connection.
@@ -78,8 +87,21 @@ options:
         type: bool
         required: false
         default: false
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
 notes:
   - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+  - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
 """
 
 EXAMPLES = """
@@ -92,6 +114,15 @@ EXAMPLES = """
     cpm_filename: "wti-192-10-10-239-2020-02-13T16-05-57-xml"
     use_https: true
     validate_certs: false
+
+- name: Restore a WTI device from a backup store
+  cpm_config_restore:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    cpm_path: "/srv/wti/store"
+    cpm_filename: "manifests/nonexist.wti.com/2026-10-18T02:00:03.json"
+    backup_store: true
 """
 
 RETURN = """
@@ -116,12 +147,10 @@ data:
           unittimestamp: "2020-02-14T00:18:57+00:00"
 """
 
-import base64
-
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
-from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import RESTORE_PATH, BackupBody, BackupStore
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_request
 
 
 def get_unit_type(filedata):
@@ -135,18 +164,21 @@ def get_unit_type(filedata):
     return (header)
 
 
-def run_module():
+def run_module(module_class=None):
     # define the available arguments/parameters that a user can pass to
     # the module
     module_args = dict(
-        cpm_url=dict(type='str', required=True),
-        cpm_username=dict(type='str', required=True),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
         cpm_path=dict(type='str', default="/tmp/"),
         cpm_filename=dict(type='str', required=True),
+        backup_store=dict(type='bool', default=False),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
     )
 
     result = dict(
@@ -154,45 +186,26 @@ def run_module():
         data=''
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
+    # the file is streamed from disk while it is sent, decompressed or rebuilt from a backup store on the way
     try:
-        f = open(to_native(module.params['cpm_path']) + to_native(module.params['cpm_filename']), "rb")
-        cszData = f.read()
-        f.close()
+        if module.params['backup_store']:
+            body = BackupBody(to_native(module.params['cpm_filename']), store=BackupStore(to_native(module.params['cpm_path'])))
+        else:
+            body = BackupBody(to_native(module.params['cpm_path']) + to_native(module.params['cpm_filename']))
     except Exception as e:
         json_string = "{\"status\": { \"code\": \"1\", \"text\": \"error: " + str(e) + "\" }}"
         result['data'] = json_string
         module.exit_json(**result)
 
-    auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                   errors='surrogate_or_strict')))
-
-    if module.params['use_https'] is True:
-        protocol = "https://"
-    else:
-        protocol = "http://"
-
-    fullurl = ("%s%s/cgi-bin/getfile" % (protocol, to_native(module.params['cpm_url'])))
+    client = wti_client(module)
 
     try:
-        xmlfile = open(to_native(module.params['cpm_path']) + to_native(module.params['cpm_filename']), 'rb')
-        xmlfile.close()
-        response = open_url(fullurl, data=cszData, method='POST', validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers={'Content-Type': 'application/xml', 'Authorization': "Basic %s" % auth})
-
-    except HTTPError as e:
-        fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='GET: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='GET: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='GET: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+        response = wti_request(module, client, RESTORE_PATH, method='POST', data=body, content_type='application/xml',
+                               headers={'Content-Length': str(body.length)})
+    finally:
+        body.close()
 
     result['data'] = response.read()
 
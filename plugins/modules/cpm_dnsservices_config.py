@@ -32,7 +32,7 @@ options:
         description:
             - This is the URL of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     cpm_username:
         description:
             - This is the Username of the WTI device to send the module. If this value
@@ -44,7 +44,7 @@ options:
             - This is the Password of the WTI device to send the module. If the
             - cpm_username is blank, this parameter is presumed to be a User Token.
         type: str
-        required: true
+        required: false
     use_https:
         description:
             - Designates to use an https connection or http connection.
@@ -76,8 +76,21 @@ options:
         type: list
         elements: str
         required: true
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
 notes:
   - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.
+  - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
 """
 
 EXAMPLES = """
@@ -134,13 +147,11 @@ data:
                "dnsserver4": [{"ip": ""}]}]}
 """
 
-import base64
 import json
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
-from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_request
 
 
 def assemble_json(cpmmodule, existing_interface):
@@ -192,18 +203,20 @@ def assemble_json(cpmmodule, existing_interface):
     return json_load
 
 
-def run_module():
+def run_module(module_class=None):
     # define the available arguments/parameters that a user can pass to
     # the module
     module_args = dict(
-        cpm_url=dict(type='str', required=True),
+        cpm_url=dict(type='str', required=False),
         cpm_username=dict(type='str', required=False),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_password=dict(type='str', required=False, no_log=True),
         index=dict(type='list', elements='int', required=False, default=None),
         dnsservers=dict(type='list', elements='str', required=True),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
     )
 
     result = dict(
@@ -211,39 +224,13 @@ def run_module():
         data=''
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
-    if (len(to_native(module.params['cpm_username'])) > 0):
-        auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                       errors='surrogate_or_strict')))
-        header = {'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth}
-    else:
-        header = {'Content-Type': 'application/json', 'X-WTI-API-KEY': "%s" % (to_native(module.params['cpm_password']))}
-
-    if module.params['use_https'] is True:
-        transport = "https://"
-    else:
-        transport = "http://"
+    client = wti_client(module)
 
-    fullurl = ("%s%s/api/v2%s/status/dnsservices" % (transport, to_native(module.params['cpm_url']),
-               "" if len(to_native(module.params['cpm_username'])) else "/token"))
+    path = "/api/v2/status/dnsservices"
     method = 'GET'
-    try:
-        response = open_url(fullurl, data=None, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers=header)
-
-    except HTTPError as e:
-        fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='GET: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='GET: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='GET: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+    response = wti_request(module, client, path, method=method)
 
     result['data'] = json.loads(response.read())
     payload = assemble_json(module, result['data'])
@@ -253,26 +240,10 @@ def run_module():
             result['changed'] = True
     else:
         if (payload is not None) and (len(payload) > 0):
-            fullurl = ("%s%s/api/v2%s/config/dnsservices" % (transport, to_native(module.params['cpm_url']),
-                       "" if len(to_native(module.params['cpm_username'])) else "/token"))
+            path = "/api/v2/config/dnsservices"
             method = 'POST'
 
-            try:
-                response = open_url(fullurl, data=payload, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                                    headers=header)
-
-            except HTTPError as e:
-                fail_json = dict(msg='POST: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except URLError as e:
-                fail_json = dict(msg='POST: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except SSLValidationError as e:
-                fail_json = dict(msg='POST: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
-            except ConnectionError as e:
-                fail_json = dict(msg='POST: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                module.fail_json(**fail_json)
+            response = wti_request(module, client, path, method=method, data=payload)
 
             result['changed'] = True
             result['data'] = json.loads(response.read())
@@ -0,0 +1,287 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to gather facts from WTI OOB and PDU devices.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_facts
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Gather facts from WTI OOB and PDU devices
+description:
+    - "Gather status and configuration facts from WTI OOB and PDU devices in one task."
+    - "The selected REST endpoints are read in parallel and returned as C(wti_*) facts."
+options:
+    cpm_url:
+        description:
+            - This is the URL of the WTI device to send the module.
+        type: str
+        required: false
+    cpm_username:
+        description:
+            - This is the Username of the WTI device to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI device to send the module.
+        type: str
+        required: false
+    gather_subset:
+        description:
+            - The fact subsets to gather.
+            - C(all) gathers every subset, C(min) gathers C(status), C(firmware) and C(hostname).
+        type: list
+        elements: str
+        required: false
+        default: ["all"]
+        choices: ["all", "min", "status", "firmware", "power", "current", "temperature", "alarms", "interface", "hostname", "timedate"]
+    gather_exclude:
+        description:
+            - The fact subsets to leave out of I(gather_subset).
+        type: list
+        elements: str
+        required: false
+        default: []
+        choices: ["status", "firmware", "power", "current", "temperature", "alarms", "interface", "hostname", "timedate"]
+    max_workers:
+        description:
+            - The maximum number of endpoints read at the same time.
+        type: int
+        required: false
+        default: 10
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    cache_ttl:
+        description:
+            - Seconds a response is reused from the controller side response cache, instead of asking the device again.
+            - The default C(0) disables the cache.
+        type: int
+        required: false
+        default: 0
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
+ - A subset the device does not support, for example C(temperature) on a unit without a sensor, is skipped with a warning.
+"""
+
+EXAMPLES = """
+- name: Gather all facts from a WTI device
+  cpm_facts:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    use_https: true
+    validate_certs: false
+
+- name: Gather only the status and firmware facts
+  cpm_facts:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    gather_subset:
+      - status
+      - firmware
+
+- name: Gather everything except the power measurements
+  cpm_facts:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    gather_exclude:
+      - power
+      - current
+"""
+
+RETURN = """
+ansible_facts:
+    description: The JSON returned by the endpoint of every gathered subset.
+    returned: always
+    type: complex
+    contains:
+        wti_status:
+            description: The output of C(/api/v2/status/status).
+            returned: when the status subset is gathered
+            type: dict
+            sample: { "siteid": "Lab1", "serialnumber": "ABC123", "status": { "code": "0", "text": "OK" } }
+        wti_firmware:
+            description: The output of C(/api/v2/status/firmware).
+            returned: when the firmware subset is gathered
+            type: dict
+            sample: { "config": { "firmware": "6.58", "family": "1" }, "status": { "code": "0", "text": "OK" } }
+        wti_power:
+            description: The output of C(/api/v2/status/power).
+            returned: when the power subset is gathered
+            type: dict
+        wti_current:
+            description: The output of C(/api/v2/status/current).
+            returned: when the current subset is gathered
+            type: dict
+        wti_temperature:
+            description: The output of C(/api/v2/status/temperature).
+            returned: when the temperature subset is gathered
+            type: dict
+        wti_alarms:
+            description: The output of C(/api/v2/status/alarms).
+            returned: when the alarms subset is gathered
+            type: dict
+        wti_interface:
+            description: The output of C(/api/v2/config/interface).
+            returned: when the interface subset is gathered
+            type: dict
+        wti_hostname:
+            description: The output of C(/api/v2/config/hostname).
+            returned: when the hostname subset is gathered
+            type: dict
+        wti_timedate:
+            description: The output of C(/api/v2/config/timedate).
+            returned: when the timedate subset is gathered
+            type: dict
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import DEFAULT_WORKERS, fleet_map
+
+SUBSETS = dict(
+    status="/api/v2/status/status",
+    firmware="/api/v2/status/firmware",
+    power="/api/v2/status/power",
+    current="/api/v2/status/current",
+    temperature="/api/v2/status/temperature",
+    alarms="/api/v2/status/alarms",
+    interface="/api/v2/config/interface",
+    hostname="/api/v2/config/hostname",
+    timedate="/api/v2/config/timedate",
+)
+
+MIN_SUBSETS = ["status", "firmware", "hostname"]
+
+
+def gathered_subsets(gather_subset, gather_exclude):
+    subsets = set()
+    for subset in gather_subset:
+        if subset == 'all':
+            subsets.update(SUBSETS)
+        elif subset == 'min':
+            subsets.update(MIN_SUBSETS)
+        else:
+            subsets.add(subset)
+    return sorted(subsets - set(gather_exclude))
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = dict(
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
+        gather_subset=dict(type='list', elements='str', default=['all'], choices=['all', 'min'] + sorted(SUBSETS)),
+        gather_exclude=dict(type='list', elements='str', default=[], choices=sorted(SUBSETS)),
+        max_workers=dict(type='int', default=DEFAULT_WORKERS),
+        use_https=dict(type='bool', default=True),
+        validate_certs=dict(type='bool', default=True),
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600),
+        cache_ttl=dict(type='int', default=0)
+    )
+
+    result = dict(
+        changed=False,
+        ansible_facts={}
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    if module.params['max_workers'] < 1:
+        module.fail_json(msg='max_workers must be at least 1', changed=False)
+
+    client = wti_client(module)
+    subsets = gathered_subsets(module.params['gather_subset'], module.params['gather_exclude'])
+
+    # every worker gets its own connection, a session is not shared between threads
+    def gather(subset):
+        worker = client.copy()
+        try:
+            return worker.get_json(SUBSETS[subset]), None
+        except (HTTPError, URLError, SSLValidationError, ConnectionError, ValueError) as e:
+            return None, e
+        finally:
+            worker.close()
+
+    for subset, (data, error) in zip(subsets, fleet_map(gather, subsets, module.params['max_workers'])):
+        if error is None:
+            result['ansible_facts']['wti_%s' % subset] = data
+        elif isinstance(error, HTTPError):
+            module.warn('Skipping the %s facts, %s' % (subset, wti_error('GET', client.url(SUBSETS[subset]), error)))
+        elif isinstance(error, ValueError):
+            module.fail_json(msg='GET: Invalid JSON from %s : %s' % (client.url(SUBSETS[subset]), to_native(error)), changed=False)
+        else:
+            module.fail_json(msg=wti_error('GET', client.url(SUBSETS[subset]), error), changed=False)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
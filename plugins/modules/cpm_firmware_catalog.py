@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to list the WTI firmware images in a local directory.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_firmware_catalog
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: List the WTI firmware images in a local directory
+description:
+    - "List the family, type, version, size and SHA-256 of every WTI OS image in a directory on the controller,
+       and optionally pick the image to upgrade a device family with."
+    - "The details are kept in a C(.wti_firmware_index.json) file in the directory. An image is only read again when its size
+       or modification time changed, so directories with many images are listed without reading them every time."
+options:
+    path:
+        description:
+            - The directory of the OS images.
+        type: path
+        required: true
+    family:
+        description:
+            - Pick the newest full image of this family, Console (1) or Power (0), and return it in C(image).
+        type: int
+        required: false
+        choices: [ 0, 1 ]
+    version:
+        description:
+            - Pick the image of this firmware version instead of the newest one, requires I(family).
+        type: float
+        required: false
+notes:
+ - The family and type of an image are read from the image itself, the version is taken from the file name, for example
+   C(wti_tsm_8.09.bin). Images without a version in their file name are listed with a C(version) of C(null).
+ - Files that are no WTI OS image are listed with a C(family) and C(type) of C(null).
+ - The index is not written in check mode.
+"""
+
+EXAMPLES = """
+- name: List the WTI firmware images in a directory
+  cpm_firmware_catalog:
+    path: "/srv/wti/firmware"
+  register: catalog
+
+- name: Pick the console image for firmware 8.09
+  cpm_firmware_catalog:
+    path: "/srv/wti/firmware"
+    family: 1
+    version: 8.09
+  register: console_image
+"""
+
+RETURN = """
+images:
+    description: Every file in the directory, sorted by name.
+    returned: always
+    type: list
+    sample: [ { "name": "wti_tsm_8.09.bin", "family": 1, "type": "full", "version": 8.09, "size": 41943040,
+                "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", "mtime": 1760000000.0 } ]
+image:
+    description: The image picked for I(family) and I(version), C(null) when there is none.
+    returned: when I(family) is set
+    type: dict
+    sample: { "name": "wti_tsm_8.09.bin", "family": 1, "type": "full", "version": 8.09, "size": 41943040,
+              "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", "mtime": 1760000000.0 }
+index:
+    description: The path of the index file.
+    returned: always
+    type: str
+    sample: "/srv/wti/firmware/.wti_firmware_index.json"
+scanned:
+    description: The number of images read in this run, images that did not change since the index was written are not read.
+    returned: always
+    type: int
+    sample: 1
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import FirmwareCatalog, select_image
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = dict(
+        path=dict(type='path', required=True),
+        family=dict(type='int', required=False, choices=[0, 1]),
+        version=dict(type='float', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        images=[],
+        scanned=0
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    if module.params['version'] is not None and module.params['family'] is None:
+        module.fail_json(msg='version requires family', changed=False)
+
+    catalog = FirmwareCatalog(module.params['path'])
+    result['index'] = catalog.index_path
+    save = not module.check_mode
+
+    try:
+        result['images'] = catalog.scan(save=save)
+        if module.params['family'] is not None:
+            result['image'] = select_image(result['images'], module.params['family'], module.params['version'])
+    except (IOError, OSError) as e:
+        module.fail_json(msg='CATALOG: Could not read the firmware catalog {0} : {1}'.format(catalog.path, to_native(e)), **result)
+
+    result['scanned'] = catalog.scanned
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
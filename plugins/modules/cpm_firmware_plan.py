@@ -0,0 +1,353 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to plan the firmware upgrade of many WTI OOB and PDU devices.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_firmware_plan
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Plan the firmware upgrade of many WTI OOB and PDU devices
+description:
+    - "Show what M(wti.remote.cpm_firmware_update) would do on every device of a list, without downloading or uploading an image."
+    - "The firmware of every device is read concurrently and compared against one my.wti.com version lookup per family,
+       the plan of each device lists the full OS image or the incremental parts to upload, their sizes and where the device reboots."
+options:
+    cpm_url:
+        description:
+            - List of URLs of the WTI devices to plan for.
+        type: list
+        elements: str
+        required: false
+        default: []
+    devices:
+        description:
+            - List of WTI devices to plan for, for devices that need settings other than the module level ones.
+            - Settings that are left out are taken from the module level options.
+        type: list
+        elements: dict
+        required: false
+        default: []
+        suboptions:
+            cpm_url:
+                description:
+                    - This is the URL of the WTI device.
+                type: str
+                required: true
+            cpm_username:
+                description:
+                    - This is the Username of the WTI device.
+                type: str
+            cpm_password:
+                description:
+                    - This is the Password of the WTI device.
+                type: str
+            use_https:
+                description:
+                    - Designates to use an https connection or http connection.
+                type: bool
+            validate_certs:
+                description:
+                    - If false, SSL certificates will not be validated.
+                type: bool
+            use_proxy:
+                description:
+                    - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+                type: bool
+    cpm_username:
+        description:
+            - This is the Username of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI devices to send the module.
+        type: str
+        required: false
+    use_force:
+        description:
+            - Plan the upgrade even for devices that do not need it, as M(wti.remote.cpm_firmware_update) does.
+        type: bool
+        required: false
+        default: false
+    ignoreincremental:
+        description:
+            - If there are any incremental upgrades, do not plan them
+        type: int
+        required: false
+        default: 0
+        choices: [ 0, 1 ]
+    bootafterincremental:
+        description:
+            - If set to 1, the WTI device reboots after the last incremental part
+        type: int
+        required: false
+        default: 1
+        choices: [ 0, 1 ]
+    max_console_version:
+        description:
+            - If defined, this will be the maximum version that will be searched for all console units
+        type: float
+        required: false
+    max_power_version:
+        description:
+            - If defined, this will be the maximum version that will be searched for all power units
+        type: float
+        required: false
+    image_sizes:
+        description:
+            - Ask my.wti.com for the size of every image the lookup does not list a size for, once per image.
+        type: bool
+        required: false
+        default: true
+    version_cache_ttl:
+        description:
+            - Seconds the my.wti.com version information of a device family is reused on the controller,
+              also by M(wti.remote.cpm_firmware_update). The default C(0) disables the cache.
+            - The cache is kept in C(~/.ansible/wti_version_cache), or the directory in the C(WTI_VERSION_CACHE) environment variable.
+        type: int
+        required: false
+        default: 0
+    version_file:
+        description:
+            - Local JSON file to read the version information from instead of my.wti.com, for sites without internet access.
+            - It holds a C(version.aspx) reply, or replies keyed by family (C("0") for power, C("1") for console).
+        type: path
+        required: false
+    max_workers:
+        description:
+            - The maximum number of devices queried at the same time.
+        type: int
+        required: false
+        default: 10
+    timeout:
+        description:
+            - Seconds to wait for a device to connect or answer a request.
+        type: int
+        required: false
+        default: 10
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - Devices that cannot be reached do not fail the task, they are listed in C(errors).
+ - Run this module once, for example with C(run_once) or against C(localhost), not once per device.
+"""
+
+EXAMPLES = """
+- name: Plan the firmware upgrade of all WTI devices in the inventory
+  cpm_firmware_plan:
+    cpm_url: "{{ groups['wti'] | map('extract', hostvars, 'ansible_host') | list }}"
+    cpm_username: "super"
+    cpm_password: "super"
+    max_workers: 50
+    validate_certs: false
+  run_once: true
+  register: plan
+
+- name: Show how many devices take a full image
+  debug:
+    msg: "{{ plan.summary.full }} devices, {{ plan.download_size }} bytes to download"
+  run_once: true
+"""
+
+RETURN = """
+plans:
+    description: The upgrade plan of every device, keyed by device URL.
+    returned: always
+    type: dict
+    sample: { "rest.wti.com": { "action": "incremental", "current": 8.09, "target": 8.09, "family": 1, "size": 1048576,
+              "steps": [ { "type": "incremental", "title": "Security Update", "vpart": 3, "vinc": 2,
+                           "imageurl": "https://my.wti.com/update/inc3.bin", "size": 1048576, "sha256": null,
+                           "reboot": true } ] } }
+errors:
+    description: The error of every device that could not be planned, keyed by device URL.
+    returned: always
+    type: dict
+    sample: { "192.168.0.158": "GET: Error connecting to https://192.168.0.158/api/v2/status/firmware : timed out" }
+summary:
+    description: The number of devices per planned action, C(none), C(full), C(incremental) and C(unsupported), and C(failed).
+    returned: always
+    type: dict
+    sample: { "none": 920, "full": 60, "incremental": 18, "unsupported": 1, "failed": 1 }
+images:
+    description: Every image in the plans, with its size and the number of devices it is uploaded to.
+    returned: always
+    type: list
+    sample: [ { "imageurl": "https://my.wti.com/update/inc3.bin", "size": 1048576, "devices": 18 } ]
+download_size:
+    description: The bytes to download when every image is downloaded once, images of unknown size not counted.
+    returned: always
+    type: int
+    sample: 1048576
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import WtiSession, wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import CONSOLE, VersionCache, image_size, lookup_versions
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import plan_upgrade, version_cap, version_url
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_argument_spec, fleet_client, fleet_devices, fleet_map
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_token_cache, query_device
+
+FIRMWARE_PATH = "/api/v2/status/firmware"
+
+ACTIONS = ("none", "full", "incremental", "unsupported")
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = fleet_argument_spec()
+    module_args.update(
+        use_force=dict(type='bool', default=False),
+        ignoreincremental=dict(type='int', default=0, choices=[0, 1]),
+        bootafterincremental=dict(type='int', default=1, choices=[0, 1]),
+        max_console_version=dict(type='float', default=None),
+        max_power_version=dict(type='float', default=None),
+        image_sizes=dict(type='bool', default=True),
+        version_cache_ttl=dict(type='int', default=0),
+        version_file=dict(type='path', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        plans={},
+        errors={},
+        summary=dict((action, 0) for action in ACTIONS + ("failed",)),
+        images=[],
+        download_size=0
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    devices = fleet_devices(module)
+    token_cache = fleet_token_cache(module)
+
+    def query(device):
+        return query_device(fleet_client(device, timeout=module.params['timeout'], token_cache=token_cache), [FIRMWARE_PATH])
+
+    session = WtiSession(validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
+                         timeout=module.params['timeout'])
+    version_cache = None
+    if module.params['version_cache_ttl'] > 0:
+        version_cache = VersionCache(module.params['version_cache_ttl'])
+    versions = {}
+    images = {}
+
+    for device, (data, errors) in zip(devices, fleet_map(query, devices, module.params['max_workers'])):
+        url = device['cpm_url']
+        if FIRMWARE_PATH not in data:
+            result['errors'][url] = errors[FIRMWARE_PATH]
+            result['summary']['failed'] += 1
+            continue
+
+        firmware = data[FIRMWARE_PATH]
+        try:
+            family = int(firmware['config']['family'])
+        except (KeyError, TypeError, ValueError):
+            family = CONSOLE
+        cap = version_cap(family, module.params['max_console_version'], module.params['max_power_version'])
+
+        # one lookup per family and version cap, shared by every device
+        if (family, cap) not in versions:
+            try:
+                versions[(family, cap)] = lookup_versions(session, family, cap, cache=version_cache, override=module.params['version_file'])
+            except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+                module.fail_json(msg=wti_error('GET', version_url(family, cap), e), **result)
+            except (IOError, OSError, ValueError) as e:
+                module.fail_json(msg='VERSION: Could not read the version information from {0} : {1}'.format(
+                    module.params['version_file'] or version_url(family, cap), e), **result)
+
+        try:
+            plan = plan_upgrade(firmware, versions[(family, cap)], force=module.params['use_force'],
+                                ignoreincremental=module.params['ignoreincremental'] == 1,
+                                bootafterincremental=module.params['bootafterincremental'] == 1, cap=cap)
+        except (KeyError, TypeError, ValueError) as e:
+            result['errors'][url] = 'PLAN: Unexpected firmware information from {0} : {1}'.format(url, e)
+            result['summary']['failed'] += 1
+            continue
+
+        result['plans'][url] = plan
+        result['summary'][plan['action']] += 1
+        for step in plan['steps']:
+            image = images.setdefault(step['imageurl'], dict(imageurl=step['imageurl'], size=step['size'], devices=0))
+            image['devices'] += 1
+
+    if module.params['image_sizes']:
+        for image in images.values():
+            if image['size'] is None:
+                try:
+                    image['size'] = image_size(session, image['imageurl'])
+                except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+                    module.warn('Could not get the size of %s : %s' % (image['imageurl'], e))
+        for plan in result['plans'].values():
+            for step in plan['steps']:
+                step['size'] = images[step['imageurl']]['size']
+            plan['size'] = sum(step['size'] or 0 for step in plan['steps'])
+    session.close()
+
+    result['images'] = sorted(images.values(), key=lambda image: image['imageurl'])
+    result['download_size'] = sum(image['size'] or 0 for image in result['images'])
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
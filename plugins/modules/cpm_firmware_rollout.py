@@ -0,0 +1,523 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to upgrade the firmware of many WTI OOB and PDU devices in waves.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_firmware_rollout
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Upgrade the firmware of many WTI OOB and PDU devices in waves
+description:
+    - "Upgrade the firmware of a list of WTI devices wave by wave, the way M(wti.remote.cpm_firmware_update) upgrades a single device."
+    - "Every device is planned as in M(wti.remote.cpm_firmware_plan). The devices that need an upgrade are split in waves of
+       I(wave_size), the devices of a wave are upgraded at the same time and each one has to come back reporting the expected
+       firmware on C(/api/v2/status/firmware) before the next wave starts."
+    - "The rollout stops when more than I(max_fail_percentage) percent of the upgraded devices failed."
+options:
+    cpm_url:
+        description:
+            - List of URLs of the WTI devices to upgrade.
+        type: list
+        elements: str
+        required: false
+        default: []
+    devices:
+        description:
+            - List of WTI devices to upgrade, for devices that need settings other than the module level ones.
+            - Settings that are left out are taken from the module level options.
+        type: list
+        elements: dict
+        required: false
+        default: []
+        suboptions:
+            cpm_url:
+                description:
+                    - This is the URL of the WTI device.
+                type: str
+                required: true
+            cpm_username:
+                description:
+                    - This is the Username of the WTI device.
+                type: str
+            cpm_password:
+                description:
+                    - This is the Password of the WTI device.
+                type: str
+            use_https:
+                description:
+                    - Designates to use an https connection or http connection.
+                type: bool
+            validate_certs:
+                description:
+                    - If false, SSL certificates will not be validated.
+                type: bool
+            use_proxy:
+                description:
+                    - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+                type: bool
+    cpm_username:
+        description:
+            - This is the Username of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI devices to send the module.
+        type: str
+        required: false
+    wave_size:
+        description:
+            - The number of devices upgraded in one wave.
+        type: int
+        required: false
+        default: 10
+    max_workers:
+        description:
+            - The maximum number of devices of a wave upgraded at the same time, and devices queried at the same time for the plan.
+        type: int
+        required: false
+        default: 10
+    max_fail_percentage:
+        description:
+            - Stop the rollout after a wave once more than this percentage of the devices upgraded so far failed.
+            - The default C(0) stops after the first wave with a failed device.
+        type: int
+        required: false
+        default: 0
+    wait_timeout:
+        description:
+            - Seconds a device may take to be ready again after an incremental part, and to report the new firmware after the upgrade.
+        type: int
+        required: false
+        default: 900
+    use_force:
+        description:
+            - If set to True, the upgrade will happen even if the device doesnt need it.
+        type: bool
+        required: false
+        default: false
+    ignoreincremental:
+        description:
+            - If there are any incremental upgrades, do not upload them
+        type: int
+        required: false
+        default: 0
+        choices: [ 0, 1 ]
+    bootafterincremental:
+        description:
+            - If set to 1, the WTI device reboots after the last incremental part
+            - Without the reboot the devices are only checked to be ready, not for the new parts.
+        type: int
+        required: false
+        default: 1
+        choices: [ 0, 1 ]
+    max_console_version:
+        description:
+            - If defined, this will be the maximum version that will be searched for all console units
+        type: float
+        required: false
+    max_power_version:
+        description:
+            - If defined, this will be the maximum version that will be searched for all power units
+        type: float
+        required: false
+    image_cache:
+        description:
+            - Directory on the controller to keep the downloaded OS images in, shared with M(wti.remote.cpm_firmware_update).
+            - If not set, every image is downloaded once for the rollout into a temporary directory that is removed afterwards.
+        type: path
+        required: false
+    image_cache_size:
+        description:
+            - The maximum size of I(image_cache) in megabytes.
+        type: int
+        required: false
+        default: 2048
+    version_cache_ttl:
+        description:
+            - Seconds the my.wti.com version information of a device family is reused on the controller. The default C(0) disables the cache.
+        type: int
+        required: false
+        default: 0
+    version_file:
+        description:
+            - Local JSON file to read the version information from instead of my.wti.com, for sites without internet access.
+        type: path
+        required: false
+    download_chunk_size:
+        description:
+            - Bytes read from my.wti.com at a time while an image is downloaded.
+        type: int
+        required: false
+        default: 1048576
+    download_retries:
+        description:
+            - How often a dropped download is resumed where it stopped, with an HTTP Range request.
+        type: int
+        required: false
+        default: 3
+    upload_bandwidth:
+        description:
+            - The combined rate in kilobytes per second of all image uploads on the controller that share I(upload_bandwidth_group),
+              from every fork and task. The default C(0) does not limit the uploads.
+            - Set it to a little below the capacity of the link to the devices, so parallel uploads do not run into timeouts.
+        type: int
+        required: false
+        default: 0
+    upload_bandwidth_group:
+        description:
+            - The name of the bandwidth limit, for example a site or inventory group. Uploads with the same name share I(upload_bandwidth).
+        type: str
+        required: false
+        default: "default"
+    upload_slots:
+        description:
+            - The number of images uploaded to one device at the same time from the controller, other uploads to it wait for a free slot.
+              C(0) does not limit the uploads.
+        type: int
+        required: false
+        default: 1
+    progress_log:
+        description:
+            - File on the controller to append the progress of every device to, one JSON object per line,
+              with the device, the time and the event (C(start), C(upload), C(reboot), C(ready) or C(done)).
+        type: path
+        required: false
+    timeout:
+        description:
+            - Seconds to wait for a device to connect or answer a request.
+        type: int
+        required: false
+        default: 10
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+requirements:
+  - requests, only imported when an image has to be downloaded
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - Run this module once, for example with C(run_once) or against C(localhost), not once per device.
+ - Devices that cannot be reached for the plan are listed as failed but do not count against I(max_fail_percentage).
+ - In check mode the devices are only planned.
+"""
+
+EXAMPLES = """
+- name: Upgrade all WTI devices, 20 at a time, stop when more than 5% fail
+  cpm_firmware_rollout:
+    cpm_url: "{{ groups['wti'] | map('extract', hostvars, 'ansible_host') | list }}"
+    cpm_username: "super"
+    cpm_password: "super"
+    validate_certs: false
+    wave_size: 20
+    max_workers: 20
+    max_fail_percentage: 5
+    image_cache: "~/.ansible/wti_image_cache"
+  run_once: true
+  register: rollout
+
+- name: Show the devices that failed
+  debug:
+    msg: "{{ rollout.devices | dict2items | selectattr('value.status', 'equalto', 'failed') | map(attribute='key') | list }}"
+  run_once: true
+"""
+
+RETURN = """
+devices:
+    description:
+        - The outcome of every device, keyed by device URL.
+        - The C(status) is C(upgraded), C(current), C(unsupported), C(failed), or C(skipped) when the rollout stopped before the device.
+    returned: always
+    type: dict
+    sample: { "rest.wti.com": { "status": "upgraded", "action": "full", "current": 8.07, "target": 8.09, "wave": 1, "firmware": "8.09",
+              "uploads": [ { "file": "uimage_3352_tsm_arm.md5", "type": "full", "vpart": null, "title": "8.09", "bytes": 41943040, "download_seconds": 12.1,
+                             "verify_seconds": 0.2, "queued_seconds": 0, "send_seconds": 44.9, "processing_seconds": 7.5, "seconds": 52.4,
+                             "bytes_per_second": 934143, "ready_seconds": 181.3 } ] } }
+waves:
+    description: Every wave that ran, with its devices, the number of them that failed and how long it took.
+    returned: always
+    type: list
+    sample: [ { "devices": [ "rest.wti.com" ], "failed": 0, "seconds": 412.7 } ]
+summary:
+    description: The number of devices per status.
+    returned: always
+    type: dict
+    sample: { "upgraded": 40, "current": 958, "unsupported": 1, "failed": 1, "skipped": 0 }
+"""
+
+import shutil
+import tempfile
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import WtiClient, WtiSession, wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import CONSOLE, DOWNLOAD_CHUNK, DOWNLOAD_RETRIES, UPLOAD_TIMEOUT
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import ImageCache, ProgressLog, TokenBucket, UpgradeFailed, VersionCache, apply_plan
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import load_requests, lookup_versions, plan_upgrade, resumable_download
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import version_cap, version_url
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_argument_spec, fleet_client, fleet_devices, fleet_map
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_token_cache, query_device
+from ansible_collections.wti.remote.plugins.module_utils.wti_wait import FIRMWARE_PATH, WaitTimeout
+
+STATUSES = ("upgraded", "current", "unsupported", "failed", "skipped")
+
+# imported once the rollout has an image to download
+requests = None
+
+
+def download_image(url, path, sha256=None, size=None, chunk_size=DOWNLOAD_CHUNK, retries=DOWNLOAD_RETRIES):
+    return resumable_download(requests.get, url, path, chunk_size=chunk_size, retries=retries, sha256=sha256, size=size)
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = fleet_argument_spec()
+    module_args.update(
+        wave_size=dict(type='int', default=10),
+        max_fail_percentage=dict(type='int', default=0),
+        wait_timeout=dict(type='int', default=900),
+        use_force=dict(type='bool', default=False),
+        ignoreincremental=dict(type='int', default=0, choices=[0, 1]),
+        bootafterincremental=dict(type='int', default=1, choices=[0, 1]),
+        max_console_version=dict(type='float', default=None),
+        max_power_version=dict(type='float', default=None),
+        image_cache=dict(type='path', required=False),
+        image_cache_size=dict(type='int', default=2048),
+        version_cache_ttl=dict(type='int', default=0),
+        version_file=dict(type='path', required=False),
+        download_chunk_size=dict(type='int', default=DOWNLOAD_CHUNK),
+        download_retries=dict(type='int', default=DOWNLOAD_RETRIES),
+        upload_bandwidth=dict(type='int', default=0),
+        upload_bandwidth_group=dict(type='str', default='default'),
+        upload_slots=dict(type='int', default=1),
+        progress_log=dict(type='path', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        devices={},
+        waves=[],
+        summary=dict((status, 0) for status in STATUSES)
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    devices = fleet_devices(module)
+    token_cache = fleet_token_cache(module)
+
+    if module.params['wave_size'] < 1 or not 0 <= module.params['max_fail_percentage'] <= 100:
+        module.fail_json(msg='wave_size must be at least 1 and max_fail_percentage between 0 and 100', changed=False)
+    if module.params['download_chunk_size'] < 1 or module.params['download_retries'] < 0:
+        module.fail_json(msg='download_chunk_size must be at least 1 and download_retries at least 0', changed=False)
+    if module.params['upload_bandwidth'] < 0 or module.params['upload_slots'] < 0:
+        module.fail_json(msg='upload_bandwidth and upload_slots must be at least 0', changed=False)
+
+    def outcome(url, status, **details):
+        result['devices'][url] = dict(status=status, **details)
+        result['summary'][status] += 1
+
+    # 1. plan every device against one version lookup per family
+    def query(device):
+        return query_device(fleet_client(device, timeout=module.params['timeout'], token_cache=token_cache), [FIRMWARE_PATH])
+
+    session = WtiSession(validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
+                         timeout=module.params['timeout'])
+    version_cache = None
+    if module.params['version_cache_ttl'] > 0:
+        version_cache = VersionCache(module.params['version_cache_ttl'])
+    versions = {}
+    pending = []
+
+    for device, (data, errors) in zip(devices, fleet_map(query, devices, module.params['max_workers'])):
+        url = device['cpm_url']
+        if FIRMWARE_PATH not in data:
+            outcome(url, 'failed', error=errors[FIRMWARE_PATH])
+            continue
+
+        firmware = data[FIRMWARE_PATH]
+        try:
+            family = int(firmware['config']['family'])
+        except (KeyError, TypeError, ValueError):
+            family = CONSOLE
+        cap = version_cap(family, module.params['max_console_version'], module.params['max_power_version'])
+
+        if (family, cap) not in versions:
+            try:
+                versions[(family, cap)] = lookup_versions(session, family, cap, cache=version_cache, override=module.params['version_file'])
+            except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+                session.close()
+                module.fail_json(msg=wti_error('GET', version_url(family, cap), e), **result)
+            except (IOError, OSError, ValueError) as e:
+                session.close()
+                module.fail_json(msg='VERSION: Could not read the version information from {0} : {1}'.format(
+                    module.params['version_file'] or version_url(family, cap), e), **result)
+
+        try:
+            plan = plan_upgrade(firmware, versions[(family, cap)], force=module.params['use_force'],
+                                ignoreincremental=module.params['ignoreincremental'] == 1,
+                                bootafterincremental=module.params['bootafterincremental'] == 1, cap=cap)
+        except (KeyError, TypeError, ValueError) as e:
+            outcome(url, 'failed', error='PLAN: Unexpected firmware information from {0} : {1}'.format(url, e))
+            continue
+
+        details = dict(action=plan['action'], current=plan['current'], target=plan['target'])
+        if plan['action'] == 'none':
+            outcome(url, 'current', **details)
+        elif plan['action'] == 'unsupported':
+            outcome(url, 'unsupported', **details)
+        else:
+            pending.append((device, plan, details))
+    session.close()
+
+    if module.check_mode or not pending:
+        for device, plan, details in pending:
+            outcome(device['cpm_url'], 'skipped', **details)
+        module.exit_json(**result)
+
+    global requests
+    if requests is None:
+        requests, dummy = load_requests()
+        if requests is None:
+            module.fail_json(msg='IMPORT: requests import not installed', **result)
+
+    # 2. every image is downloaded once for the whole rollout
+    scratch = None
+    if not module.params['image_cache']:
+        scratch = tempfile.mkdtemp(prefix='wti_rollout')
+    image_cache = ImageCache(module.params['image_cache'] or scratch, module.params['image_cache_size'] * 1024 * 1024)
+
+    # all uploads of the rollout share the link, and the limit of other tasks in the same group
+    bandwidth = None
+    if module.params['upload_bandwidth'] > 0:
+        bandwidth = TokenBucket(module.params['upload_bandwidth'] * 1024, module.params['upload_bandwidth_group'])
+
+    def fetch(step, timings):
+        try:
+            return image_cache.fetch(step['imageurl'], sha256=step['sha256'], timings=timings, download=lambda path: download_image(
+                step['imageurl'], path, sha256=step['sha256'], size=step['size'], chunk_size=module.params['download_chunk_size'],
+                retries=module.params['download_retries']))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise IOError('{0} : {1}'.format(step['imageurl'], to_native(e)))
+
+    def upgrade(entry):
+        device, plan, details = entry
+        client = fleet_client(device, timeout=module.params['timeout'], token_cache=token_cache)
+        # images go straight to the device with Basic authentication, on a connection of their own
+        uploader = WtiClient(device['cpm_url'], device['cpm_username'], device['cpm_password'], use_https=device['use_https'],
+                             validate_certs=device['validate_certs'], use_proxy=device['use_proxy'], timeout=UPLOAD_TIMEOUT)
+        progress = ProgressLog(module.params['progress_log'], device=device['cpm_url'])
+        progress.event('start', **details)
+        uploads = []
+        try:
+            # uploads keeps the images the device took, also when a later step fails
+            dummy, data = apply_plan(client, uploader, plan, fetch, wait_timeout=module.params['wait_timeout'],
+                                     bandwidth=bandwidth, slots=module.params['upload_slots'], progress=progress, uploads=uploads)
+            config = data.get('config', {}) if isinstance(data, dict) else {}
+            progress.event('done', status='upgraded')
+            return dict(details, status='upgraded', uploads=uploads, firmware=config.get('firmware'))
+        except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+            # apply_plan() reports failed uploads itself, what is left are the status polls
+            error = wti_error('GET', client.url(FIRMWARE_PATH), e)
+        except WaitTimeout as e:
+            error = 'WAIT: {0}'.format(to_native(e))
+        except UpgradeFailed as e:
+            error = to_native(e)
+        except (IOError, OSError, ValueError, KeyError) as e:
+            error = 'GET: Error downloading {0}'.format(to_native(e))
+        finally:
+            client.close()
+            uploader.close()
+        progress.event('done', status='failed', error=error)
+        return dict(details, status='failed', uploads=uploads, error=error)
+
+    # 3. wave by wave, stop once too many devices failed
+    done = failed = 0
+    try:
+        for start in range(0, len(pending), module.params['wave_size']):
+            wave = pending[start:start + module.params['wave_size']]
+            number = len(result['waves']) + 1
+            began = time.time()
+            outcomes = fleet_map(upgrade, wave, module.params['max_workers'])
+            for (device, plan, details), device_result in zip(wave, outcomes):
+                device_result['wave'] = number
+                outcome(device['cpm_url'], **device_result)
+                if device_result['uploads']:
+                    result['changed'] = True
+            wave_failed = len([entry for entry in outcomes if entry['status'] == 'failed'])
+            result['waves'].append(dict(devices=[device['cpm_url'] for device, plan, details in wave], failed=wave_failed,
+                                        seconds=round(time.time() - began, 1)))
+            done += len(wave)
+            failed += wave_failed
+
+            if failed * 100.0 / done > module.params['max_fail_percentage']:
+                for device, plan, details in pending[start + len(wave):]:
+                    outcome(device['cpm_url'], 'skipped', **details)
+                module.fail_json(msg='ROLLOUT: Stopped after wave {0}, {1} of {2} upgraded devices failed'.format(number, failed, done), **result)
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -37,17 +37,17 @@ options:
     cpm_url:
         description:
             - This is the URL of the WTI device to send the module.
-        required: true
+        required: false
         type: str
     cpm_username:
         description:
             - This is the Username of the WTI device to send the module.
-        required: true
+        required: false
         type: str
     cpm_password:
         description:
             - This is the Password of the WTI device to send the module.
-        required: true
+        required: false
         type: str
     cpm_path:
         description:
@@ -123,8 +123,122 @@ options:
         required: false
         type: float
 
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    image_cache:
+        description:
+            - Directory to keep downloaded OS images and incremental parts in, shared by all devices and runs.
+            - Images are stored by their SHA-256, every image is downloaded once and verified before it is uploaded.
+            - When set, I(removefileonexit) does not apply to downloaded images.
+        type: path
+        required: false
+    image_cache_size:
+        description:
+            - The maximum size of I(image_cache) in megabytes, the least recently used images are removed beyond it.
+        type: int
+        required: false
+        default: 2048
+    wait_for_ready:
+        description:
+            - Wait for the WTI device to be ready again before the module returns.
+            - After an incremental update the device has to go down for the reboot and answer again, after a
+              full OS image it has to report the new firmware version. Uploads of a I(cpm_file) are not waited for.
+        required: false
+        type: bool
+        default: false
+    wait_timeout:
+        description:
+            - Seconds to wait for the WTI device to be ready, between incremental parts and with I(wait_for_ready).
+        required: false
+        type: int
+        default: 600
+    version_cache_ttl:
+        description:
+            - Seconds the my.wti.com version information of a device family is reused on the controller, shared by all devices.
+            - The first device of a family looks it up, the other devices use the cached reply. The default C(0) disables the cache.
+            - The cache is kept in C(~/.ansible/wti_version_cache), or the directory in the C(WTI_VERSION_CACHE) environment variable.
+        required: false
+        type: int
+        default: 0
+    version_file:
+        description:
+            - Local JSON file to read the version information from instead of my.wti.com, for sites without internet access.
+            - It holds a C(version.aspx) reply, or replies keyed by family (C("0") for power, C("1") for console).
+              The image URLs in it can point at a local server.
+        required: false
+        type: path
+    pipeline:
+        description:
+            - When several incremental parts are uploaded, download the next part while the current one is uploaded to the device.
+            - The parts are still uploaded one after the other, in the same order.
+        required: false
+        type: bool
+        default: false
+    download_chunk_size:
+        description:
+            - Bytes read from my.wti.com and written to disk at a time while an image downloads.
+        required: false
+        type: int
+        default: 1048576
+    download_retries:
+        description:
+            - How often a dropped download is resumed where it stopped, with an HTTP Range request.
+            - A partial C(.part) file left by an earlier run is resumed as well, when the version information has the SHA-256 of the image.
+            - Every image is checked against the SHA-256 in the version information when there is one, otherwise against its size.
+        required: false
+        type: int
+        default: 3
+    firmware_catalog:
+        description:
+            - Directory of local OS images to upgrade from instead of my.wti.com, see M(wti.remote.cpm_firmware_catalog).
+            - The newest full image of the device family is uploaded when it is newer than the device firmware, or I(use_force) is set.
+              Images without a version in their file name are only uploaded with I(use_force), as they cannot be compared with the device firmware.
+            - Ignored when I(cpm_file) is set.
+        required: false
+        type: path
+    upload_bandwidth:
+        description:
+            - The combined rate in kilobytes per second of all image uploads on the controller that share I(upload_bandwidth_group),
+              from every fork and task. The default C(0) does not limit the uploads.
+            - Set it to a little below the capacity of the link to the devices, so parallel uploads do not run into timeouts.
+        required: false
+        type: int
+        default: 0
+    upload_bandwidth_group:
+        description:
+            - The name of the bandwidth limit, for example a site or inventory group. Uploads with the same name share I(upload_bandwidth).
+        required: false
+        type: str
+        default: "default"
+    upload_slots:
+        description:
+            - The number of images uploaded to one device at the same time from the controller, other uploads to it wait for a free slot.
+              C(0) does not limit the uploads.
+        required: false
+        type: int
+        default: 1
+    progress_log:
+        description:
+            - File on the controller to append the progress of the upgrade to, one JSON object per line, with the device,
+              the time and the event (C(start), C(upload), C(reboot), C(ready) or C(done)) and its timings.
+            - Many tasks can append to the same file, for example to follow a long rollout with C(tail -f).
+        required: false
+        type: path
 notes:
     - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.
+    - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
+    - Images are uploaded on a connection of their own, over httpapi with the address and credentials of the connection.
+    - The Python C(requests) library is only needed when an image is downloaded from my.wti.com or I(version_file) image URLs.
 """
 
 EXAMPLES = """
@@ -147,11 +261,36 @@ EXAMPLES = """
     use_https: true
     validate_certs: false
     removefileonexit: "0"
+
+
+# Upgrade the firmware of all WTI devices, downloading every OS image only once
+- name: Upgrade the firmware of all WTI devices from a shared image cache
+  cpm_firmware_update:
+    cpm_url: "{{ ansible_host }}"
+    cpm_username: "super"
+    cpm_password: "super"
+    use_https: true
+    validate_certs: false
+    image_cache: "~/.ansible/wti_image_cache"
+    image_cache_size: 4096
+
+
+# Upgrade the firmware of a WTI device from the images in a local directory
+- name: Upgrade the firmware of a WTI device from a local firmware directory
+  cpm_firmware_update:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    use_https: true
+    validate_certs: false
+    firmware_catalog: "/srv/wti/firmware"
 """
 
 RETURN = """
 data:
-    description: The output XML configuration of the WTI device being updated
+    description:
+        - The reply of the WTI device to the last image uploaded, after every incremental part when there were several.
+        - With I(wait_for_ready), the firmware status the device reported once it was ready again.
     returned: always
     type: complex
     contains:
@@ -169,33 +308,84 @@ data:
                 - code: 0
                 - text: "ok"
                 - unittimestamp: "2020-02-14T00:18:57+00:00"
+uploads:
+    description:
+        - Every image uploaded to the WTI device in order, the OS image or every incremental part, with its size and
+          the seconds spent downloading it, verifying it, waiting for a free I(upload_slots) slot, sending it, waiting for the
+          device to check it and answer, and waiting for the device to be ready again afterwards.
+        - C(bytes_per_second) is the throughput while the image was sent.
+    returned: always
+    type: list
+    sample: [ { "file": "inc3.bin", "vpart": 3, "title": "Security Update", "bytes": 1048576, "download_seconds": 1.2,
+                "verify_seconds": 0.01, "queued_seconds": 0, "send_seconds": 1.4, "processing_seconds": 6.2, "seconds": 7.6,
+                "bytes_per_second": 748982, "ready_seconds": 0 } ]
+timings:
+    description:
+        - Seconds spent in the stages of the run, the totals of C(uploads) (C(download), C(verify), C(upload), C(processing)
+          and C(ready)), C(reboot_to_ready), the part of C(ready) after the last image with I(wait_for_ready), and the C(total) of the task.
+        - C(import) is the time taken to import the Python C(requests) library, which is only imported once an image has to
+          be downloaded, so it is C(0) for devices that are up to date and in check mode.
+    returned: always
+    type: dict
+    sample: { "import": 0.094, "download": 1.2, "verify": 0.01, "upload": 1.4, "processing": 6.2, "ready": 0,
+              "reboot_to_ready": 143.8, "total": 153.1 }
+catalog_image:
+    description: The image picked from I(firmware_catalog) for the device family.
+    returned: when I(firmware_catalog) is used
+    type: dict
+    sample: { "name": "wti_tsm_8.09.bin", "family": 1, "type": "full", "version": 8.09, "size": 41943040,
+              "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", "mtime": 1760000000.0 }
 """
 
-import base64
 import os
 import json
 import tempfile
 import re
 import time
 
-try:
-    import requests
-    HAS_REQUESTS_LIBRARY = True
-except ImportError:
-    HAS_REQUESTS_LIBRARY = False
-
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
+from ansible.module_utils._text import to_native
 from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import WtiSession, wti_client, wti_direct_client, wti_error, wti_request
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import DOWNLOAD_CHUNK, DOWNLOAD_RETRIES, UPLOAD_TIMEOUT, ImageCache
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import load_requests, resumable_download
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import VersionCache, lookup_versions, version_cap, version_url
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import INCREMENTAL, FirmwareCatalog, TokenBucket, image_family
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import ProgressLog, UpgradeFailed, apply_plan, plan_image, plan_upgrade
+from ansible_collections.wti.remote.plugins.module_utils.wti_wait import FIRMWARE_PATH, WaitTimeout, wait_for_device
+
+# imported by import_requests() once an image has to be downloaded
+requests = None
+
+
+def import_requests(module, result):
+    global requests
+    if requests is None:
+        requests, result['timings']['import'] = load_requests()
+        if requests is None:
+            fail_json = dict(msg='IMPORT: requests import not installed', changed=False)
+            module.fail_json(**fail_json)
+
+
+def download_image(module, url, path, sha256=None, size=None, timings=None):
+    return resumable_download(requests.get, url, path, chunk_size=module.params['download_chunk_size'],
+                              retries=module.params['download_retries'], sha256=sha256, size=size, timings=timings)
+
 
+def total_timings(result, start):
+    for key, field in (('download', 'download_seconds'), ('verify', 'verify_seconds'), ('upload', 'send_seconds'),
+                       ('processing', 'processing_seconds'), ('ready', 'ready_seconds')):
+        result['timings'][key] = round(sum(upload[field] for upload in result['uploads']), 3)
+    result['timings']['total'] = round(time.time() - start, 3)
 
-def run_module():
+
+def run_module(module_class=None):
     # define the available arguments/parameters that a user can pass to the module
     module_args = dict(
-        cpm_url=dict(type='str', required=True),
-        cpm_username=dict(type='str', required=True),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
         cpm_path=dict(type='str', default="/tmp/"),
         cpm_file=dict(type='str', default=None),
         family=dict(type='int', default=1, choices=[0, 1]),
@@ -207,27 +397,46 @@ def run_module():
         use_force=dict(type='bool', default=False),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600),
+        image_cache=dict(type='path', required=False),
+        image_cache_size=dict(type='int', default=2048),
+        wait_for_ready=dict(type='bool', default=False),
+        wait_timeout=dict(type='int', default=600),
+        version_cache_ttl=dict(type='int', default=0),
+        version_file=dict(type='path', required=False),
+        pipeline=dict(type='bool', default=False),
+        download_chunk_size=dict(type='int', default=DOWNLOAD_CHUNK),
+        download_retries=dict(type='int', default=DOWNLOAD_RETRIES),
+        firmware_catalog=dict(type='path', required=False),
+        upload_bandwidth=dict(type='int', default=0),
+        upload_bandwidth_group=dict(type='str', default='default'),
+        upload_slots=dict(type='int', default=1),
+        progress_log=dict(type='path', required=False)
     )
 
     result = dict(
         changed=False,
-        data=''
+        data='',
+        uploads=[],
+        timings={'import': 0, 'reboot_to_ready': 0}
     )
+    start = time.time()
 
     family = None
-    online_file_location = None
     usersuppliedfilename = None
     forceupgrade = False
     localfilefamily = -1
+    catalog_upload = False
     ignoreincremental = 0
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
     verbosity = module._verbosity
 
-    if HAS_REQUESTS_LIBRARY is False:
-        fail_json = dict(msg='IMPORT: requests import not installed', changed=False)
+    if module.params['download_chunk_size'] < 1 or module.params['download_retries'] < 0:
+        fail_json = dict(msg='download_chunk_size must be at least 1 and download_retries at least 0', changed=False)
         module.fail_json(**fail_json)
 
     if module.params['cpm_file'] is not None:
@@ -242,21 +451,14 @@ def run_module():
     # if a local file was defined lets see what family it is: Console or Power
     if (usersuppliedfilename is not None):
         try:
-            ifilesize = os.path.getsize(usersuppliedfilename)
-            file = open(usersuppliedfilename, 'rb')
-            file.seek(ifilesize - 20)
-            fileread = file.read()
-            if (fileread.find(b"TSM") >= 0):
-                localfilefamily = 1
-            elif (fileread.find(b"VMR") >= 0):
-                localfilefamily = 0
-            elif (fileread.find(b"INCUPDATE") >= 0):
-                localfilefamily = 2
+            with open(usersuppliedfilename, 'rb') as file:
+                detected = image_family(file)
+            if detected is not None:
+                localfilefamily = detected
+            if (localfilefamily == INCREMENTAL):
                 module.warn("INC UPDATE type., versions need to match")
 
-            file.close()
-
-            if (localfilefamily == 2):
+            if (localfilefamily == INCREMENTAL):
                 module.warn("User Supplied file [%s] is a Incremental type." % (usersuppliedfilename,))
             else:
                 module.warn("User Supplied file [%s] is a %s type." % (usersuppliedfilename, ("Console" if localfilefamily == 1 else "Power")))
@@ -265,33 +467,28 @@ def run_module():
             fail_json = dict(msg='FILE: User Supplied file {0} does not exist : {1}'.format(usersuppliedfilename, to_native(e)), changed=False)
             module.fail_json(**fail_json)
 
-    auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                   errors='surrogate_or_strict')))
+    if module.params['upload_bandwidth'] < 0 or module.params['upload_slots'] < 0:
+        fail_json = dict(msg='upload_bandwidth and upload_slots must be at least 0', changed=False)
+        module.fail_json(**fail_json)
 
-    if module.params['use_https'] is True:
-        protocol = "https://"
-    else:
-        protocol = "http://"
+    bandwidth = None
+    if module.params['upload_bandwidth'] > 0:
+        bandwidth = TokenBucket(module.params['upload_bandwidth'] * 1024, module.params['upload_bandwidth_group'])
 
-    # 1. Get the Version of the WTI device
-    fullurl = ("%s%s/api/v2/status/firmware" % (protocol, to_native(module.params['cpm_url'])))
-    method = 'GET'
-    try:
-        response = open_url(fullurl, data=None, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
+    image_cache = None
+    if module.params['image_cache']:
+        image_cache = ImageCache(module.params['image_cache'], module.params['image_cache_size'] * 1024 * 1024)
 
-    except HTTPError as e:
-        fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='GET: Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='GET: Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='GET: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+    version_cache = None
+    if module.params['version_cache_ttl'] > 0:
+        version_cache = VersionCache(module.params['version_cache_ttl'])
+
+    client = wti_client(module)
+    # images go straight to the device on a connection of their own, also over httpapi
+    uploader = wti_direct_client(module, timeout=UPLOAD_TIMEOUT)
+
+    # 1. Get the Version of the WTI device
+    response = wti_request(module, client, "/api/v2/status/firmware")
 
     result['data'] = json.loads(response.read())
     statuscode = result['data']["status"]["code"]
@@ -331,25 +528,38 @@ def run_module():
                              % (("Console" if localfilefamily == 1 else "Power"), ("Console" if family == 1 else "Power"), localfilefamily), changed=False)
             module.fail_json(**fail_json)
 
-    versioncap = ""
-    if (family == 2):
-        if module.params['max_power_version'] is not None:
-            if (float(module.params['max_power_version']) > 0):
-                versioncap = ("&versioncap=%s" % (module.params['max_power_version']))
-    else:
-        if module.params['max_console_version'] is not None:
-            if (float(module.params['max_console_version']) > 0):
-                versioncap = ("&versioncap=%s" % (module.params['max_console_version']))
+    # pick the newest local image of the device family from the firmware catalog instead of going online
+    catalog_image = None
+    if (localfilefamily == -1) and module.params['firmware_catalog']:
+        catalog = FirmwareCatalog(module.params['firmware_catalog'])
+        try:
+            catalog_image = catalog.select(family)
+        except (IOError, OSError) as e:
+            fail_json = dict(msg='CATALOG: Could not read the firmware catalog {0} : {1}'.format(catalog.path, to_native(e)), changed=False)
+            module.fail_json(**fail_json)
+        if catalog_image is None:
+            fail_json = dict(msg='CATALOG: No %s image in %s' % (("Console" if family == 1 else "Power"), catalog.path), changed=False)
+            module.fail_json(**fail_json)
+        result['catalog_image'] = catalog_image
+        if (catalog_image['version'] is None) and (forceupgrade == 0):
+            module.warn("CATALOG: %s has no version in its name, set use_force to upload it" % (catalog_image['name']))
+        elif (catalog_image['version'] is None) or (catalog_image['version'] > float(local_release_version)) or (forceupgrade == 1):
+            usersuppliedfilename = os.path.join(catalog.path, catalog_image['name'])
+            catalog_upload = True
+
+    versioncap = version_cap(family, module.params['max_console_version'], module.params['max_power_version'])
 
-    # 2. Go online and find the latest version of the os image for this device family
-    wti_incremental_list = ""
-    if (localfilefamily == -1):
-        fullurl = ("https://my.wti.com/update/version.aspx?fam=%s%s" % (family, versioncap))
+    # 2. The upgrade plan: the local file, the catalog image, or the images online for this device family
+    if (localfilefamily != -1):
+        plan = plan_image(result['data'], usersuppliedfilename)
+    elif catalog_image is not None:
+        plan = plan_image(result['data'], usersuppliedfilename if catalog_upload else None, target=catalog_image['version'])
+    else:
+        fullurl = version_url(family, versioncap)
 
-        method = 'GET'
         try:
-            response = open_url(fullurl, data=None, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                                headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
+            online = lookup_versions(WtiSession(validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy']),
+                                     family, versioncap, cache=version_cache, override=module.params['version_file'])
 
         except HTTPError as e:
             fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
@@ -363,252 +573,84 @@ def run_module():
         except ConnectionError as e:
             fail_json = dict(msg='GET: Error connecting to {0} : {1}'.format(fullurl, to_native(e)), changed=False)
             module.fail_json(**fail_json)
+        except (IOError, OSError, ValueError) as e:
+            fail_json = dict(msg='VERSION: Could not read the version information from {0} : {1}'.format(
+                module.params['version_file'] or fullurl, to_native(e)), changed=False)
+            module.fail_json(**fail_json)
 
-        result['data'] = json.loads(response.read())
-        remote_release_version = result['data']["config"]["firmware"]
-
-        if module.params['max_console_version'] is not None:
-            if (float(module.params['max_console_version']) > 0):
-                if (float(module.params['max_console_version']) < (float(remote_release_version))):
-                    remote_release_version = float(module.params['max_console_version'])
-
-        # if the local version is less than the online latest version ignore all incremental upgrades
-        wti_incremental_total = 0
-        wti_incremental_list = ""
-
-        if ((float(local_release_version)) == (float(remote_release_version))):
-            if (((float(local_release_version) < 8.09) & (family == 1)) | ((float(local_release_version) < 4.05) & (family == 0))):
-                ignoreincremental = 1
-            try:
-                if (ignoreincremental == 0):
-                    # Extract incremental array
-                    wti_incremental_list = result['data']["config"]["incremental"]
-                    if (verbosity):
-                        module.warn("wti_incremental_list size (%d)" % (len(wti_incremental_list)))
-
-                    # Print or use the list
-                    if (verbosity):
-                        module.warn("1B. local_release_version  [%s]." % (wti_incremental_list))
-                        module.warn("1B. local_incremental_list  [%s]." % (local_incremental_list))
-
-                        # Loop through the my.wti.com complete incremental available updates
-                        module.warn("1c. length wti_incremental_list  (%d)." % (len(wti_incremental_list)))
-                        module.warn("1c. length local_incremental_list (%d)." % (len(local_incremental_list)))
-
-                    new_wti_list = []
-                    for item_wti in wti_incremental_list:
-                        matched = False
-                        if (verbosity):
-                            module.warn("loop item_wti item_wti['title']:   [%s], item_wti['vpart']:   (%d), item_wti['vinc']: (%d)"
-                                        % (item_wti["title"], int(item_wti['vpart']), int(item_wti['vinc'])))
-
-                        if (len(local_incremental_list) > 0):
-                            for item_local in local_incremental_list:
-                                if (verbosity):
-                                    module.warn("   -> COMPARE item_local['title']  [%s], item_local['vpart']: (%d), item_local['vinc']: (%d)"
-                                                % (item_local["title"], int(item_local['vpart']), int(item_local['vinc'])))
-                                    module.warn("   -> AND     item_wti['title']    [%s], item_wti['vpart']:   (%d), item_wti['vinc']:   (%d)"
-                                                % (item_wti["title"], int(item_wti['vpart']), int(item_wti['vinc'])))
-
-                                if (int(item_local['vpart']) == int(item_wti['vpart'])):
-                                    matched = True
-                                    if int(item_wti['vinc']) > int(item_local['vinc']):
-                                        if (verbosity):
-                                            module.warn(
-                                                "-> 1. New version online item_local['title'] [%s], "
-                                                "item_local['vpart']: (%d), item_local['vinc']: (%d)"
-                                                % (
-                                                    item_local["title"], int(item_local["vpart"]), int(item_local["vinc"]),
-                                                )
-                                            )
-
-                                            module.warn(
-                                                "-> 1. New version online item_wti['title'] [%s], "
-                                                "item_wti['vpart']: (%d), item_wti['vinc']: (%d)"
-                                                % (
-                                                    item_wti["title"], int(item_wti["vpart"]), int(item_wti["vinc"]),
-                                                )
-                                            )
-
-                                        new_wti_list.append(item_wti)
-                                        matched = True
-                                        break
-                            if not matched:
-                                if (verbosity):
-                                    module.warn("   -> NO - MATCH/DELETE item_local['title']    [%s], item_local['vpart']:   (%d), item_local['vinc']: (%d)"
-                                                % (item_local["title"], int(item_local['vpart']), int(item_local['vinc'])))
-                                    module.warn("   -> NO - MATCH/DELETE item_wti['title']    [%s], item_wti['vpart']:   (%d), item_wti['vinc']: (%d)"
-                                                % (item_wti["title"], int(item_wti['vpart']), int(item_wti['vinc'])))
-                                new_wti_list.append(item_wti)
-                        else:
-                            if (verbosity):
-                                module.warn("   -> 2. New version online item_wti['title']    [%s], item_wti['vpart']:   (%d), item_wti['vinc']: (%d)"
-                                            % (item_wti["title"], int(item_wti['vpart']), int(item_wti['vinc'])))
-                            new_wti_list.append(item_wti)
-                    # Replace the original list with the filtered one
-                    wti_incremental_list = new_wti_list
-
-            except Exception as e:
-                wti_incremental_list = ""
-                if (verbosity):
-                    module.warn("EXCEPTION 2 %s." % (str(e)))
-
-        if ((float(local_release_version) < 6.58) & (family == 1)) | ((float(local_release_version) < 2.15) & (family == 0)):
+        # the full OS image when the device is behind, otherwise the incremental parts it is missing
+        plan = plan_upgrade(result['data'], online, force=forceupgrade, ignoreincremental=(ignoreincremental == 1),
+                            bootafterincremental=(int(module.params['bootafterincremental']) == 1), cap=versioncap)
+        if plan['action'] == 'unsupported':
             fail_json = dict(msg='ERROR: WTI Device does not support remote upgrade', changed=False)
             module.fail_json(**fail_json)
-        statuscode = result['data']['status']['code']
-    else:
-        remote_release_version = 0
-
-    wti_incremental_total = len(wti_incremental_list)
+        statuscode = online['status']['code']
 
     if (verbosity):
-        module.warn("Number of items in wti_incremental_list: %d" % len(wti_incremental_list))
+        module.warn("Upgrade plan: %s, %d image(s)" % (plan['action'], len(plan['steps'])))
+        for step in plan['steps']:
+            module.warn("    [%s] %s, vpart: (%s)" % (step['title'], step['imageurl'], step.get('vpart')))
 
-    if (verbosity):
-        if (wti_incremental_total > 0):
-            for item_wti in wti_incremental_list:
-                module.warn("4a. item_wti['title']  [%s], item_wti['vpart']: (%d)" % (item_wti["title"], int(item_wti['vpart'])))
-                module.warn("4a. item_wti['imageurl']  [%s], item_wti['vinc']: (%d)" % (item_wti["imageurl"], int(item_wti['vinc'])))
-
-    INCString = INCTitle = ""
-    INCPart = is_incremental = 0
-    if (int(statuscode) == 0):
-        local_filename = None
-        if ((float(local_release_version) < float(remote_release_version)) or (forceupgrade == 1)) or (localfilefamily >= 0) or (wti_incremental_total > 0):
-            if (module.check_mode is False):
-                if (localfilefamily == -1):
-                    INCPart = 0
-                    while wti_incremental_total != -1:
-                        time.sleep(5)
-
-                        if (wti_incremental_total == 0):
-                            online_file_location = result['data']["config"]["imageurl"]
-                            wti_incremental_total = -1  # only go through one time
-                        else:
-                            is_incremental = is_incremental + 1
-                            online_file_location = wti_incremental_list[0]['imageurl']
-                            INCPart = int(wti_incremental_list[0]['vpart'])
-                            INCTitle = (wti_incremental_list[0]['title'])
-                            wti_incremental_total = wti_incremental_total - 1
-                            wti_incremental_list.remove(wti_incremental_list[0])
-
-                            if (wti_incremental_total == 0):
-                                wti_incremental_total = -1  # Done with loop
-
-                        local_filename = online_file_location[online_file_location.rfind("/") + 1:]
-                        local_filename = tempfile.gettempdir() + "/" + local_filename
-
-                        response = requests.get(online_file_location, stream=True)
-                        handle = open(local_filename, "wb")
-                        for chunk in response.iter_content(chunk_size=512):
-                            if chunk:  # filter out keep-alive new chunks
-                                handle.write(chunk)
-                        handle.close()
-
-                        # SEND the file to the WTI device
-                        # 3. upload new os image to WTI device
-                        fullurl = ("%s%s/cgi-bin/getfile" % (protocol, to_native(module.params['cpm_url'])))
-                        files = {'file': ('name.binary', open(local_filename, 'rb'), 'application/octet-stream')}
-
-                        try:
-                            response = requests.post(fullurl, files=files, auth=(to_native(module.params['cpm_username']),
-                                                     to_native(module.params['cpm_password'])), verify=(module.params['validate_certs']), stream=True)
-                            result['data'] = response.json()
-                            if (verbosity):
-                                module.warn("    Data return:  [%s]" % (result['data']))
-
-                            # Is it an incremental upgrade
-                            if (is_incremental > 0):
-                                if (len(INCString) > 0):
-                                    INCString = INCString + ","
-
-                                INCString = (
-                                    "%s{ 'title': '%s', 'vpart': %d, 'code': '%s', 'filelength': '%s' }"
-                                    % (
-                                        INCString,
-                                        INCTitle,
-                                        INCPart,
-                                        result['data']['status']['code'],
-                                        result['data']['filelength'],
-                                    )
-                                )
-
-                                if (verbosity):
-                                    module.warn("INCString [%s]" % (INCString))
-
-                            if (response.status_code == 200):
-                                if (int(result['data']['status']['code']) == 0):
-                                    result['changed'] = True
-                                    if (len(INCString)):
-                                        result['data'] = "{'incremental': [" + INCString + "]}"
-                                else:
-                                    fail_json = dict(msg='FAIL: Upgrade Failed for {0}'.format(fullurl), changed=False)
-                                    module.fail_json(**fail_json)
-
-                        except requests.exceptions.RequestException as e:  # This is the correct syntax
-                            fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                            module.fail_json(**fail_json)
-
-                        # only remove if the file was downloaded
-                        if (localfilefamily == -1):
-                            if (int(module.params['removefileonexit']) == 1):
-                                os.remove(local_filename)
-
-                else:
-                    if (family == localfilefamily):
-                        local_filename = usersuppliedfilename
-                    else:
-                        module.log(msg="FAMILY MISMATCH: Your local file and the device do not match family types.")
-                        fail_json = dict(msg='FAIL: (3) Upgrade Failed for {0}'.format(fullurl), changed=False)
-                        module.fail_json(**fail_json)
-
-                    # SEND the file to the WTI device
-                    # 3. upload new os image to WTI device
-                    fullurl = ("%s%s/cgi-bin/getfile" % (protocol, to_native(module.params['cpm_url'])))
-                    files = {'file': ('name.binary', open(local_filename, 'rb'), 'application/octet-stream')}
-
-                    if (verbosity):
-                        module.warn("fullurl [%s]" % (fullurl))
-
-                    try:
-                        response = requests.post(fullurl, files=files, auth=(to_native(module.params['cpm_username']),
-                                                 to_native(module.params['cpm_password'])), verify=(module.params['validate_certs']), stream=True)
-                        result['data'] = response.json()
-
-                        if (response.status_code == 200):
-                            if (int(result['data']['status']['code']) == 0):
-                                result['changed'] = True
-                            else:
-                                fail_json = dict(msg='FAIL: Upgrade Failed for {0}'.format(fullurl), changed=False)
-                                module.fail_json(**fail_json)
-
-                    except requests.exceptions.RequestException as e:  # This is the correct syntax
-                        fail_json = dict(msg='GET: Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-                        module.fail_json(**fail_json)
-
-                    # only remove if the file was downloaded
-                    if (localfilefamily == -1):
-                        if (int(module.params['removefileonexit']) == 1):
-                            os.remove(local_filename)
-        else:
-            result['data'] = "{ \"filelength\": \"0\", \"status\": { \"code\": \"1\", \"text\": \"device up to date\" } }"
-    else:
-        result['data'] = "{ \"filelength\": \"0\", \"status\": { \"code\": \"2\", \"text\": \"device bad family code: %s\" } }" % (family)
+    progress = ProgressLog(module.params['progress_log'], device=client.url(''))
+    progress.event('start', current=local_release_version, target=plan['target'])
 
-    if (int(module.params['bootafterincremental']) == 1):
-        if (is_incremental > 0):
-            if result['changed']:
-                # Reboot device after incremental upgrade
-                fullurl = ("%s%s/api/v2/config/rebootlocalunit" % (protocol, to_native(module.params['cpm_url'])))
-                method = 'GET'
-                try:
-                    response = open_url(fullurl, data=None, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                                        headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
-
-                except Exception as e:
-                    fail_json = dict(msg="On Reboot: Unexpected error for {0} : {1}".format(fullurl, to_native(e)), changed=False)
+    def fetch(step, timings):
+        if step.get('local'):
+            try:
+                return open(step['imageurl'], 'rb')
+            except (IOError, OSError) as e:
+                raise UpgradeFailed('FILE: Could not read {0} : {1}'.format(step['imageurl'], to_native(e)))
+        online_file_location = step['imageurl']
+        try:
+            if image_cache is not None:
+                # every image and incremental part is downloaded once for all devices
+                return image_cache.fetch(online_file_location, sha256=step['sha256'], timings=timings,
+                                         download=lambda path: download_image(module, online_file_location, path,
+                                                                              sha256=step['sha256'], size=step['size']))
+            local_filename = os.path.join(tempfile.gettempdir(), online_file_location[online_file_location.rfind("/") + 1:])
+            download_image(module, online_file_location, local_filename, sha256=step['sha256'], size=step['size'], timings=timings)
+            image = open(local_filename, 'rb')
+            if (int(module.params['removefileonexit']) == 1):
+                # the open file can still be read for the upload
+                os.remove(local_filename)
+            return image
+        except (requests.exceptions.RequestException, IOError, OSError, ValueError) as e:
+            raise IOError('{0} : {1}'.format(online_file_location, to_native(e)))
+
+    if (int(statuscode) != 0):
+        result['data'] = "{ \"filelength\": \"0\", \"status\": { \"code\": \"2\", \"text\": \"device bad family code: %s\" } }" % (family)
+    elif not plan['steps']:
+        result['data'] = "{ \"filelength\": \"0\", \"status\": { \"code\": \"1\", \"text\": \"device up to date\" } }"
+    elif (module.check_mode is False):
+        if not all(step.get('local') for step in plan['steps']):
+            import_requests(module, result)
+
+        # 3. upload the images to the WTI device, uploads of a cpm_file are not waited for
+        check = module.params['wait_for_ready'] and (localfilefamily == -1)
+        fail_json = None
+        try:
+            dummy, result['data'] = apply_plan(client, uploader, plan, fetch, wait_timeout=module.params['wait_timeout'], wait=wait_for_device,
+                                               bandwidth=bandwidth, slots=module.params['upload_slots'], progress=progress,
+                                               uploads=result['uploads'], pipeline=module.params['pipeline'], check=check)
+            if check:
+                result['timings']['reboot_to_ready'] = result['uploads'][-1]['ready_seconds']
+        except UpgradeFailed as e:
+            fail_json = dict(msg=to_native(e))
+        except WaitTimeout as e:
+            fail_json = dict(msg='WAIT: {0}'.format(to_native(e)))
+        except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+            fail_json = dict(msg=wti_error('GET', client.url(FIRMWARE_PATH), e))
+        except (IOError, OSError, ValueError, KeyError) as e:
+            fail_json = dict(msg='GET: Error downloading {0}'.format(to_native(e)))
+        # the device changed once it accepted an image, also when a later step failed
+        result['changed'] = bool(result['uploads'])
+        if fail_json is not None:
+            total_timings(result, start)
+            fail_json.update(changed=result['changed'], uploads=result['uploads'], timings=result['timings'])
+            module.fail_json(**fail_json)
 
+    total_timings(result, start)
+    progress.event('done', changed=result['changed'], timings=result['timings'])
     module.exit_json(**result)
 
 
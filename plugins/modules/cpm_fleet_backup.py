@@ -0,0 +1,331 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to back up the configuration of many WTI OOB and PDU devices at once.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_fleet_backup
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Back up the configuration of many WTI OOB and PDU devices concurrently
+description:
+    - "Download the XML configuration of a list of WTI OOB and PDU devices concurrently, as M(wti.remote.cpm_config_backup) does for one,
+       and store it compressed in I(cpm_path)."
+    - "A backup is only written when its configuration changed since the last backup of the device. The backups are compared
+       by the SHA-256 of their canonical XML, so a backup that only differs in attribute order or whitespace is unchanged too,
+       and only the last seen time of the previous backup is updated."
+options:
+    cpm_url:
+        description:
+            - List of URLs of the WTI devices to back up.
+        type: list
+        elements: str
+        required: false
+        default: []
+    devices:
+        description:
+            - List of WTI devices to back up, for devices that need settings other than the module level ones.
+            - Settings that are left out are taken from the module level options.
+        type: list
+        elements: dict
+        required: false
+        default: []
+        suboptions:
+            cpm_url:
+                description:
+                    - This is the URL of the WTI device.
+                type: str
+                required: true
+            cpm_username:
+                description:
+                    - This is the Username of the WTI device.
+                type: str
+            cpm_password:
+                description:
+                    - This is the Password of the WTI device.
+                type: str
+            use_https:
+                description:
+                    - Designates to use an https connection or http connection.
+                type: bool
+            validate_certs:
+                description:
+                    - If false, SSL certificates will not be validated.
+                type: bool
+            use_proxy:
+                description:
+                    - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+                type: bool
+    cpm_username:
+        description:
+            - This is the Username of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_path:
+        description:
+            - The directory to store the backups in, the backups are named as those of M(wti.remote.cpm_config_backup).
+        type: path
+        required: false
+        default: "/tmp/"
+    compress:
+        description:
+            - Compress the backups with gzip (C(.xml.gz)) or xz (C(.xml.xz)), or store them as plain XML.
+            - With I(backend=store) every section is compressed on its own.
+        type: str
+        required: false
+        default: gzip
+        choices: [ "none", "gzip", "xz" ]
+    backend:
+        description:
+            - C(files) stores every backup as one XML file in I(cpm_path).
+            - C(store) keeps the backups in a content addressed store in I(cpm_path). Every backup is split into the sections
+              of its XML, every section is stored once under C(objects/) however many backups hold it, and every backup
+              gets a manifest under C(manifests/<device URL>/) that lists its sections.
+              M(wti.remote.cpm_config_restore) rebuilds the XML from the store with I(backup_store).
+        type: str
+        required: false
+        default: files
+        choices: [ "files", "store" ]
+    catalog:
+        description:
+            - Record every backup in the C(.wti_backup_catalog.jsonl) catalog in I(cpm_path), with its device, unit type, time,
+              size and hash, for M(wti.remote.cpm_backup_catalog).
+        type: bool
+        required: false
+        default: true
+    ignore:
+        description:
+            - Names of XML attributes and elements to leave out when comparing a backup with the last one,
+              for values that change on every download.
+        type: list
+        elements: str
+        required: false
+        default: []
+    max_workers:
+        description:
+            - The maximum number of devices backed up at the same time.
+        type: int
+        required: false
+        default: 10
+    timeout:
+        description:
+            - Seconds to wait for a device to connect or answer a request.
+        type: int
+        required: false
+        default: 10
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - Devices that cannot be reached do not fail the task, they are listed in C(errors).
+ - Run this module once, for example with C(run_once) or against C(localhost), not once per device.
+ - The hash and file of the last backup of every device are kept in a hidden C(.wti_backup-<backend>-<device URL>.json) file in I(cpm_path), one per I(backend).
+ - With I(backend=store) the C(file) of a backup is the path of its manifest, relative to I(cpm_path).
+ - In check mode the configurations are downloaded and compared, but nothing is written.
+ - C(xz) compression requires the Python lzma module.
+"""
+
+EXAMPLES = """
+- name: Back up all WTI devices in the inventory
+  cpm_fleet_backup:
+    cpm_url: "{{ groups['wti'] | map('extract', hostvars, 'ansible_host') | list }}"
+    cpm_username: "super"
+    cpm_password: "super"
+    cpm_path: "/srv/wti/backup"
+    compress: xz
+    max_workers: 50
+    validate_certs: false
+  run_once: true
+  register: backup
+
+- name: Back up all WTI devices to a content addressed store
+  cpm_fleet_backup:
+    cpm_url: "{{ groups['wti'] | map('extract', hostvars, 'ansible_host') | list }}"
+    cpm_username: "super"
+    cpm_password: "super"
+    cpm_path: "/srv/wti/store"
+    backend: store
+  run_once: true
+
+- name: Show how many configurations changed
+  debug:
+    msg: "{{ backup.summary.written }} written, {{ backup.summary.unchanged }} unchanged"
+  run_once: true
+"""
+
+RETURN = """
+backups:
+    description: The backup of every device, keyed by device URL.
+    returned: always
+    type: dict
+    sample: { "rest.wti.com": { "status": "written", "file": "VMR-8HD20-1-rest.wti.com-2026-10-18T02:00:03.xml.gz",
+              "unit_type": "VMR-8HD20-1", "size": 329439, "stored_size": 31207, "compress": "gzip",
+              "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+              "saved": 1760752803.1, "last_seen": 1760752803.1, "url": "rest.wti.com" } }
+errors:
+    description: The error of every device that could not be backed up, keyed by device URL.
+    returned: always
+    type: dict
+    sample: { "192.168.0.158": "GET: Error connecting to https://192.168.0.158/cgi-bin/gethtml?formWTIDownloadConfigXML.html : timed out" }
+summary:
+    description: The number of devices with a C(written) or C(unchanged) backup, and C(failed).
+    returned: always
+    type: dict
+    sample: { "written": 12, "unchanged": 2987, "failed": 1 }
+bytes_written:
+    description: The bytes written to I(cpm_path) for new backups, after compression, and with I(backend=store) only for sections
+                 that were not stored yet.
+    returned: always
+    type: int
+    sample: 374484
+"""
+
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import BACKUP_PATH, HAS_LZMA, BackupCatalog, BackupFiles, BackupStore
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import save_backup
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_argument_spec, fleet_client, fleet_devices, fleet_map
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_token_cache
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = fleet_argument_spec()
+    module_args.update(
+        cpm_path=dict(type='path', default="/tmp/"),
+        compress=dict(type='str', default='gzip', choices=['none', 'gzip', 'xz']),
+        backend=dict(type='str', default='files', choices=['files', 'store']),
+        catalog=dict(type='bool', default=True),
+        ignore=dict(type='list', elements='str', default=[])
+    )
+
+    result = dict(
+        changed=False,
+        backups={},
+        errors={},
+        summary=dict(written=0, unchanged=0, failed=0),
+        bytes_written=0
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    if module.params['compress'] == 'xz' and not HAS_LZMA:
+        module.fail_json(msg='compress=xz requires the Python lzma module', changed=False)
+
+    devices = fleet_devices(module)
+    token_cache = fleet_token_cache(module)
+    path = module.params['cpm_path']
+    if module.params['backend'] == 'store':
+        store = BackupStore(path, module.params['compress'])
+    else:
+        store = BackupFiles(path, module.params['compress'])
+
+    if not module.check_mode and not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError as e:
+            module.fail_json(msg='BACKUP: Could not create {0} : {1}'.format(path, to_native(e)), **result)
+
+    def backup(device):
+        client = fleet_client(device, timeout=module.params['timeout'], token_cache=token_cache)
+        try:
+            data = client.request(BACKUP_PATH, content_type='application/xml').read()
+        except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+            return None, wti_error('GET', client.url(BACKUP_PATH), e)
+        finally:
+            client.close()
+        try:
+            return save_backup(store, device['cpm_url'], data, ignore=module.params['ignore'], save=not module.check_mode), None
+        except (IOError, OSError) as e:
+            return None, 'BACKUP: Could not write the backup of {0} to {1} : {2}'.format(device['cpm_url'], path, to_native(e))
+
+    for device, (entry, error) in zip(devices, fleet_map(backup, devices, module.params['max_workers'])):
+        url = device['cpm_url']
+        if error is not None:
+            result['errors'][url] = error
+            result['summary']['failed'] += 1
+            continue
+        result['backups'][url] = entry
+        result['summary'][entry['status']] += 1
+        if entry['status'] == 'written':
+            result['changed'] = True
+            result['bytes_written'] += entry.get('stored_size', 0)
+
+    if module.params['catalog'] and not module.check_mode:
+        try:
+            BackupCatalog(path).record(result['backups'].values(), backend=module.params['backend'])
+        except (IOError, OSError) as e:
+            module.fail_json(msg='BACKUP: Could not update the backup catalog in {0} : {1}'.format(path, to_native(e)), **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to retrieve information from many WTI OOB and PDU devices at once.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_fleet_info
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Get information from many WTI OOB and PDU devices concurrently
+description:
+    - "Query a list of WTI OOB and PDU devices concurrently from a single task and return the results per device."
+    - "Each device is queried over one keep-alive connection, up to I(max_workers) devices at the same time."
+options:
+    cpm_url:
+        description:
+            - List of URLs of the WTI devices to query.
+        type: list
+        elements: str
+        required: false
+        default: []
+    devices:
+        description:
+            - List of WTI devices to query, for devices that need settings other than the module level ones.
+            - Settings that are left out are taken from the module level options.
+        type: list
+        elements: dict
+        required: false
+        default: []
+        suboptions:
+            cpm_url:
+                description:
+                    - This is the URL of the WTI device.
+                type: str
+                required: true
+            cpm_username:
+                description:
+                    - This is the Username of the WTI device.
+                type: str
+            cpm_password:
+                description:
+                    - This is the Password of the WTI device.
+                type: str
+            use_https:
+                description:
+                    - Designates to use an https connection or http connection.
+                type: bool
+            validate_certs:
+                description:
+                    - If false, SSL certificates will not be validated.
+                type: bool
+            use_proxy:
+                description:
+                    - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+                type: bool
+    cpm_username:
+        description:
+            - This is the Username of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI devices to send the module.
+        type: str
+        required: false
+    endpoints:
+        description:
+            - The REST endpoints to query on every device, below C(/api/v2/).
+        type: list
+        elements: str
+        required: false
+        default: ["status/status"]
+        choices: ["status/status", "status/firmware", "status/alarms", "status/temperature", "status/current",
+                  "status/power", "status/dnsservices", "config/hostname", "config/interface", "config/timedate",
+                  "config/cellular", "config/iptables", "config/snmpaccess", "config/ssh", "config/syslogclient",
+                  "config/syslogserver", "config/web"]
+    cache_ttl:
+        description:
+            - Seconds a response is reused from the controller side response cache, instead of asking the device again.
+            - The default C(0) disables the cache.
+        type: int
+        required: false
+        default: 0
+    max_workers:
+        description:
+            - The maximum number of devices queried at the same time.
+        type: int
+        required: false
+        default: 10
+    timeout:
+        description:
+            - Seconds to wait for a device to connect or answer a request.
+        type: int
+        required: false
+        default: 10
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - Devices that cannot be reached do not fail the task, they are listed in C(errors).
+ - Run this module once, for example with C(run_once) or against C(localhost), not once per device.
+"""
+
+EXAMPLES = """
+- name: Get the status and firmware of all WTI devices in the inventory
+  cpm_fleet_info:
+    cpm_url: "{{ groups['wti'] | map('extract', hostvars, 'ansible_host') | list }}"
+    cpm_username: "super"
+    cpm_password: "super"
+    endpoints:
+      - status/status
+      - status/firmware
+    max_workers: 50
+    validate_certs: false
+  run_once: true
+  register: fleet
+
+- name: Get the alarms of two WTI devices with different credentials
+  cpm_fleet_info:
+    devices:
+      - cpm_url: "rest.wti.com"
+        cpm_username: "restpower"
+        cpm_password: "restfulpowerpass12"
+      - cpm_url: "192.168.0.158"
+        cpm_username: "super"
+        cpm_password: "super"
+        use_https: false
+    endpoints:
+      - status/alarms
+"""
+
+RETURN = """
+data:
+    description: The output JSON returned by every endpoint, keyed by device URL and endpoint.
+    returned: always
+    type: dict
+    sample: { "rest.wti.com": { "status/status": { "siteid": "Lab1", "status": { "code": "0", "text": "OK" } } } }
+errors:
+    description: The error of every endpoint that could not be read, keyed by device URL and endpoint.
+    returned: always
+    type: dict
+    sample: { "192.168.0.158": { "status/status": "GET: Error connecting to https://192.168.0.158/api/v2/status/status : timed out" } }
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.wti.remote.plugins.module_utils.wti_cache import ResponseCache
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_argument_spec, fleet_client, fleet_devices, fleet_map
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_token_cache, query_device
+
+ENDPOINTS = ["status/status", "status/firmware", "status/alarms", "status/temperature", "status/current",
+             "status/power", "status/dnsservices", "config/hostname", "config/interface", "config/timedate",
+             "config/cellular", "config/iptables", "config/snmpaccess", "config/ssh", "config/syslogclient",
+             "config/syslogserver", "config/web"]
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = fleet_argument_spec()
+    module_args.update(
+        endpoints=dict(type='list', elements='str', choices=ENDPOINTS, default=['status/status']),
+        cache_ttl=dict(type='int', default=0)
+    )
+
+    result = dict(
+        changed=False,
+        data={},
+        errors={}
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    devices = fleet_devices(module)
+    paths = ["/api/v2/%s" % endpoint for endpoint in module.params['endpoints']]
+
+    token_cache = fleet_token_cache(module)
+
+    def query(device):
+        client = fleet_client(device, timeout=module.params['timeout'], token_cache=token_cache)
+        if module.params['cache_ttl']:
+            client.cache = ResponseCache(module.params['cache_ttl'])
+        return query_device(client, paths)
+
+    for device, (data, errors) in zip(devices, fleet_map(query, devices, module.params['max_workers'])):
+        result['data'][device['cpm_url']] = dict((path[len('/api/v2/'):], value) for path, value in data.items())
+        if errors:
+            result['errors'][device['cpm_url']] = dict((path[len('/api/v2/'):], value) for path, value in errors.items())
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to restore the configuration of many WTI OOB and PDU devices at once.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_fleet_restore
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Restore the configuration of many WTI OOB and PDU devices concurrently
+description:
+    - "Send a configuration backup to every device of a list, as M(wti.remote.cpm_config_restore) does for one,
+       up to I(max_workers) devices at the same time."
+    - "After the upload every device is polled until it answers again, then its configuration is downloaded and compared
+       with the backup that was sent, by the SHA-256 of their canonical XML. The result lists per device whether the restore passed."
+options:
+    backups:
+        description:
+            - The backup file to restore on every device, keyed by device URL, as the C(file) returned by M(wti.remote.cpm_fleet_backup).
+            - Relative file names are taken from I(cpm_path). Files ending in C(.gz) or C(.xz) are decompressed while they are sent.
+        type: dict
+        required: true
+    cpm_url:
+        description:
+            - List of URLs of the WTI devices to restore, devices in I(backups) are added to it.
+        type: list
+        elements: str
+        required: false
+        default: []
+    devices:
+        description:
+            - List of WTI devices to restore, for devices that need settings other than the module level ones.
+            - Settings that are left out are taken from the module level options.
+        type: list
+        elements: dict
+        required: false
+        default: []
+        suboptions:
+            cpm_url:
+                description:
+                    - This is the URL of the WTI device.
+                type: str
+                required: true
+            cpm_username:
+                description:
+                    - This is the Username of the WTI device.
+                type: str
+            cpm_password:
+                description:
+                    - This is the Password of the WTI device.
+                type: str
+            use_https:
+                description:
+                    - Designates to use an https connection or http connection.
+                type: bool
+            validate_certs:
+                description:
+                    - If false, SSL certificates will not be validated.
+                type: bool
+            use_proxy:
+                description:
+                    - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+                type: bool
+    cpm_username:
+        description:
+            - This is the Username of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI devices to send the module.
+        type: str
+        required: false
+    cpm_path:
+        description:
+            - The directory of the backup files.
+        type: path
+        required: false
+        default: "/tmp/"
+    backup_store:
+        description:
+            - I(cpm_path) is a backup store written by M(wti.remote.cpm_fleet_backup) with C(backend=store),
+              the configuration files are rebuilt from the sections in the store.
+        type: bool
+        required: false
+        default: false
+    wait_timeout:
+        description:
+            - Seconds to wait for a device to answer again after its configuration was sent.
+        type: int
+        required: false
+        default: 300
+    wait_for_down:
+        description:
+            - Wait for every device to stop answering first, for configurations that make the device restart.
+        type: bool
+        required: false
+        default: false
+    verify:
+        description:
+            - Download the configuration of every device after the restore and compare it with the backup that was sent.
+        type: bool
+        required: false
+        default: true
+    ignore:
+        description:
+            - Names of XML attributes and elements to leave out of the comparison, for values that change on every download.
+        type: list
+        elements: str
+        required: false
+        default: []
+    max_workers:
+        description:
+            - The maximum number of devices restored at the same time.
+        type: int
+        required: false
+        default: 10
+    timeout:
+        description:
+            - Seconds to wait for a device to connect or answer a request.
+        type: int
+        required: false
+        default: 10
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - The task fails when any device failed, after all devices were restored, C(devices) lists the result of every device.
+ - Run this module once, for example with C(run_once) or against C(localhost), not once per device.
+ - In check mode every backup is read and checked, but nothing is sent.
+"""
+
+EXAMPLES = """
+- name: Restore the replaced devices of a rack
+  cpm_fleet_restore:
+    cpm_username: "super"
+    cpm_password: "super"
+    cpm_path: "/srv/wti/backup"
+    backups:
+      "rack4-pdu1.wti.com": "VMR-8HD20-1-rack4-pdu1.wti.com-2026-10-18T02:00:03.xml.gz"
+      "rack4-pdu2.wti.com": "VMR-8HD20-1-rack4-pdu2.wti.com-2026-10-18T02:00:04.xml.gz"
+      "rack4-oob.wti.com": "TSM-8-rack4-oob.wti.com-2026-10-18T02:00:03.xml.gz"
+    max_workers: 20
+    validate_certs: false
+  run_once: true
+  register: restore
+"""
+
+RETURN = """
+devices:
+    description: The result of every device, keyed by device URL. C(status) is C(passed), C(restored) without I(verify),
+                 C(failed), or C(skipped) in check mode. A failed device has the C(stage) it failed in, C(read), C(upload),
+                 C(wait) or C(verify), and the C(error).
+    returned: always
+    type: dict
+    sample: { "rack4-pdu1.wti.com": { "status": "passed", "file": "VMR-8HD20-1-rack4-pdu1.wti.com-2026-10-18T02:00:03.xml.gz",
+              "size": 329439, "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+              "restored_sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", "seconds": 41.3 },
+              "rack4-oob.wti.com": { "status": "failed", "stage": "verify", "file": "TSM-8-rack4-oob.wti.com-2026-10-18T02:00:03.xml.gz",
+              "size": 210114, "sha256": "60303ae22b998861bce3b28f33eec1be758a213c86c93c076dbe9f558c11c752",
+              "restored_sha256": "fd61a03af4f77d870fc21e05e7e80678095c92d808cfb3b5c279ee04c74aca13", "seconds": 38.9,
+              "error": "VERIFY: The configuration of rack4-oob.wti.com differs from the backup after the restore" } }
+summary:
+    description: The number of devices per status.
+    returned: always
+    type: dict
+    sample: { "passed": 2, "restored": 0, "failed": 1, "skipped": 0 }
+"""
+
+import json
+import os
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native, to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import BACKUP_PATH, RESTORE_PATH, BackupBody, BackupStore
+from ansible_collections.wti.remote.plugins.module_utils.wti_backup import canonical_sha256
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_argument_spec, fleet_client, fleet_devices, fleet_map
+from ansible_collections.wti.remote.plugins.module_utils.wti_fleet import fleet_token_cache
+from ansible_collections.wti.remote.plugins.module_utils.wti_wait import STATUS_PATH, WaitTimeout, wait_for_device
+
+STATUSES = ("passed", "restored", "failed", "skipped")
+
+
+class RestoreFailed(Exception):
+    def __init__(self, stage, msg):
+        super(RestoreFailed, self).__init__(msg)
+        self.stage = stage
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = fleet_argument_spec()
+    module_args.update(
+        backups=dict(type='dict', required=True),
+        cpm_path=dict(type='path', default="/tmp/"),
+        backup_store=dict(type='bool', default=False),
+        wait_timeout=dict(type='int', default=300),
+        wait_for_down=dict(type='bool', default=False),
+        verify=dict(type='bool', default=True),
+        ignore=dict(type='list', elements='str', default=[])
+    )
+
+    result = dict(
+        changed=False,
+        devices={},
+        summary=dict((status, 0) for status in STATUSES)
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    backups = dict((to_native(url), to_native(name)) for url, name in module.params['backups'].items())
+    listed = set(module.params['cpm_url']) | set(device['cpm_url'] for device in module.params['devices'])
+    module.params['cpm_url'] = module.params['cpm_url'] + sorted(url for url in backups if url not in listed)
+    devices = fleet_devices(module)
+    missing = [device['cpm_url'] for device in devices if device['cpm_url'] not in backups]
+    if missing:
+        module.fail_json(msg='no backup in backups for: %s' % ', '.join(missing), changed=False)
+
+    token_cache = fleet_token_cache(module)
+    path = module.params['cpm_path']
+    store = BackupStore(path) if module.params['backup_store'] else None
+    ignore = module.params['ignore']
+
+    def open_backup(name):
+        if store is not None:
+            return BackupBody(name, store=store)
+        return BackupBody(os.path.join(path, name))
+
+    def send(client, name):
+        try:
+            body = open_backup(name)
+        except (IOError, OSError, ValueError) as e:
+            raise RestoreFailed('read', 'RESTORE: Could not read the backup {0} : {1}'.format(name, to_native(e)))
+        try:
+            # the canonical hash is taken while the backup is parsed from disk, which also checks it before it is sent
+            try:
+                expected = canonical_sha256(body, ignore)
+            except (IOError, OSError) as e:
+                raise RestoreFailed('read', 'RESTORE: Could not read the backup {0} : {1}'.format(name, to_native(e)))
+            if module.check_mode:
+                return body.length, expected, False
+            body.seek(0)
+            try:
+                raw = client.request(RESTORE_PATH, method='POST', data=body, content_type='application/xml',
+                                     headers={'Content-Length': str(body.length)}).read()
+            except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+                raise RestoreFailed('upload', wti_error('POST', client.url(RESTORE_PATH), e))
+        finally:
+            body.close()
+        try:
+            status = json.loads(to_text(raw, errors='surrogate_or_strict'))['status']
+        except (ValueError, KeyError, TypeError):
+            raise RestoreFailed('upload', 'RESTORE: Unexpected reply from {0} : {1}'.format(client.url(RESTORE_PATH), to_native(raw)))
+        if str(status.get('code')) != '0':
+            raise RestoreFailed('upload', 'RESTORE: {0} rejected the backup {1} : {2}'.format(client.cpm_url, name, status.get('text')))
+        return body.length, expected, True
+
+    def restore(device):
+        name = backups[device['cpm_url']]
+        report = dict(file=name, status='failed')
+        start = time.time()
+        client = fleet_client(device, timeout=module.params['timeout'], token_cache=token_cache)
+        try:
+            report['size'], report['sha256'], sent = send(client, name)
+            if not sent:
+                report['status'] = 'skipped'
+                return report
+            report['sent'] = True
+            try:
+                wait_for_device(client, module.params['wait_timeout'], down=module.params['wait_for_down'])
+            except WaitTimeout as e:
+                raise RestoreFailed('wait', to_native(e))
+            except HTTPError as e:
+                raise RestoreFailed('wait', wti_error('GET', client.url(STATUS_PATH), e))
+            client.session.timeout = module.params['timeout']
+            if not module.params['verify']:
+                report['status'] = 'restored'
+                return report
+            try:
+                report['restored_sha256'] = canonical_sha256(client.request(BACKUP_PATH, content_type='application/xml').read(), ignore)
+            except (HTTPError, URLError, SSLValidationError, ConnectionError) as e:
+                raise RestoreFailed('verify', wti_error('GET', client.url(BACKUP_PATH), e))
+            if report['restored_sha256'] != report['sha256']:
+                raise RestoreFailed('verify', 'VERIFY: The configuration of {0} differs from the backup after the restore'.format(client.cpm_url))
+            report['status'] = 'passed'
+        except RestoreFailed as e:
+            report['stage'] = e.stage
+            report['error'] = to_native(e)
+        finally:
+            client.close()
+            report['seconds'] = round(time.time() - start, 1)
+        return report
+
+    for device, report in zip(devices, fleet_map(restore, devices, module.params['max_workers'])):
+        result['changed'] = result['changed'] or report.pop('sent', False)
+        result['devices'][device['cpm_url']] = report
+        result['summary'][report['status']] += 1
+
+    if result['summary']['failed']:
+        module.fail_json(msg='RESTORE: {0} of {1} devices failed'.format(result['summary']['failed'], len(devices)), **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
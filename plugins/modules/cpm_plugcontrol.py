@@ -44,17 +44,17 @@ options:
     description:
       - This is the URL of the WTI device  to send the module.
     type: str
-    required: true
+    required: false
   cpm_username:
     description:
       - This is the Username of the WTI device to send the module.
     type: str
-    required: true
+    required: false
   cpm_password:
     description:
       - This is the Password of the WTI device to send the module.
     type: str
-    required: true
+    required: false
   use_https:
     description:
       - Designates to use an https connection or http connection.
@@ -86,6 +86,20 @@ options:
     type: str
     required: false
     choices: [ "on", "off", "boot", "default" ]
+  token_cache:
+    description:
+      - Directory to cache device API tokens in. When set, an API token is requested once per device and
+      - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+    type: path
+    required: false
+  token_cache_ttl:
+    description:
+      - Seconds a cached API token is used before a new one is requested.
+    type: int
+    required: false
+    default: 3600
+notes:
+  - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
 """
 
 EXAMPLES = """
@@ -130,13 +144,11 @@ data:
     type: str
 """
 
-import base64
 import json
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
-from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils._text import to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_request
 
 
 def assemble_json(cpmmodule, cpmresult):
@@ -157,20 +169,22 @@ def assemble_json(cpmmodule, cpmresult):
     return json_load
 
 
-def run_module():
+def run_module(module_class=None):
 
     # define the available arguments/parameters that a user can pass to
     # the module
     module_args = dict(
         cpm_action=dict(choices=['getplugcontrol', 'setplugcontrol'], required=True),
-        cpm_url=dict(type='str', required=True),
-        cpm_username=dict(type='str', required=True),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
         plug_id=dict(type='str', required=True),
         plug_state=dict(choices=['on', 'off', 'boot', 'default'], required=False),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
     )
 
     result = dict(
@@ -178,48 +192,27 @@ def run_module():
         data=''
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
     if module.check_mode:
         return result
 
-    auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                   errors='surrogate_or_strict')))
-
-    if module.params['use_https'] is True:
-        protocol = "https://"
-    else:
-        protocol = "http://"
+    client = wti_client(module)
 
     Payload = None
     if (module.params['cpm_action'] == 'getplugcontrol'):
-        fullurl = ("%s%s/api/v2/config/powerplug" % (protocol, to_native(module.params['cpm_url'])))
+        path = "/api/v2/config/powerplug"
         if (module.params['plug_id'].lower() != 'all'):
-            fullurl = '%s?plug=%s' % (fullurl, to_native(module.params['plug_id']))
+            path = '%s?plug=%s' % (path, to_native(module.params['plug_id']))
         method = 'GET'
     elif (module.params['cpm_action'] == 'setplugcontrol'):
         Payload = assemble_json(module, result)
-        fullurl = ("%s%s/api/v2/config/powerplug" % (protocol, to_native(module.params['cpm_url'])))
+        path = "/api/v2/config/powerplug"
         method = 'POST'
 
-    try:
-        response = open_url(fullurl, data=Payload, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
-        if (method != 'GET'):
-            result['changed'] = True
-
-    except HTTPError as e:
-        fail_json = dict(msg='Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='Error connecting to  for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+    response = wti_request(module, client, path, method=method, data=Payload)
+    if (method != 'GET'):
+        result['changed'] = True
 
     result['data'] = json.loads(response.read())
 
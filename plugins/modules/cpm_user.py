@@ -44,17 +44,17 @@ options:
         description:
             - This is the URL of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     cpm_username:
         description:
             - This is the Basic Authentication Username of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     cpm_password:
         description:
             - This is the Basic Authentication Password of the WTI device to send the module.
         type: str
-        required: true
+        required: false
     use_https:
         description:
             - Designates to use an https connection or http connection.
@@ -153,7 +153,21 @@ options:
             - This is the Call Back phone number used for POTS modem connections
         type: str
         required: false
- """
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+notes:
+  - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
+"""
 
 EXAMPLES = """
 # Get User Parameters
@@ -220,12 +234,9 @@ data:
     type: str
 """
 
-import base64
-
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils._text import to_text, to_bytes, to_native
-from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
-from ansible.module_utils.urls import open_url, ConnectionError, SSLValidationError
+from ansible.module_utils._text import to_text, to_native
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_request
 
 
 def assemble_json(cpmmodule):
@@ -262,13 +273,13 @@ def assemble_json(cpmmodule):
     return json_load
 
 
-def run_module():
+def run_module(module_class=None):
 
     module_args = dict(
         cpm_action=dict(choices=['getuser', 'adduser', 'edituser', 'deleteuser'], required=True),
-        cpm_url=dict(type='str', required=True),
-        cpm_username=dict(type='str', required=True, no_log=False),
-        cpm_password=dict(type='str', required=True, no_log=True),
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False, no_log=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
         user_name=dict(type='str', required=True),
         user_pass=dict(type='str', required=False, default=None, no_log=True),
         user_accesslevel=dict(type='int', required=False, default=None, choices=[0, 1, 2, 3]),
@@ -284,7 +295,9 @@ def run_module():
         user_callbackphone=dict(type='str', required=False, default=None),
         use_https=dict(type='bool', default=True),
         validate_certs=dict(type='bool', default=True),
-        use_proxy=dict(type='bool', default=False)
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
     )
 
     result = dict(
@@ -292,56 +305,35 @@ def run_module():
         data=''
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
 
     if module.check_mode:
         return result
 
-    auth = to_text(base64.b64encode(to_bytes('{0}:{1}'.format(to_native(module.params['cpm_username']), to_native(module.params['cpm_password'])),
-                   errors='surrogate_or_strict')))
-
-    if module.params['use_https'] is True:
-        protocol = "https://"
-    else:
-        protocol = "http://"
+    client = wti_client(module)
 
     payload = None
     if (module.params['cpm_action'] == 'getuser'):
-        fullurl = ("%s%s/api/v2/config/users?username=%s" % (protocol, to_native(module.params['cpm_url']), to_native(module.params['user_name'])))
+        path = ("/api/v2/config/users?username=%s" % (to_native(module.params['user_name'])))
         method = 'GET'
     elif (module.params['cpm_action'] == 'adduser'):
         if module.params["user_pass"] is None or (len(module.params["user_pass"]) == 0):
             module.fail_json(msg='user_pass not defined.', **result)
 
         payload = assemble_json(module)
-        fullurl = ("%s%s/api/v2/config/users" % (protocol, to_native(module.params['cpm_url'])))
+        path = "/api/v2/config/users"
         method = 'POST'
     elif (module.params['cpm_action'] == 'edituser'):
         payload = assemble_json(module)
-        fullurl = ("%s%s/api/v2/config/users" % (protocol, to_native(module.params['cpm_url'])))
+        path = "/api/v2/config/users"
         method = 'PUT'
     elif (module.params['cpm_action'] == 'deleteuser'):
-        fullurl = ("%s%s/api/v2/config/users?username=%s" % (protocol, to_native(module.params['cpm_url']), to_native(module.params['user_name'])))
+        path = ("/api/v2/config/users?username=%s" % (to_native(module.params['user_name'])))
         method = 'DELETE'
 
-    try:
-        response = open_url(fullurl, data=payload, method=method, validate_certs=module.params['validate_certs'], use_proxy=module.params['use_proxy'],
-                            headers={'Content-Type': 'application/json', 'Authorization': "Basic %s" % auth})
-        if (method != 'GET'):
-            result['changed'] = True
-
-    except HTTPError as e:
-        fail_json = dict(msg='Received HTTP error for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except URLError as e:
-        fail_json = dict(msg='Failed lookup url for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except SSLValidationError as e:
-        fail_json = dict(msg='Error validating the server''s certificate for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
-    except ConnectionError as e:
-        fail_json = dict(msg='Error connecting to  for {0} : {1}'.format(fullurl, to_native(e)), changed=False)
-        module.fail_json(**fail_json)
+    response = wti_request(module, client, path, method=method, data=payload)
+    if (method != 'GET'):
+        result['changed'] = True
 
     result['data'] = to_text(response.read())
     module.exit_json(**result)
@@ -0,0 +1,246 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Module to wait for WTI OOB and PDU devices to be ready.
+# CPM remote_management
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = """
+---
+module: cpm_wait_for
+version_added: "1.1.0"
+author:
+    - "Western Telematic Inc. (@wtinetworkgear)"
+short_description: Wait for WTI OOB and PDU devices to be ready
+description:
+    - "Poll a WTI OOB or PDU device until it answers its status, for example after a reboot or a firmware upgrade."
+    - "Polls are spaced with exponential backoff and jitter, so the task returns soon after the device is ready."
+    - "The task fails right away when the device rejects the credentials with HTTP 401 or 403."
+options:
+    cpm_url:
+        description:
+            - This is the URL of the WTI device to send the module.
+        type: str
+        required: false
+    cpm_username:
+        description:
+            - This is the Username of the WTI device to send the module.
+        type: str
+        required: false
+    cpm_password:
+        description:
+            - This is the Password of the WTI device to send the module.
+        type: str
+        required: false
+    firmware:
+        description:
+            - Wait until C(/api/v2/status/firmware) reports at least this firmware version, for example C(8.09).
+            - If not set, C(/api/v2/status/status) is polled until the device answers with an OK status.
+        type: str
+        required: false
+    wait_for_down:
+        description:
+            - Wait for the device to stop answering first, before waiting for it to be ready.
+            - Use this right after a reboot was requested, so the device is not reported ready before it went down.
+        type: bool
+        required: false
+        default: false
+    delay:
+        description:
+            - Seconds to wait before the first poll.
+        type: int
+        required: false
+        default: 0
+    timeout:
+        description:
+            - Seconds to wait for the device in total before failing.
+        type: int
+        required: false
+        default: 300
+    sleep:
+        description:
+            - Seconds between the first polls, doubled after every poll up to I(max_sleep).
+            - Every pause is shortened by a random amount of up to half, so many devices do not poll in step.
+        type: int
+        required: false
+        default: 1
+    max_sleep:
+        description:
+            - The maximum number of seconds between two polls.
+        type: int
+        required: false
+        default: 30
+    poll_timeout:
+        description:
+            - Seconds a single poll waits for the device to connect or answer.
+        type: int
+        required: false
+        default: 10
+    use_https:
+        description:
+            - Designates to use an https connection or http connection.
+        type: bool
+        required: false
+        default: true
+    validate_certs:
+        description:
+            - If false, SSL certificates will not be validated. This should only be used
+            - on personally controlled sites using self-signed certificates.
+        type: bool
+        required: false
+        default: true
+    use_proxy:
+        description:
+            - Flag to control if the lookup will observe HTTP proxy environment variables when present.
+        type: bool
+        required: false
+        default: false
+    token_cache:
+        description:
+            - Directory to cache device API tokens in. When set, an API token is requested once per device and
+            - sent in the X-WTI-API-KEY header instead of Basic authentication on all later requests.
+        type: path
+        required: false
+    token_cache_ttl:
+        description:
+            - Seconds a cached API token is used before a new one is requested.
+        type: int
+        required: false
+        default: 3600
+notes:
+ - Use C(groups/cpm) in C(module_defaults) to set common options used between CPM modules.)
+ - C(cpm_url), C(cpm_username) and C(cpm_password) can be left out when the task uses the C(wti.remote.wti) httpapi connection.
+"""
+
+EXAMPLES = """
+- name: Reboot a WTI device and wait until it is back
+  cpm_wait_for:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    use_https: true
+    validate_certs: false
+    wait_for_down: true
+    timeout: 600
+
+- name: Wait until a WTI device runs firmware 8.09 or later
+  cpm_wait_for:
+    cpm_url: "nonexist.wti.com"
+    cpm_username: "super"
+    cpm_password: "super"
+    firmware: "8.09"
+    timeout: 900
+    max_sleep: 60
+"""
+
+RETURN = """
+data:
+    description: The output JSON of the last status poll, from C(status/firmware) when I(firmware) is set.
+    returned: success
+    type: dict
+    sample: { "siteid": "Lab1", "status": { "code": "0", "text": "OK" } }
+attempts:
+    description: The number of polls sent to the device.
+    returned: always
+    type: int
+    sample: 4
+elapsed:
+    description: Seconds waited for the device, including I(delay).
+    returned: always
+    type: float
+    sample: 37.2
+"""
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible_collections.wti.remote.plugins.module_utils.wti_client import wti_client, wti_error
+from ansible_collections.wti.remote.plugins.module_utils.wti_wait import FIRMWARE_PATH, STATUS_PATH, WaitTimeout, parse_version, wait_for_device
+
+
+def run_module(module_class=None):
+    # define the available arguments/parameters that a user can pass to
+    # the module
+    module_args = dict(
+        cpm_url=dict(type='str', required=False),
+        cpm_username=dict(type='str', required=False),
+        cpm_password=dict(type='str', required=False, no_log=True),
+        firmware=dict(type='str', required=False),
+        wait_for_down=dict(type='bool', default=False),
+        delay=dict(type='int', default=0),
+        timeout=dict(type='int', default=300),
+        sleep=dict(type='int', default=1),
+        max_sleep=dict(type='int', default=30),
+        poll_timeout=dict(type='int', default=10),
+        use_https=dict(type='bool', default=True),
+        validate_certs=dict(type='bool', default=True),
+        use_proxy=dict(type='bool', default=False),
+        token_cache=dict(type='path', required=False),
+        token_cache_ttl=dict(type='int', default=3600)
+    )
+
+    result = dict(
+        changed=False,
+        attempts=0,
+        elapsed=0
+    )
+
+    module = (module_class or AnsibleModule)(argument_spec=module_args, supports_check_mode=True)
+
+    if module.params['sleep'] < 1 or module.params['max_sleep'] < module.params['sleep']:
+        module.fail_json(msg='sleep must be at least 1 and max_sleep at least sleep', changed=False)
+
+    if module.params['firmware'] is not None and parse_version(module.params['firmware']) is None:
+        module.fail_json(msg='firmware must be a version number such as 8.09, got {0}'.format(module.params['firmware']), changed=False)
+
+    start = time.time()
+    if module.params['delay'] > 0:
+        time.sleep(module.params['delay'])
+
+    client = wti_client(module)
+
+    try:
+        result['data'], result['attempts'] = wait_for_device(client, module.params['timeout'], firmware=module.params['firmware'],
+                                                             down=module.params['wait_for_down'], sleep=module.params['sleep'],
+                                                             max_sleep=module.params['max_sleep'], poll_timeout=module.params['poll_timeout'])
+    except WaitTimeout as e:
+        result['attempts'] = e.attempts
+        result['elapsed'] = round(time.time() - start, 1)
+        module.fail_json(msg=str(e), **result)
+    except HTTPError as e:
+        # the device rejected the credentials, waiting longer would not help
+        result['elapsed'] = round(time.time() - start, 1)
+        module.fail_json(msg=wti_error('GET', client.url(FIRMWARE_PATH if module.params['firmware'] else STATUS_PATH), e), **result)
+    finally:
+        client.close()
+
+    result['elapsed'] = round(time.time() - start, 1)
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+from ansible.inventory.data import InventoryData
+
+from ansible_collections.wti.remote.plugins.inventory.cpm import InventoryModule, expand_hosts
+from ansible_collections.wti.remote.plugins.module_utils import wti_client
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+REPLIES = {
+    "status/status": {"vendor": "wti", "siteid": "Rack 12", "modeminstalled": "Yes, 4G/LTE"},
+    "status/firmware": {"config": {"firmware": "6.60", "family": "1"}},
+    "status/current": {"powerunit": "1", "ats": "0"},
+}
+
+
+def _plugin(**options):
+    plugin = InventoryModule()
+    plugin._options = dict(hosts=[], cpm_username="super", cpm_password="super", use_https=True, validate_certs=False,
+                           use_proxy=False, timeout=3, max_workers=10, endpoints=["status/firmware", "status/current"],
+                           strict=False, compose={}, groups={}, keyed_groups=[])
+    plugin._options.update(options)
+    plugin.inventory = InventoryData()
+    return plugin
+
+
+def test_expand_hosts():
+    assert expand_hosts(["10.0.0.0/30", "10.0.0.1", "pdu1.example:8443", "10.0.0.9/32"]) == \
+        ["10.0.0.1", "10.0.0.2", "pdu1.example:8443", "10.0.0.9"]
+
+
+def test_devices_are_discovered_and_grouped(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        if "10.0.0.2" in url:
+            raise wti_client.ConnectionError("timed out")
+        return DummyResponse(REPLIES[url.split("/api/v2/")[1]])
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+    plugin = _plugin(hosts=["10.0.0.0/30"])
+
+    devices = plugin.discover()
+    plugin.populate(devices)
+
+    assert sorted(devices) == ["10.0.0.1"]
+    groups = plugin.inventory.get_host("10.0.0.1").get_groups()
+    assert sorted(group.name for group in groups) == ["wti", "wti_family_console", "wti_firmware_6_60",
+                                                      "wti_modem", "wti_powerunit", "wti_site_Rack_12"]
+    hostvars = plugin.inventory.get_host("10.0.0.1").get_vars()
+    assert hostvars["cpm_url"] == "10.0.0.1"
+    assert hostvars["wti_current"] == {"powerunit": "1", "ats": "0"}
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import gzip
+import os
+
+import pytest
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_backup
+
+CONFIG = (b'<?xml version="1.0"?>\n<wtiparameters>\n  <site unit_type_info="VMR-8HD20-1">\n'
+          b'    <siteid name="Lab1" location="Rack 4"/>\n    <timestamp>2026-10-18T02:00:03</timestamp>\n  </site>\n</wtiparameters>\n')
+
+
+def test_canonical_xml_ignores_layout():
+    reordered = (b'<wtiparameters><!-- exported --><site unit_type_info="VMR-8HD20-1"><siteid location="Rack 4" name="Lab1"></siteid>'
+                 b'<timestamp>2026-10-19T02:00:07</timestamp></site></wtiparameters>')
+
+    assert wti_backup.canonical_xml(CONFIG) != wti_backup.canonical_xml(reordered)
+    assert wti_backup.canonical_xml(CONFIG, ignore=["timestamp"]) == wti_backup.canonical_xml(reordered, ignore=["timestamp"])
+    assert wti_backup.canonical_xml(CONFIG, ignore=["timestamp"]) == (b'<wtiparameters><site unit_type_info="VMR-8HD20-1">'
+                                                                      b'<siteid location="Rack 4" name="Lab1"></siteid></site></wtiparameters>')
+    assert wti_backup.canonical_xml(b'<html>\r\nError</html \r\n\r\n') == b'<html>\nError</html'
+    assert wti_backup.unit_type(CONFIG) == "VMR-8HD20-1"
+
+
+def test_unchanged_backup_only_marks_seen(tmp_path):
+    path = str(tmp_path)
+    files = wti_backup.BackupFiles(path, "gzip")
+
+    first = wti_backup.save_backup(files, "pdu1.example:8443", CONFIG, now=1000)
+    assert first["status"] == "written"
+    assert first["file"].startswith("VMR-8HD20-1-pdu1.example:8443-1970-01-01T") and first["file"].endswith(".xml.gz")
+    with gzip.open(os.path.join(path, first["file"])) as f:
+        assert f.read() == CONFIG
+
+    second = wti_backup.save_backup(files, "pdu1.example:8443", CONFIG.replace(b"\n", b"\r\n"), now=2000)
+    assert second["status"] == "unchanged"
+    assert second["file"] == first["file"]
+    assert wti_backup.BackupMarker(path, "pdu1.example:8443").load()["last_seen"] == 2000
+    assert sorted(os.listdir(path)) == sorted([first["file"], ".wti_backup-files-pdu1.example:8443.json"])
+
+    third = wti_backup.save_backup(files, "pdu1.example:8443", CONFIG.replace(b"Lab1", b"Lab2"), now=1000)
+    assert third["status"] == "written"
+    assert third["file"] == first["file"][:-7] + "-1.xml.gz"
+    assert third["stored_size"] == os.path.getsize(os.path.join(path, third["file"]))
+
+
+def test_backends_keep_markers_of_their_own(tmp_path):
+    path = str(tmp_path)
+
+    assert wti_backup.save_backup(wti_backup.BackupFiles(path), "pdu1.example", CONFIG, now=1000)["status"] == "written"
+    # the XML file of the files backend is no backup in the store on the same path
+    stored = wti_backup.save_backup(wti_backup.BackupStore(path), "pdu1.example", CONFIG, now=2000)
+    assert stored["status"] == "written"
+    assert stored["file"].startswith("manifests/pdu1.example/")
+    assert wti_backup.save_backup(wti_backup.BackupFiles(path), "pdu1.example", CONFIG, now=3000)["status"] == "unchanged"
+
+
+def test_store_shares_sections_between_devices(tmp_path):
+    store = wti_backup.BackupStore(str(tmp_path), "gzip")
+    other = CONFIG.replace(b"Lab1", b"Lab2")
+
+    assert b"".join(wti_backup.split_sections(CONFIG)) == CONFIG
+    assert len(wti_backup.split_sections(CONFIG)) == 2
+    assert wti_backup.split_sections(b"<html>Error") == [b"<html>Error"]
+
+    first = wti_backup.save_backup(store, "pdu1.example", CONFIG, now=1000)
+    second = wti_backup.save_backup(store, "pdu2.example", other, now=1000)
+    assert first["file"].startswith("manifests/pdu1.example/1970-01-01T")
+    assert second["stored_size"] < first["stored_size"]
+    assert len(os.listdir(str(tmp_path / "objects"))) == 3
+
+    assert store.read(first["file"]) == CONFIG
+    reader = store.open(second["file"])
+    assert reader.read(10) + reader.read() == other
+
+    section = wti_backup.split_sections(other)[1]
+    digest = wti_backup.hashlib.sha256(section).hexdigest()
+    with gzip.open(str(tmp_path / "objects" / digest[:2] / (digest + ".gz")), "wb") as f:
+        f.write(section.replace(b"Lab2", b"Lab3"))
+    with pytest.raises(IOError):
+        store.read(second["file"])
+
+
+def test_catalog_merges_and_prunes(tmp_path):
+    files = wti_backup.BackupFiles(str(tmp_path))
+    catalog = wti_backup.BackupCatalog(str(tmp_path))
+    day = 86400
+    for now, url, site in ((1 * day, "pdu1", b"Lab1"), (2 * day, "pdu1", b"Lab2"), (3 * day, "pdu1", b"Lab3"), (3 * day, "pdu2", b"Lab1")):
+        catalog.record([wti_backup.save_backup(files, url, CONFIG.replace(b"Lab1", site), now=now)])
+    catalog.record([wti_backup.save_backup(files, "pdu1", CONFIG.replace(b"Lab1", b"Lab3"), now=4 * day)])
+    with open(catalog.file, "a") as f:
+        f.write('{"file": "cut sh')
+
+    assert [entry["saved"] for entry in catalog.query(urls={"pdu1"})] == [1 * day, 2 * day, 3 * day]
+    assert catalog.query(urls={"pdu1"}, latest=True)[0]["last_seen"] == 4 * day
+    assert [entry["url"] for entry in catalog.query(since=3 * day)] == ["pdu1", "pdu2"]
+
+    remove = wti_backup.expired(catalog.entries(), count=1, days=2, now=4 * day)
+    assert [(entry["url"], entry["saved"]) for entry in remove] == [("pdu1", 1 * day)]
+    assert wti_backup.expired(catalog.entries()) == []
+
+    catalog.prune(remove)
+    assert len(catalog.entries()) == 3
+    assert not files.exists(remove[0]["file"])
+    with open(catalog.file) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_prune_collects_unused_sections(tmp_path):
+    store = wti_backup.BackupStore(str(tmp_path))
+    catalog = wti_backup.BackupCatalog(str(tmp_path))
+    first = wti_backup.save_backup(store, "pdu1", CONFIG, now=1000)
+    second = wti_backup.save_backup(store, "pdu1", CONFIG.replace(b"Lab1", b"Lab2"), now=2000)
+    catalog.record([first, second], backend="store")
+
+    catalog.prune(wti_backup.expired(catalog.entries(), count=1))
+
+    assert [entry["file"] for entry in catalog.entries()] == [second["file"]]
+    assert sum(len(names) for dummy, dummy, names in os.walk(str(tmp_path / "objects"))) == 2
+    assert store.read(second["file"]) == CONFIG.replace(b"Lab1", b"Lab2")
+
+
+def test_backup_body_streams_decompressed(tmp_path):
+    data = CONFIG * 5000
+    files = wti_backup.BackupFiles(str(tmp_path), "gzip")
+    name = files.name("VMR-8HD20-1", "pdu1", "2026-10-18T02:00:03")
+    files.write(name, data, {})
+
+    body = wti_backup.BackupBody(str(tmp_path / name), chunk_size=4096)
+    assert body.length == len(data)
+    chunks = list(iter(lambda: body.read(1024), b""))
+    assert b"".join(chunks) == data
+    assert max(len(chunk) for chunk in chunks) == 4096
+    assert body.seek(100) == 100 and body.tell() == 100
+    assert body.read() == data[100:]
+
+    plain = tmp_path / "plain.xml"
+    plain.write_bytes(data)
+    body = wti_backup.BackupBody(str(plain))
+    with open(str(plain), "r+b") as f:
+        f.truncate(len(data) - 10)
+    with pytest.raises(IOError):
+        body.read()
+    body.close()
+
+
+def test_prune_keeps_unchanged_configuration(tmp_path):
+    files = wti_backup.BackupFiles(str(tmp_path))
+    catalog = wti_backup.BackupCatalog(str(tmp_path))
+    day = 86400
+    catalog.record([wti_backup.save_backup(files, "pdu1", CONFIG, now=1 * day)])
+    catalog.record([wti_backup.save_backup(files, "pdu1", CONFIG, now=31 * day)])
+    catalog.record([wti_backup.save_backup(files, "pdu2", CONFIG, now=1 * day)])
+
+    assert wti_backup.expired(catalog.query(), days=7, now=31 * day) == []
+    assert wti_backup.expired(catalog.query(), days=7, now=60 * day) == []
+    catalog.prune(wti_backup.expired(catalog.query(), days=7, now=60 * day))
+    assert len(catalog.entries()) == 2
+    assert all(files.exists(entry["file"]) for entry in catalog.entries())
@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import threading
+
+import pytest
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client, wti_firmware
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import ImageCache, MultipartFile, VersionCache, lookup_versions, plan_upgrade
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import prefetched, resumable_download, select_incrementals
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import FirmwareCatalog, ProgressLog, UpgradeFailed, apply_plan
+from ansible_collections.wti.remote.plugins.module_utils.wti_firmware import TokenBucket, upload_slot
+
+
+def downloader(calls, content):
+    def download(path):
+        calls.append(content)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+    return download
+
+
+def test_image_downloaded_once(tmp_path):
+    cache = ImageCache(str(tmp_path), 1024)
+    calls = []
+
+    for dummy in range(3):
+        with cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'image a')) as image:
+            assert image.read() == b'image a'
+
+    assert calls == [b'image a']
+    assert os.path.exists(str(tmp_path / 'objects' / hashlib.sha256(b'image a').hexdigest()))
+
+
+def test_damaged_image_downloaded_again(tmp_path):
+    cache = ImageCache(str(tmp_path), 1024)
+    calls = []
+    cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'image a')).close()
+    with open(str(tmp_path / 'objects' / hashlib.sha256(b'image a').hexdigest()), 'wb') as f:
+        f.write(b'truncated')
+
+    with cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'image a')) as image:
+        assert image.read() == b'image a'
+    assert len(calls) == 2
+
+
+def test_cache_hit_is_not_hashed_again(tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path), 1024)
+    calls = []
+    cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'image a')).close()
+    monkeypatch.setattr(wti_firmware, 'file_sha256', lambda handle: pytest.fail('hashed a cached image'))
+
+    timings = {}
+    with cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'image a'), timings=timings) as image:
+        assert image.read() == b'image a'
+    assert calls == [b'image a']
+    assert 'verify' not in timings
+
+
+def test_expected_hash_mismatch(tmp_path):
+    cache = ImageCache(str(tmp_path), 1024)
+
+    with pytest.raises(ValueError):
+        cache.fetch('https://my.wti.com/images/a.bin', downloader([], b'image a'), sha256='0' * 64)
+    assert os.listdir(str(tmp_path / 'objects')) == []
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = ImageCache(str(tmp_path), 20)
+    calls = []
+    cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'a' * 10)).close()
+    os.utime(str(tmp_path / 'objects' / hashlib.sha256(b'a' * 10).hexdigest()), (1, 1))
+    cache.fetch('https://my.wti.com/images/b.bin', downloader(calls, b'b' * 10)).close()
+    cache.fetch('https://my.wti.com/images/c.bin', downloader(calls, b'c' * 10)).close()
+
+    assert sorted(os.listdir(str(tmp_path / 'objects'))) == sorted(hashlib.sha256(c * 10).hexdigest() for c in (b'b', b'c'))
+    cache.fetch('https://my.wti.com/images/a.bin', downloader(calls, b'a' * 10)).close()
+    assert len(calls) == 4
+
+
+ONLINE = {"config": {"firmware": "8.09", "imageurl": "https://my.wti.com/update/full.bin", "incremental": [
+    {"title": "Part 1", "vpart": "1", "vinc": "2", "imageurl": "https://my.wti.com/update/inc1.bin"},
+    {"title": "Part 2", "vpart": "2", "vinc": "1", "imageurl": "https://my.wti.com/update/inc2.bin"},
+    {"title": "Part 3", "vpart": "3", "vinc": "4", "imageurl": "https://my.wti.com/update/inc3.bin", "size": "300"},
+]}}
+
+
+def device(firmware, incremental=None, family="1"):
+    return {"status": {"code": "0"}, "config": {"firmware": firmware, "family": family, "incremental": incremental or []}}
+
+
+def test_select_incrementals():
+    installed = [{"vpart": "1", "vinc": "1"}, {"vpart": "1", "vinc": "2"}, {"vpart": "2", "vinc": "1"}]
+
+    assert [item["vpart"] for item in select_incrementals(ONLINE["config"]["incremental"], installed)] == ["3"]
+    assert len(select_incrementals(ONLINE["config"]["incremental"], "")) == 3
+
+
+def test_plan_incremental_chain():
+    plan = plan_upgrade(device("8.09", [{"vpart": "1", "vinc": "1"}]), ONLINE)
+
+    assert plan["action"] == "incremental"
+    assert [(step["vpart"], step["reboot"]) for step in plan["steps"]] == [(1, False), (2, False), (3, True)]
+    assert plan["size"] == 300
+
+
+def test_plan_full_and_unsupported():
+    plan = plan_upgrade(device("8.01"), ONLINE)
+    assert plan["action"] == "full"
+    assert plan["steps"] == [dict(type="full", title="8.09", imageurl="https://my.wti.com/update/full.bin", size=None, sha256=None,
+                                  reboot=True)]
+
+    assert plan_upgrade(device("8.01"), ONLINE, cap=8.01)["action"] == "none"
+    assert plan_upgrade(device("6.50"), ONLINE)["action"] == "unsupported"
+    assert plan_upgrade(device("8.09"), ONLINE, ignoreincremental=True)["action"] == "none"
+    assert plan_upgrade(device("8.09"), ONLINE, ignoreincremental=True, force=True)["action"] == "full"
+
+
+def test_version_lookup_shared(tmp_path):
+    cache = VersionCache(300, str(tmp_path))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return ONLINE
+
+    assert cache.get(1, None, fetch) == ONLINE
+    assert cache.get(1, None, fetch) == ONLINE
+    assert cache.get(1, 8.01, fetch) == ONLINE
+    assert len(calls) == 2
+
+    assert VersionCache(0, str(tmp_path)).get(1, None, fetch) == ONLINE
+    assert len(calls) == 3
+
+
+def test_version_file(tmp_path):
+    single = tmp_path / 'version.json'
+    single.write_text(u'{"config": {"firmware": "8.09"}}')
+    per_family = tmp_path / 'versions.json'
+    per_family.write_text(u'{"0": {"config": {"firmware": "4.10"}}, "1": {"config": {"firmware": "8.09"}}}')
+
+    assert lookup_versions(None, 0, override=str(single))["config"]["firmware"] == "8.09"
+    assert lookup_versions(None, 0, override=str(per_family))["config"]["firmware"] == "4.10"
+    with pytest.raises(ValueError):
+        lookup_versions(None, 2, override=str(per_family))
+
+
+def test_multipart_file(tmp_path):
+    image = tmp_path / 'image.bin'
+    image.write_bytes(b'x' * 100)
+
+    with open(str(image), 'rb') as handle:
+        body = MultipartFile(handle, chunk_size=16)
+        first = body.read(4)
+        assert len(first) == 16
+        rest = body.read()
+        assert len(first) + len(rest) == body.length
+        assert body.read() == b''
+
+        payload = first + rest
+        assert payload.startswith(b'--%s\r\nContent-Disposition: form-data; name="file"; filename="name.binary"\r\n' % body.boundary.encode())
+        assert payload.endswith(b'\r\n' + b'x' * 100 + b'\r\n--%s--\r\n' % body.boundary.encode())
+
+        body.seek(0)
+        assert body.read(body.length) == payload
+
+
+def test_prefetched_overlaps_in_order():
+    events = []
+    started = threading.Event()
+
+    def fetch(item):
+        events.append('fetch %s' % item)
+        if item == 2:
+            started.set()
+        return item
+
+    for item in prefetched([1, 2, 3], fetch):
+        if item == 1:
+            # the next part is fetched while the current one is in use
+            assert started.wait(5)
+        events.append('use %s' % item)
+
+    assert [event for event in events if event.startswith('use')] == ['use 1', 'use 2', 'use 3']
+    assert events.index('fetch 2') < events.index('use 1')
+
+
+def test_prefetched_discards_unused():
+    discarded = []
+
+    for item in prefetched([1, 2, 3], lambda item: item, discard=discarded.append):
+        break
+
+    assert discarded == [2]
+    assert list(prefetched([1, 2], lambda item: item, enabled=False)) == [1, 2]
+
+
+def test_prefetched_without_futures_fetches_in_turn(monkeypatch):
+    monkeypatch.setattr(wti_firmware, 'HAS_FUTURES', False)
+    events = []
+
+    def fetch(item):
+        events.append('fetch %d' % item)
+        return item
+
+    for item in prefetched([1, 2], fetch):
+        events.append('use %d' % item)
+
+    assert events == ['fetch 1', 'use 1', 'fetch 2', 'use 2']
+
+
+class Reply(object):
+    def __init__(self, status_code, content, headers, fail_after=None):
+        self.status_code = status_code
+        self.reason = 'OK'
+        self.headers = headers
+        self.content = content
+        self.fail_after = fail_after
+
+    def iter_content(self, chunk_size):
+        for offset in range(0, len(self.content), chunk_size):
+            if self.fail_after is not None and offset >= self.fail_after:
+                raise IOError('connection reset')
+            yield self.content[offset:offset + chunk_size]
+
+
+def ranged_server(content, drops):
+    """requests.get stand-in serving content with Range support, dropping the first transfers."""
+    requests = []
+
+    def get(url, stream=True, headers=None, timeout=None):
+        requests.append(dict(headers or {}))
+        start = int(headers['Range'][len('bytes='):-1]) if headers else 0
+        fail_after = 4 if len(requests) <= drops else None
+        if start:
+            return Reply(206, content[start:], {'Content-Range': 'bytes %d-%d/%d' % (start, len(content) - 1, len(content))}, fail_after)
+        return Reply(200, content, {'Content-Length': str(len(content))}, fail_after)
+    return get, requests
+
+
+def test_download_resumes_with_range(tmp_path):
+    content = b'0123456789' * 3
+    get, requests = ranged_server(content, drops=2)
+    target = str(tmp_path / 'image.bin')
+
+    timings = {}
+    resumable_download(get, 'https://my.wti.com/images/a.bin', target, chunk_size=2, sha256=hashlib.sha256(content).hexdigest(),
+                       timings=timings)
+
+    with open(target, 'rb') as f:
+        assert f.read() == content
+    assert [request.get('Range') for request in requests] == [None, 'bytes=4-', 'bytes=8-']
+    assert not os.path.exists(target + '.part')
+    assert sorted(timings) == ['download', 'verify']
+
+
+def test_download_verifies_size_and_hash(tmp_path):
+    content = b'0123456789'
+    target = str(tmp_path / 'image.bin')
+
+    with pytest.raises(ValueError):
+        resumable_download(ranged_server(content, drops=0)[0], 'https://my.wti.com/images/a.bin', target, sha256='0' * 64)
+    with pytest.raises(ValueError):
+        resumable_download(ranged_server(content, drops=0)[0], 'https://my.wti.com/images/a.bin', target, size=9)
+    with pytest.raises(IOError):
+        resumable_download(ranged_server(content, drops=5)[0], 'https://my.wti.com/images/a.bin', target, chunk_size=2, retries=1)
+    # without a SHA-256 a partial file could not be told from a stale one, it is not kept
+    assert [name for name in os.listdir(str(tmp_path)) if not name.endswith('.lock')] == []
+    with pytest.raises(IOError):
+        resumable_download(ranged_server(content, drops=5)[0], 'https://my.wti.com/images/a.bin', target, chunk_size=2, retries=1,
+                           sha256=hashlib.sha256(content).hexdigest())
+    assert not os.path.exists(target)
+    assert os.path.getsize(target + '.part') == 8
+
+
+def test_interrupted_cached_download_resumes(tmp_path):
+    content = b'0123456789' * 3
+    get, requests = ranged_server(content, drops=1)
+    cache = ImageCache(str(tmp_path), 1024)
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    def download(path):
+        resumable_download(get, 'https://my.wti.com/images/a.bin', path, chunk_size=2, retries=0, sha256=sha256)
+
+    with pytest.raises(IOError):
+        cache.fetch('https://my.wti.com/images/a.bin', download, sha256=sha256)
+    with cache.fetch('https://my.wti.com/images/a.bin', download, sha256=sha256) as image:
+        assert image.read() == content
+    assert [request.get('Range') for request in requests] == [None, 'bytes=4-']
+
+
+def test_download_without_hash_ignores_stale_part(tmp_path):
+    content = b'0123456789'
+    target = str(tmp_path / 'image.bin')
+    with open(target + '.part', 'wb') as f:
+        f.write(b'stale')
+
+    get, requests = ranged_server(content, drops=0)
+    resumable_download(get, 'https://my.wti.com/images/a.bin', target)
+
+    with open(target, 'rb') as f:
+        assert f.read() == content
+    assert [request.get('Range') for request in requests] == [None]
+
+
+def test_catalog_reads_changed_images_only(tmp_path):
+    (tmp_path / "wti_tsm_8.07.bin").write_bytes(b"x" * 100 + b"TSM image")
+    (tmp_path / "wti_tsm_8.09.bin").write_bytes(b"y" * 100 + b"TSM image")
+    (tmp_path / "wti_vmr_4.05.bin").write_bytes(b"z" * 100 + b"VMR image")
+    (tmp_path / "inc.bin").write_bytes(b"i" * 100 + b"INCUPDATE")
+    (tmp_path / "notes.txt").write_bytes(b"hello")
+
+    catalog = FirmwareCatalog(str(tmp_path))
+    images = dict((entry["name"], entry) for entry in catalog.scan())
+    assert catalog.scanned == 5
+    assert (images["wti_tsm_8.09.bin"]["family"], images["wti_tsm_8.09.bin"]["type"], images["wti_tsm_8.09.bin"]["version"]) == (1, "full", 8.09)
+    assert (images["inc.bin"]["type"], images["inc.bin"]["version"]) == ("incremental", None)
+    assert images["notes.txt"]["family"] is None
+    assert images["wti_vmr_4.05.bin"]["sha256"] == hashlib.sha256(b"z" * 100 + b"VMR image").hexdigest()
+
+    catalog = FirmwareCatalog(str(tmp_path))
+    assert catalog.select(1)["name"] == "wti_tsm_8.09.bin"
+    assert catalog.select(1, version=8.07)["name"] == "wti_tsm_8.07.bin"
+    assert catalog.select(0, version=8.09) is None
+    assert catalog.scanned == 0
+
+    (tmp_path / "wti_tsm_8.09.bin").write_bytes(b"w" * 100 + b"TSM image!")
+    (tmp_path / "notes.txt").unlink()
+    images = dict((entry["name"], entry) for entry in catalog.scan())
+    assert catalog.scanned == 1
+    assert "notes.txt" not in images
+    assert catalog.entry("wti_tsm_8.09.bin")["size"] == 110
+
+
+class DeviceReply(object):
+    def read(self):
+        return b'{"status": {"code": "0"}}'
+
+
+class Device(object):
+    def __init__(self):
+        self.requests = []
+
+    def url(self, path):
+        return "https://device" + path
+
+    def request(self, path, method='GET', data=None, content_type=None, headers=None):
+        self.requests.append((method, path, data.read() if data is not None else None))
+        return DeviceReply()
+
+
+def test_apply_incremental_plan(tmp_path):
+    (tmp_path / "a.bin").write_bytes(b"part a")
+    (tmp_path / "b.bin").write_bytes(b"part b")
+    device = Device()
+    waits = []
+    installed = [{"vpart": "1", "vinc": "2"}, {"vpart": "2", "vinc": "1"}]
+
+    def wait(client, timeout, firmware=None, down=False):
+        waits.append((firmware, down))
+        return {"config": {"firmware": "8.09", "incremental": installed}}, 1
+
+    plan = plan_upgrade({"config": {"firmware": "8.09", "family": "1"}},
+                        {"config": {"firmware": "8.09", "imageurl": "https://x/full.bin", "incremental": [
+                            {"vpart": "1", "vinc": "2", "imageurl": "https://x/a.bin"},
+                            {"vpart": "2", "vinc": "1", "imageurl": "https://x/b.bin"}]}})
+    progress = ProgressLog(str(tmp_path / "progress.jsonl"), device="a")
+    uploads, data = apply_plan(device, device, plan, lambda step, timings: open(str(tmp_path / step["imageurl"][10:]), "rb"),
+                               wait=wait, progress=progress)
+
+    assert [stats["file"] for stats in uploads] == ["a.bin", "b.bin"]
+    assert [request[1] for request in device.requests] == ["/cgi-bin/getfile", "/cgi-bin/getfile", "/api/v2/config/rebootlocalunit"]
+    assert waits == [(None, False), ("8.09", True)]
+    assert [(stats["vpart"], stats["bytes"]) for stats in uploads] == [(1, 6), (2, 6)]
+    with open(str(tmp_path / "progress.jsonl")) as f:
+        events = [json.loads(line) for line in f]
+    assert [event["event"] for event in events] == ["upload", "upload", "reboot", "ready"]
+    assert events[0]["device"] == "a" and events[0]["file"] == "a.bin"
+
+    installed.pop()
+    with pytest.raises(UpgradeFailed, match="does not report incremental part 2"):
+        apply_plan(device, device, plan, lambda step, timings: open(str(tmp_path / "a.bin"), "rb"), wait=wait)
+
+
+class RebootingDevice(Device):
+    def request(self, path, method='GET', data=None, content_type=None, headers=None):
+        if path == "/api/v2/config/rebootlocalunit":
+            raise wti_client.ConnectionError("connection reset by peer")
+        return super(RebootingDevice, self).request(path, method=method, data=data, content_type=content_type, headers=headers)
+
+
+def test_apply_plan_reboot_drops_connection(tmp_path):
+    (tmp_path / "a.bin").write_bytes(b"part a")
+    device = RebootingDevice()
+    waits = []
+
+    def wait(client, timeout, firmware=None, down=False):
+        waits.append((firmware, down))
+        return {"config": {"firmware": "8.09", "incremental": [{"vpart": "1", "vinc": "2"}]}}, 1
+
+    plan = plan_upgrade({"config": {"firmware": "8.09", "family": "1"}},
+                        {"config": {"firmware": "8.09", "imageurl": "https://x/full.bin", "incremental": [
+                            {"vpart": "1", "vinc": "2", "imageurl": "https://x/a.bin"}]}})
+    uploads, data = apply_plan(device, device, plan, lambda step, timings: open(str(tmp_path / "a.bin"), "rb"), wait=wait)
+
+    assert [stats["file"] for stats in uploads] == ["a.bin"]
+    assert waits == [("8.09", True)]
+
+
+def test_token_bucket_shared_rate(tmp_path):
+    now = [100.0]
+    pauses = []
+
+    def pause(seconds):
+        pauses.append(seconds)
+        now[0] += seconds
+
+    first = TokenBucket(1000, name="site 1", path=str(tmp_path), clock=lambda: now[0], pause=pause)
+    second = TokenBucket(1000, name="site 1", path=str(tmp_path), clock=lambda: now[0], pause=pause)
+    other = TokenBucket(1000, name="site2", path=str(tmp_path), clock=lambda: now[0], pause=pause)
+
+    first.take(1000)
+    assert pauses == []
+    second.take(500)
+    first.take(500)
+    assert pauses == [0.5, 0.5]
+    other.take(1000)
+    assert len(pauses) == 2
+    assert sorted(os.listdir(str(tmp_path))) == ["site2.bucket", "site_1.bucket"]
+
+
+def test_multipart_paced_by_bandwidth(tmp_path):
+    taken = []
+    bucket = TokenBucket(100000, path=str(tmp_path))
+    bucket.take = taken.append
+    path = tmp_path / "image.bin"
+    path.write_bytes(b"x" * 30000)
+    with open(str(path), "rb") as handle:
+        body = MultipartFile(handle, chunk_size=1024 * 1024, bandwidth=bucket)
+        data = b""
+        while True:
+            piece = body.read(8192)
+            if not piece:
+                break
+            data += piece
+    assert len(data) == body.length
+    assert max(taken) == 10000
+    assert sum(taken) == body.length
+
+
+def test_upload_slots_per_device(tmp_path):
+    pauses = []
+    with upload_slot("https://a/cgi-bin/getfile", slots=2, path=str(tmp_path)) as first:
+        with upload_slot("https://a/cgi-bin/getfile", slots=2, path=str(tmp_path)) as second:
+            assert (first, second) == (0, 1)
+            with upload_slot("https://b/cgi-bin/getfile", slots=2, path=str(tmp_path)) as other:
+                assert other == 0
+
+            def pause(seconds):
+                pauses.append(seconds)
+                raise KeyboardInterrupt
+
+            with pytest.raises(KeyboardInterrupt):
+                with upload_slot("https://a/cgi-bin/getfile", slots=2, path=str(tmp_path), pause=pause):
+                    pass
+    assert pauses == [1]
+    with upload_slot("https://a/cgi-bin/getfile", slots=2, path=str(tmp_path)) as slot:
+        assert slot == 0
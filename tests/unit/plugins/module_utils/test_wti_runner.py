@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_status_info, cpm_plugcontrol
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+ARGS = {"cpm_url": "device.example", "cpm_username": "u", "cpm_password": "secretpw", "validate_certs": False}
+
+
+def test_module_runs_in_process(monkeypatch):
+    monkeypatch.setattr(wti_client.WtiSession, "request",
+                        lambda self, method, url, body=None, headers=None: DummyResponse({"vendor": "wti"}))
+
+    result = run_in_process(cpm_status_info.run_module, dict(ARGS))
+
+    assert result["changed"] is False
+    assert result["data"]["vendor"] == "wti"
+    assert result["invocation"]["module_args"]["use_https"] is True
+    assert result["invocation"]["module_args"]["cpm_password"] == "VALUE_SPECIFIED_IN_NO_LOG_PARAMETER"
+
+
+def test_check_mode_return_is_result(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        raise AssertionError("no request expected in check mode")
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    args = dict(ARGS, cpm_action="setplugcontrol", plug_id="1", plug_state="on")
+    result = run_in_process(cpm_plugcontrol.run_module, args, check_mode=True)
+
+    assert result == {"changed": False, "data": ""}
+
+
+def test_argument_errors_fail():
+    result = run_in_process(cpm_status_info.run_module, dict(ARGS, use_https="maybe"))
+
+    assert result["failed"] is True
+    assert "use_https" in result["msg"]
+
+    result = run_in_process(cpm_status_info.run_module, dict(ARGS, bogus="1"))
+
+    assert result["failed"] is True
+    assert result["msg"].startswith("Unsupported parameters for (cpm_status_info) module: bogus.")
+
+
+def test_transport_errors_fail(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        raise wti_client.ConnectionError("refused")
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_status_info.run_module, dict(ARGS))
+
+    assert result["failed"] is True
+    assert result["msg"].startswith("GET: Error connecting to https://device.example/api/v2/status/status")
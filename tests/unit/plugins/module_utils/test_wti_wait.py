@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Western Telematic Inc.
+#
+# GNU General Public License v3.0+
+#
+# (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import pytest
+
+from ansible.module_utils.urls import ConnectionError
+
+from ansible_collections.wti.remote.plugins.module_utils.wti_wait import WaitTimeout, backoff_delays, device_ready, wait_for_device
+
+
+class Session(object):
+    timeout = 30
+
+
+class ScriptedClient(object):
+    """Answers polls from a list of replies, exceptions are raised."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.paths = []
+        self.session = Session()
+
+    def url(self, path):
+        return 'https://device.example%s' % path
+
+    def get_json(self, path):
+        self.paths.append(path)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.pauses = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.pauses.append(seconds)
+        self.now += seconds
+
+
+OK = {"status": {"code": "0", "text": "OK"}}
+
+
+def test_backoff_doubles_with_jitter():
+    delays = backoff_delays(1, 8, rand=lambda: 1.0)
+    assert [next(delays) for dummy in range(6)] == [1, 2, 4, 8, 8, 8]
+    delays = backoff_delays(4, 8, rand=lambda: 0.0)
+    assert next(delays) == 2
+
+
+def test_device_ready():
+    assert device_ready(OK)
+    assert not device_ready({"status": {"code": "1"}})
+    assert device_ready({"status": {"code": "0"}, "config": {"firmware": "8.10a"}}, firmware="8.09")
+    assert not device_ready({"status": {"code": "0"}, "config": {"firmware": "8.08"}}, firmware=8.09)
+
+
+def test_waits_until_device_answers():
+    clock = Clock()
+    client = ScriptedClient([ConnectionError('refused'), ConnectionError('refused'), OK])
+
+    data, attempts = wait_for_device(client, 60, clock=clock.time, pause=clock.sleep)
+
+    assert data == OK
+    assert attempts == 3
+    assert len(clock.pauses) == 2
+    assert client.paths == ['/api/v2/status/status'] * 3
+
+
+def test_waits_for_reboot_to_start():
+    clock = Clock()
+    client = ScriptedClient([OK, OK, ConnectionError('refused'), OK])
+
+    data, attempts = wait_for_device(client, 60, down=True, clock=clock.time, pause=clock.sleep)
+
+    assert attempts == 4
+
+
+def test_timeout_reports_firmware():
+    clock = Clock()
+    client = ScriptedClient([{"status": {"code": "0"}, "config": {"firmware": "8.08"}}])
+
+    with pytest.raises(WaitTimeout) as e:
+        wait_for_device(client, 20, firmware="8.09", max_sleep=4, clock=clock.time, pause=clock.sleep)
+
+    assert str(e.value).startswith('Timeout waiting for https://device.example/api/v2/status/firmware to report firmware 8.09')
+    assert clock.now == 20
+    assert max(clock.pauses) <= 4
+    assert client.paths[0] == '/api/v2/status/firmware'
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import os
+import time
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_backup
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_backup_catalog
+
+
+def config(site, unit=b"TSM-8"):
+    return b'<wtiparameters><site unit_type_info="%s"><siteid name="%s"/></site></wtiparameters>' % (unit, site)
+
+
+def make_backups(path):
+    files = wti_backup.BackupFiles(path, "gzip")
+    catalog = wti_backup.BackupCatalog(path)
+    now = time.time()
+    for age, url, data in ((40, "a.example", config(b"A1")), (20, "a.example", config(b"A2")), (1, "a.example", config(b"A3")),
+                           (1, "b.example", config(b"B1", b"VMR-8HD20-1"))):
+        catalog.record([wti_backup.save_backup(files, url, data, now=now - age * 86400)])
+
+
+def test_catalog_query(tmp_path):
+    make_backups(str(tmp_path))
+
+    result = run_in_process(cpm_backup_catalog.run_module, {"cpm_path": str(tmp_path), "cpm_url": ["a.example"], "latest": True})
+    assert [entry["unit_type"] for entry in result["backups"]] == ["TSM-8"]
+    assert result["changed"] is False
+
+    result = run_in_process(cpm_backup_catalog.run_module, {"cpm_path": str(tmp_path), "unit_type": ["VMR-8HD20-1"]})
+    assert [entry["url"] for entry in result["backups"]] == ["b.example"]
+
+    since = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - 30 * 86400))
+    result = run_in_process(cpm_backup_catalog.run_module, {"cpm_path": str(tmp_path), "since": since})
+    assert len(result["backups"]) == 3
+
+    result = run_in_process(cpm_backup_catalog.run_module, {"cpm_path": str(tmp_path), "since": "last week"})
+    assert result["failed"] is True
+
+
+def test_catalog_prune(tmp_path):
+    make_backups(str(tmp_path))
+    args = {"cpm_path": str(tmp_path), "retain_count": 1, "retain_days": 30, "prune": True}
+
+    result = run_in_process(cpm_backup_catalog.run_module, args, check_mode=True)
+    assert result["changed"] is True
+    assert len(result["pruned"]) == 1
+    assert len(result["backups"]) == 3
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith(".xml.gz")]) == 4
+
+    result = run_in_process(cpm_backup_catalog.run_module, args)
+    assert len(result["backups"]) == 3
+    assert not os.path.exists(str(tmp_path / result["pruned"][0]["file"]))
+
+    result = run_in_process(cpm_backup_catalog.run_module, {"cpm_path": str(tmp_path), "prune": True})
+    assert result["msg"] == "prune requires retain_count or retain_days"
+
+    result = run_in_process(cpm_backup_catalog.run_module, {"cpm_path": str(tmp_path), "retain_count": 0, "prune": True})
+    assert result["msg"] == "retain_count must be at least 1"
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import pytest
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_backup, wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_config_restore
+
+CONFIG = b'<wtiparameters><site unit_type_info="TSM-8"><siteid name="A"/></site><users><user name="super"/></users></wtiparameters>'
+
+
+class DummyResponse(object):
+    def read(self):
+        return b'{"status": {"code": "0", "text": "ok"}}'
+
+
+def fake_device(monkeypatch):
+    uploads = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        assert url == "https://a.example/cgi-bin/getfile"
+        uploads.append((body.read() if hasattr(body, "read") else body, headers.get("Content-Length")))
+        return DummyResponse()
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+    return uploads
+
+
+def test_restore_from_backup_store(monkeypatch, tmp_path):
+    uploads = fake_device(monkeypatch)
+    entry = wti_backup.save_backup(wti_backup.BackupStore(str(tmp_path)), "a.example", CONFIG)
+
+    result = run_in_process(cpm_config_restore.run_module, {"cpm_url": "a.example", "cpm_username": "super", "cpm_password": "secretpw",
+                                                            "cpm_path": str(tmp_path), "cpm_filename": entry["file"], "backup_store": True})
+
+    assert b"ok" in result["data"]
+    assert uploads == [(CONFIG, str(len(CONFIG)))]
+
+
+@pytest.mark.parametrize("compress", ["none", "gzip", "xz"])
+def test_restore_streams_compressed_backups(monkeypatch, tmp_path, compress):
+    uploads = fake_device(monkeypatch)
+    entry = wti_backup.save_backup(wti_backup.BackupFiles(str(tmp_path), compress), "a.example", CONFIG)
+
+    result = run_in_process(cpm_config_restore.run_module, {"cpm_url": "a.example", "cpm_username": "super", "cpm_password": "secretpw",
+                                                            "cpm_path": str(tmp_path) + "/", "cpm_filename": entry["file"]})
+
+    assert b"ok" in result["data"]
+    assert uploads == [(CONFIG, str(len(CONFIG)))]
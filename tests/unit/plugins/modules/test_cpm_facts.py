@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+from io import BytesIO
+
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_facts
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+ARGS = {"cpm_url": "device.example", "cpm_username": "u", "cpm_password": "secretpw"}
+
+
+def test_subset_and_exclude(monkeypatch):
+    seen = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        seen.append(url)
+        return DummyResponse({"path": url})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_facts.run_module, dict(ARGS, gather_subset=["min", "alarms"], gather_exclude=["hostname"]))
+
+    assert sorted(result["ansible_facts"]) == ["wti_alarms", "wti_firmware", "wti_status"]
+    assert result["ansible_facts"]["wti_firmware"] == {"path": "https://device.example/api/v2/status/firmware"}
+    assert sorted(seen) == ["https://device.example/api/v2/status/alarms", "https://device.example/api/v2/status/firmware",
+                            "https://device.example/api/v2/status/status"]
+
+
+def test_unsupported_subset_is_skipped(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        if url.endswith("/temperature"):
+            raise HTTPError(url, 404, "Not Found", {}, BytesIO(b""))
+        return DummyResponse({})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_facts.run_module, dict(ARGS))
+
+    assert "failed" not in result
+    assert len(result["ansible_facts"]) == 8
+    assert "wti_temperature" not in result["ansible_facts"]
+    assert result["warnings"][0].startswith("Skipping the temperature facts")
+
+
+def test_unreachable_device_fails(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        raise wti_client.ConnectionError("refused")
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_facts.run_module, dict(ARGS, gather_subset=["status"]))
+
+    assert result["failed"] is True
+    assert result["msg"] == "GET: Error connecting to https://device.example/api/v2/status/status : refused"
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import os
+
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_firmware_catalog
+
+
+def test_catalog_picks_image(tmp_path):
+    (tmp_path / "wti_vmr_4.03.bin").write_bytes(b"a" * 64 + b"VMR")
+    (tmp_path / "wti_vmr_4.05.bin").write_bytes(b"b" * 64 + b"VMR")
+    (tmp_path / "wti_tsm_8.09.bin").write_bytes(b"c" * 64 + b"TSM")
+
+    result = run_in_process(cpm_firmware_catalog.run_module, {"path": str(tmp_path), "family": 0}, check_mode=True)
+    assert [image["name"] for image in result["images"]] == ["wti_tsm_8.09.bin", "wti_vmr_4.03.bin", "wti_vmr_4.05.bin"]
+    assert result["image"]["name"] == "wti_vmr_4.05.bin"
+    assert not os.path.exists(result["index"])
+
+    result = run_in_process(cpm_firmware_catalog.run_module, {"path": str(tmp_path), "family": 0, "version": 4.03})
+    assert result["image"]["name"] == "wti_vmr_4.03.bin"
+    assert result["scanned"] == 3
+    assert os.path.exists(result["index"])
+
+    result = run_in_process(cpm_firmware_catalog.run_module, {"path": str(tmp_path)})
+    assert result["scanned"] == 0
+    assert "image" not in result
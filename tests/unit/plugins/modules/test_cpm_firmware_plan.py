@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_firmware_plan
+
+
+class DummyResponse(object):
+    def __init__(self, payload, headers=None):
+        self._payload = payload
+        self.headers = headers or {}
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+VERSIONS = {"config": {"firmware": "8.09", "imageurl": "https://my.wti.com/update/full.bin", "incremental": [
+    {"title": "Part 1", "vpart": "1", "vinc": "2", "imageurl": "https://my.wti.com/update/inc1.bin"}]}}
+
+FIRMWARE = {
+    "old1.example": "8.01",
+    "old2.example": "8.01",
+    "current.example": "8.09",
+}
+
+
+def test_plan_many_devices(monkeypatch):
+    seen = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        seen.append((method, url))
+        if url.startswith("https://my.wti.com/update/version.aspx"):
+            return DummyResponse(VERSIONS)
+        if method == "HEAD":
+            return DummyResponse({}, {"Content-Length": "1000"})
+        host = url.split("/")[2]
+        if host not in FIRMWARE:
+            raise wti_client.ConnectionError("refused")
+        return DummyResponse({"status": {"code": "0"}, "config": {"firmware": FIRMWARE[host], "family": "1",
+                                                                  "incremental": [{"vpart": "1", "vinc": "1"}]}})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_firmware_plan.run_module, {"cpm_url": sorted(FIRMWARE) + ["down.example"], "cpm_username": "super", "cpm_password": "secretpw"})
+
+    assert result["summary"] == {"none": 0, "full": 2, "incremental": 1, "unsupported": 0, "failed": 1}
+    assert result["plans"]["old1.example"]["steps"][0]["size"] == 1000
+    assert result["plans"]["current.example"]["steps"][0]["vpart"] == 1
+    assert result["errors"]["down.example"].startswith("GET: Error connecting to https://down.example/api/v2/status/firmware")
+    assert [(image["imageurl"], image["devices"]) for image in result["images"]] == [
+        ("https://my.wti.com/update/full.bin", 2), ("https://my.wti.com/update/inc1.bin", 1)]
+    assert result["download_size"] == 2000
+    assert seen.count(("GET", "https://my.wti.com/update/version.aspx?fam=1")) == 1
+    assert len([entry for entry in seen if entry[0] == "HEAD"]) == 2
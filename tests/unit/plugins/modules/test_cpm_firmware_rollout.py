@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+import os
+import types
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client, wti_firmware
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_firmware_rollout
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+        self.headers = {}
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+VERSIONS = {"config": {"firmware": "8.09", "imageurl": "https://my.wti.com/update/full.bin", "incremental": []}}
+
+
+def fake_fleet(monkeypatch, tmp_path, firmware, broken=(), stuck=()):
+    uploads = []
+    downloads = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        if url.startswith("https://my.wti.com/update/version.aspx"):
+            return DummyResponse(VERSIONS)
+        host = url.split("/")[2]
+        if url.endswith("/cgi-bin/getfile"):
+            uploads.append((host, len(body.read())))
+            if host in broken:
+                return DummyResponse({"status": {"code": "1", "text": "bad image"}})
+            if host not in stuck:
+                firmware[host] = "8.09"
+            return DummyResponse({"status": {"code": "0"}, "filelength": "10"})
+        return DummyResponse({"status": {"code": "0"}, "config": {"firmware": firmware[host], "family": "1"}})
+
+    def fake_download(url, path, sha256=None, size=None, chunk_size=None, retries=None):
+        downloads.append(url)
+        with open(path, "wb") as f:
+            f.write(b"image of " + url.encode("utf-8"))
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+    monkeypatch.setattr(wti_firmware, "UPLOAD_LIMITS_PATH", str(tmp_path / "limits"))
+    monkeypatch.setattr(cpm_firmware_rollout, "download_image", fake_download)
+    monkeypatch.setattr(cpm_firmware_rollout, "requests", types.SimpleNamespace(exceptions=types.SimpleNamespace(RequestException=IOError)))
+    return uploads, downloads
+
+
+def test_rollout_in_waves(monkeypatch, tmp_path):
+    firmware = {"a.example": "8.01", "b.example": "8.01", "c.example": "8.09", "d.example": "8.05"}
+    uploads, downloads = fake_fleet(monkeypatch, tmp_path, firmware)
+
+    result = run_in_process(cpm_firmware_rollout.run_module, {"cpm_url": sorted(firmware), "cpm_username": "super",
+                                                              "cpm_password": "secretpw", "wave_size": 2,
+                                                              "upload_bandwidth": 1024, "upload_bandwidth_group": "site1"})
+
+    assert result["changed"] is True
+    assert result["summary"] == {"upgraded": 3, "current": 1, "unsupported": 0, "failed": 0, "skipped": 0}
+    assert [wave["devices"] for wave in result["waves"]] == [["a.example", "b.example"], ["d.example"]]
+    assert result["devices"]["d.example"]["wave"] == 2
+    assert result["devices"]["a.example"]["firmware"] == "8.09"
+    assert downloads == ["https://my.wti.com/update/full.bin"]
+    assert sorted(host for host, dummy in uploads) == ["a.example", "b.example", "d.example"]
+    assert os.path.exists(str(tmp_path / "limits" / "site1.bucket"))
+
+
+def test_rollout_stops_on_failures(monkeypatch, tmp_path):
+    firmware = {"a.example": "8.01", "b.example": "8.01", "c.example": "8.01"}
+    uploads, downloads = fake_fleet(monkeypatch, tmp_path, firmware, broken=("a.example",))
+
+    result = run_in_process(cpm_firmware_rollout.run_module, {"cpm_url": sorted(firmware), "cpm_username": "super",
+                                                              "cpm_password": "secretpw", "wave_size": 1, "max_fail_percentage": 40})
+
+    assert result["failed"] is True
+    assert result["msg"] == "ROLLOUT: Stopped after wave 1, 1 of 1 upgraded devices failed"
+    assert result["devices"]["a.example"]["error"].startswith("FAIL: Upgrade Failed for https://a.example/cgi-bin/getfile")
+    assert result["summary"] == {"upgraded": 0, "current": 0, "unsupported": 0, "failed": 1, "skipped": 2}
+    assert [host for host, dummy in uploads] == ["a.example"]
+
+    result = run_in_process(cpm_firmware_rollout.run_module, {"cpm_url": sorted(firmware), "cpm_username": "super",
+                                                              "cpm_password": "secretpw"}, check_mode=True)
+    assert result["summary"]["skipped"] == 3
+
+
+def test_flashed_device_that_does_not_come_back_is_changed(monkeypatch, tmp_path):
+    firmware = {"a.example": "8.01"}
+    uploads, downloads = fake_fleet(monkeypatch, tmp_path, firmware, stuck=("a.example",))
+
+    result = run_in_process(cpm_firmware_rollout.run_module, {"cpm_url": ["a.example"], "cpm_username": "super",
+                                                              "cpm_password": "secretpw", "wait_timeout": 0})
+
+    assert result["failed"] is True
+    assert result["changed"] is True
+    assert result["devices"]["a.example"]["status"] == "failed"
+    assert result["devices"]["a.example"]["error"].startswith("WAIT: Timeout waiting for https://a.example/api/v2/status/firmware")
+    assert [upload["file"] for upload in result["devices"]["a.example"]["uploads"]] == ["full.bin"]
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+import types
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client, wti_firmware
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_firmware_update
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+        self.headers = {}
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+def fake_device(monkeypatch, tmp_path, firmware, incremental=()):
+    seen = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        seen.append((method, url))
+        if url.startswith("https://my.wti.com/update/version.aspx"):
+            return DummyResponse({"status": {"code": "0"}, "config": {"firmware": "8.09", "imageurl": "https://my.wti.com/update/full.bin",
+                                                                      "incremental": list(incremental)}})
+        if url.endswith("/cgi-bin/getfile"):
+            body.read()
+            return DummyResponse({"status": {"code": "0"}, "filelength": "10"})
+        return DummyResponse({"status": {"code": "0"}, "config": {"firmware": firmware, "family": "1"}})
+
+    def fake_download(module, url, path, sha256=None, size=None, timings=None):
+        with open(path, "wb") as f:
+            f.write(b"image")
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+    monkeypatch.setattr(wti_firmware, "UPLOAD_LIMITS_PATH", str(tmp_path))
+    monkeypatch.setattr(cpm_firmware_update, "download_image", fake_download)
+    monkeypatch.setattr(cpm_firmware_update, "requests", None)
+    monkeypatch.setattr(cpm_firmware_update, "load_requests", lambda: (types.SimpleNamespace(exceptions=types.SimpleNamespace(
+        RequestException=IOError)), 0.25))
+    return seen
+
+
+ARGS = {"cpm_url": "rest.example", "cpm_username": "super", "cpm_password": "secretpw"}
+
+
+def test_current_device_needs_no_transfer_libraries(monkeypatch, tmp_path):
+    fake_device(monkeypatch, tmp_path, "8.09")
+
+    result = run_in_process(cpm_firmware_update.run_module, ARGS)
+
+    assert result["changed"] is False
+    assert "device up to date" in result["data"]
+    assert result["timings"]["import"] == 0
+    assert cpm_firmware_update.requests is None
+
+    fake_device(monkeypatch, tmp_path, "8.01")
+    result = run_in_process(cpm_firmware_update.run_module, ARGS, check_mode=True)
+    assert result["changed"] is False
+    assert cpm_firmware_update.requests is None
+
+
+def test_outdated_device_imports_on_download(monkeypatch, tmp_path):
+    seen = fake_device(monkeypatch, tmp_path, "8.01")
+
+    result = run_in_process(cpm_firmware_update.run_module, dict(ARGS, progress_log=str(tmp_path / "progress.jsonl")))
+
+    assert result["changed"] is True
+    assert result["timings"]["import"] == 0.25
+    assert sorted(result["timings"]) == ["download", "import", "processing", "ready", "reboot_to_ready", "total", "upload", "verify"]
+    assert result["uploads"][0]["processing_seconds"] >= 0
+    with open(str(tmp_path / "progress.jsonl")) as f:
+        assert [json.loads(line)["event"] for line in f] == ["start", "upload", "done"]
+    assert [upload["file"] for upload in result["uploads"]] == ["full.bin"]
+    assert ("POST", "https://rest.example/cgi-bin/getfile") in seen
+
+
+def test_incremental_parts_are_sent_in_turn_and_rebooted(monkeypatch, tmp_path):
+    parts = [dict(title="part %d" % vpart, vpart=vpart, vinc=1, imageurl="https://my.wti.com/update/inc%d.bin" % vpart) for vpart in (1, 2)]
+    seen = fake_device(monkeypatch, tmp_path, "8.09", incremental=parts)
+    waits = []
+    monkeypatch.setattr(cpm_firmware_update, "wait_for_device",
+                        lambda client, timeout, firmware=None, down=False: (waits.append((firmware, down)), 1))
+
+    result = run_in_process(cpm_firmware_update.run_module, ARGS)
+
+    assert result["changed"] is True
+    assert [(upload["file"], upload["vpart"]) for upload in result["uploads"]] == [("inc1.bin", 1), ("inc2.bin", 2)]
+    # the second part waits for the device to be done with the first, the reboot is not waited for
+    assert waits == [(None, False)]
+    assert ("GET", "https://rest.example/api/v2/config/rebootlocalunit") in seen
+
+
+def test_catalog_image_is_uploaded_once_and_waited_for(monkeypatch, tmp_path):
+    seen = fake_device(monkeypatch, tmp_path, "8.01")
+    waits = []
+    monkeypatch.setattr(cpm_firmware_update, "wait_for_device",
+                        lambda client, timeout, firmware=None, down=False: (waits.append(firmware), 1))
+    catalog = tmp_path / "catalog"
+    catalog.mkdir()
+    (catalog / "wti_tsm.bin").write_bytes(b"image TSM")
+    args = dict(ARGS, firmware_catalog=str(catalog), wait_for_ready=True)
+
+    result = run_in_process(cpm_firmware_update.run_module, args)
+    assert result["changed"] is False
+    assert "device up to date" in result["data"]
+    assert ("POST", "https://rest.example/cgi-bin/getfile") not in seen
+
+    (catalog / "wti_tsm_8.09.bin").write_bytes(b"image TSM")
+    result = run_in_process(cpm_firmware_update.run_module, args)
+    assert result["changed"] is True
+    assert result["catalog_image"]["name"] == "wti_tsm_8.09.bin"
+    assert waits == ["8.09"]
+    assert (catalog / "wti_tsm_8.09.bin").exists()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import gzip
+import os
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_backup, wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_fleet_backup
+
+
+class DummyResponse(object):
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+def fake_fleet(monkeypatch, configs):
+    def fake_request(self, method, url, body=None, headers=None):
+        host = url.split("/")[2]
+        if host not in configs:
+            raise wti_client.ConnectionError("timed out")
+        assert url.endswith("/cgi-bin/gethtml?formWTIDownloadConfigXML.html")
+        return DummyResponse(configs[host])
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+
+def config(site):
+    return b'<wtiparameters><site unit_type_info="TSM-8">\n  <siteid name="%s"/>\n</site></wtiparameters>' % site
+
+
+def test_fleet_backup_skips_unchanged(monkeypatch, tmp_path):
+    configs = {"a.example": config(b"A"), "b.example": config(b"B")}
+    fake_fleet(monkeypatch, configs)
+    args = {"cpm_url": ["a.example", "b.example", "down.example"], "cpm_username": "super", "cpm_password": "secretpw",
+            "cpm_path": str(tmp_path)}
+
+    result = run_in_process(cpm_fleet_backup.run_module, args)
+    assert result["changed"] is True
+    assert result["summary"] == {"written": 2, "unchanged": 0, "failed": 1}
+    assert "down.example" in result["errors"]
+    with gzip.open(str(tmp_path / result["backups"]["a.example"]["file"])) as f:
+        assert f.read() == configs["a.example"]
+
+    configs["a.example"] = configs["a.example"].replace(b"\n  ", b"")
+    configs["b.example"] = config(b"B2")
+    result = run_in_process(cpm_fleet_backup.run_module, args)
+    assert result["summary"] == {"written": 1, "unchanged": 1, "failed": 1}
+    assert result["backups"]["a.example"]["status"] == "unchanged"
+    assert result["bytes_written"] == result["backups"]["b.example"]["stored_size"]
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith(".xml.gz")]) == 3
+    assert len(wti_backup.BackupCatalog(str(tmp_path)).query(urls={"a.example"})) == 1
+
+
+def test_fleet_backup_check_mode_writes_nothing(monkeypatch, tmp_path):
+    fake_fleet(monkeypatch, {"a.example": config(b"A")})
+
+    result = run_in_process(cpm_fleet_backup.run_module, {"cpm_url": ["a.example"], "cpm_username": "super", "cpm_password": "secretpw",
+                                                          "cpm_path": str(tmp_path), "compress": "xz"}, check_mode=True)
+
+    assert result["summary"] == {"written": 1, "unchanged": 0, "failed": 0}
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_fleet_backup_to_store(monkeypatch, tmp_path):
+    configs = {"a.example": config(b"A"), "b.example": config(b"B")}
+    fake_fleet(monkeypatch, configs)
+
+    result = run_in_process(cpm_fleet_backup.run_module, {"cpm_url": sorted(configs), "cpm_username": "super", "cpm_password": "secretpw",
+                                                          "cpm_path": str(tmp_path), "backend": "store"})
+
+    assert result["summary"] == {"written": 2, "unchanged": 0, "failed": 0}
+    store = wti_backup.BackupStore(str(tmp_path))
+    for url, data in configs.items():
+        assert store.read(result["backups"][url]["file"]) == data
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+import threading
+
+from io import BytesIO
+
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client, wti_fleet
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_fleet_info
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+def test_devices_are_queried_concurrently(monkeypatch):
+    barrier = threading.Barrier(3, timeout=5)
+    seen = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        seen.append((url, headers.get("Authorization")))
+        if url.endswith("/status/status"):
+            # all three devices must be in flight at the same time to get past here
+            barrier.wait()
+            return DummyResponse({"siteid": url.split("/")[2]})
+        return DummyResponse({"firmware": "1.0"})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    args = {"cpm_url": ["pdu1", "pdu2"], "devices": [{"cpm_url": "pdu3", "cpm_username": "other", "cpm_password": "x"}],
+            "cpm_username": "super", "cpm_password": "super", "endpoints": ["status/status", "status/firmware"]}
+    result = run_in_process(cpm_fleet_info.run_module, args)
+
+    assert result["errors"] == {}
+    assert result["data"]["pdu2"]["status/status"] == {"siteid": "pdu2"}
+    assert result["data"]["pdu3"]["status/firmware"] == {"firmware": "1.0"}
+    assert ("https://pdu3/api/v2/status/status", "Basic b3RoZXI6eA==") in seen
+    assert result["invocation"]["module_args"]["devices"][0]["cpm_password"] == "VALUE_SPECIFIED_IN_NO_LOG_PARAMETER"
+
+
+def test_errors_are_reported_per_device(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        if "down" in url:
+            raise wti_client.ConnectionError("timed out")
+        if url.endswith("/status/temperature"):
+            raise HTTPError(url, 404, "Not Found", {}, BytesIO(b""))
+        return DummyResponse({"status": {"code": "0"}})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    args = {"cpm_url": ["up", "down"], "cpm_username": "super", "cpm_password": "super",
+            "endpoints": ["status/temperature", "status/alarms"]}
+    result = run_in_process(cpm_fleet_info.run_module, args)
+
+    assert "failed" not in result
+    assert result["data"] == {"up": {"status/alarms": {"status": {"code": "0"}}}, "down": {}}
+    assert result["errors"]["up"]["status/temperature"].startswith("GET: Received HTTP error for https://up/api/v2/status/temperature")
+    assert result["errors"]["down"]["status/alarms"] == \
+        "GET: Error connecting to https://down/api/v2/status/temperature : timed out"
+
+
+def test_no_devices_fails():
+    result = run_in_process(cpm_fleet_info.run_module, {"cpm_password": "super"})
+
+    assert result["failed"] is True
+    assert result["msg"] == "one of the following is required: cpm_url, devices"
+
+
+def test_devices_are_queried_in_turn_without_futures(monkeypatch):
+    seen = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        seen.append((threading.current_thread().name, url.split("/")[2]))
+        return DummyResponse({"status": {"code": "0"}})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+    monkeypatch.setattr(wti_fleet, "HAS_FUTURES", False)
+
+    args = {"cpm_url": ["pdu1", "pdu2"], "cpm_username": "super", "cpm_password": "super", "endpoints": ["status/status"]}
+    result = run_in_process(cpm_fleet_info.run_module, args)
+
+    assert result["errors"] == {}
+    assert seen == [(threading.current_thread().name, "pdu1"), (threading.current_thread().name, "pdu2")]
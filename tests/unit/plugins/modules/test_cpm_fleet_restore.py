@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import threading
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_backup, wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_fleet_restore
+
+
+class DummyResponse(object):
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+def config(site):
+    return b'<wtiparameters><site unit_type_info="TSM-8"><siteid name="%s" location="Rack 4"/></site></wtiparameters>' % site
+
+
+def fake_fleet(monkeypatch, drop=()):
+    restored = {}
+    lock = threading.Lock()
+
+    def fake_request(self, method, url, body=None, headers=None):
+        host = url.split("/")[2]
+        if url.endswith("/cgi-bin/getfile"):
+            data = body.read()
+            assert headers["Content-Length"] == str(len(data))
+            with lock:
+                # a device that drops a setting on the way, and one that lays the XML out differently
+                restored[host] = data.replace(b' location="Rack 4"', b'') if host in drop else data.replace(b"><", b">\n<")
+            return DummyResponse(b'{"status": {"code": "0", "text": "ok"}}')
+        if url.endswith("/cgi-bin/gethtml?formWTIDownloadConfigXML.html"):
+            return DummyResponse(restored[host])
+        return DummyResponse(b'{"status": {"code": "0", "text": "OK"}}')
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+    return restored
+
+
+def test_restore_and_verify(monkeypatch, tmp_path):
+    restored = fake_fleet(monkeypatch, drop=("c.example",))
+    backups = {}
+    for url, site, compress in (("a.example", b"A", "gzip"), ("b.example", b"B", "xz"), ("c.example", b"C", "none")):
+        backups[url] = wti_backup.save_backup(wti_backup.BackupFiles(str(tmp_path), compress), url, config(site))["file"]
+    backups["d.example"] = "missing.xml"
+
+    result = run_in_process(cpm_fleet_restore.run_module, {"backups": backups, "cpm_username": "super", "cpm_password": "secretpw",
+                                                           "cpm_path": str(tmp_path), "max_workers": 4})
+
+    assert result["failed"] is True
+    assert result["msg"] == "RESTORE: 2 of 4 devices failed"
+    assert result["changed"] is True
+    assert result["summary"] == {"passed": 2, "restored": 0, "failed": 2, "skipped": 0}
+    assert result["devices"]["b.example"]["restored_sha256"] == result["devices"]["b.example"]["sha256"]
+    assert result["devices"]["c.example"]["stage"] == "verify"
+    assert result["devices"]["d.example"]["stage"] == "read"
+    assert sorted(restored) == ["a.example", "b.example", "c.example"]
+    assert restored["a.example"].startswith(b'<wtiparameters>\n<site')
+
+
+def test_restore_check_mode(monkeypatch, tmp_path):
+    restored = fake_fleet(monkeypatch)
+    entry = wti_backup.save_backup(wti_backup.BackupStore(str(tmp_path)), "a.example", config(b"A"))
+
+    result = run_in_process(cpm_fleet_restore.run_module, {"backups": {"a.example": entry["file"]}, "cpm_username": "super",
+                                                           "cpm_password": "secretpw", "cpm_path": str(tmp_path), "backup_store": True},
+                            check_mode=True)
+
+    assert result["changed"] is False
+    assert result["devices"]["a.example"]["status"] == "skipped"
+    assert result["devices"]["a.example"]["sha256"] == entry["sha256"]
+    assert restored == {}
@@ -5,6 +5,10 @@ __metaclass__ = type
 import json
 import pytest
 
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.urls import ConnectionError, SSLValidationError
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client
 from ansible_collections.wti.remote.plugins.modules import cpm_status_info
 
 
@@ -49,13 +53,13 @@ def test_success_https(monkeypatch):
     }
     dummy = _patch_module(monkeypatch, params)
 
-    def fake_open_url(url, **kwargs):
-        url_txt = cpm_status_info.to_native(url)
+    def fake_request(self, method, url, body=None, headers=None):
+        url_txt = wti_client.to_native(url)
         assert url_txt.startswith("https://")
         assert url_txt.endswith("/api/v2/status/status")
         return DummyResponse({"vendor": "wti", "status": {"code": "0", "text": "OK"}})
 
-    monkeypatch.setattr(cpm_status_info, "open_url", fake_open_url)
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
 
     with pytest.raises(SystemExit):
         cpm_status_info.run_module()
@@ -76,13 +80,13 @@ def test_success_http(monkeypatch):
     }
     dummy = _patch_module(monkeypatch, params)
 
-    def fake_open_url(url, **kwargs):
-        url_txt = cpm_status_info.to_native(url)
+    def fake_request(self, method, url, body=None, headers=None):
+        url_txt = wti_client.to_native(url)
         assert url_txt.startswith("http://")
         assert url_txt.endswith("/api/v2/status/status")
         return DummyResponse({"vendor": "wti"})
 
-    monkeypatch.setattr(cpm_status_info, "open_url", fake_open_url)
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
 
     with pytest.raises(SystemExit):
         cpm_status_info.run_module()
@@ -102,13 +106,11 @@ def test_http_error(monkeypatch):
     }
     dummy = _patch_module(monkeypatch, params)
 
-    HTTPError = cpm_status_info.HTTPError
-
-    def fake_open_url(url, **kwargs):
+    def fake_request(self, method, url, body=None, headers=None):
         # HTTPError signature: (url, code, msg, hdrs, fp)
         raise HTTPError(url, 401, "Unauthorized", None, None)
 
-    monkeypatch.setattr(cpm_status_info, "open_url", fake_open_url)
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
 
     with pytest.raises(SystemExit):
         cpm_status_info.run_module()
@@ -128,12 +130,10 @@ def test_url_error(monkeypatch):
     }
     dummy = _patch_module(monkeypatch, params)
 
-    URLError = cpm_status_info.URLError
-
-    def fake_open_url(url, **kwargs):
+    def fake_request(self, method, url, body=None, headers=None):
         raise URLError("DNS failed")
 
-    monkeypatch.setattr(cpm_status_info, "open_url", fake_open_url)
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
 
     with pytest.raises(SystemExit):
         cpm_status_info.run_module()
@@ -153,12 +153,10 @@ def test_ssl_validation_error(monkeypatch):
     }
     dummy = _patch_module(monkeypatch, params)
 
-    SSLValidationError = cpm_status_info.SSLValidationError
-
-    def fake_open_url(url, **kwargs):
+    def fake_request(self, method, url, body=None, headers=None):
         raise SSLValidationError("bad cert")
 
-    monkeypatch.setattr(cpm_status_info, "open_url", fake_open_url)
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
 
     with pytest.raises(SystemExit):
         cpm_status_info.run_module()
@@ -178,12 +176,10 @@ def test_connection_error(monkeypatch):
     }
     dummy = _patch_module(monkeypatch, params)
 
-    ConnectionError = cpm_status_info.ConnectionError
-
-    def fake_open_url(url, **kwargs):
+    def fake_request(self, method, url, body=None, headers=None):
         raise ConnectionError("refused")
 
-    monkeypatch.setattr(cpm_status_info, "open_url", fake_open_url)
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
 
     with pytest.raises(SystemExit):
         cpm_status_info.run_module()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+from io import BytesIO
+
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+
+from ansible_collections.wti.remote.plugins.module_utils import wti_client
+from ansible_collections.wti.remote.plugins.module_utils.wti_runner import run_in_process
+from ansible_collections.wti.remote.plugins.modules import cpm_wait_for
+
+
+class DummyResponse(object):
+    def __init__(self, payload):
+        self._payload = payload
+
+    def read(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+
+ARGS = {"cpm_url": "device.example", "cpm_username": "u", "cpm_password": "secretpw"}
+
+
+def test_firmware_reached(monkeypatch):
+    replies = [wti_client.ConnectionError("refused"), {"status": {"code": "0"}, "config": {"firmware": "8.09"}}]
+
+    def fake_request(self, method, url, body=None, headers=None):
+        assert url == "https://device.example/api/v2/status/firmware"
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return DummyResponse(reply)
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_wait_for.run_module, dict(ARGS, firmware="8.09"))
+
+    assert "failed" not in result
+    assert result["attempts"] == 2
+    assert result["data"]["config"]["firmware"] == "8.09"
+
+
+def test_timeout_fails(monkeypatch):
+    def fake_request(self, method, url, body=None, headers=None):
+        raise wti_client.ConnectionError("refused")
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_wait_for.run_module, dict(ARGS, timeout=0))
+
+    assert result["failed"] is True
+    assert result["attempts"] == 1
+    assert result["msg"] == "Timeout waiting for https://device.example/api/v2/status/status to answer after 1 attempts : refused"
+
+
+def test_rejected_credentials_fail_at_once(monkeypatch):
+    polls = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        polls.append(url)
+        raise HTTPError(url, 401, "Unauthorized", {}, BytesIO(b""))
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_wait_for.run_module, dict(ARGS, timeout=300))
+
+    assert result["failed"] is True
+    assert len(polls) == 1
+    assert result["msg"].startswith("GET: Received HTTP error for https://device.example/api/v2/status/status : HTTP Error 401")
+
+
+def test_unparsable_firmware_fails_before_polling(monkeypatch):
+    polls = []
+
+    def fake_request(self, method, url, body=None, headers=None):
+        polls.append(url)
+        return DummyResponse({"status": {"code": "0"}, "config": {"firmware": "8.09"}})
+
+    monkeypatch.setattr(wti_client.WtiSession, "request", fake_request)
+
+    result = run_in_process(cpm_wait_for.run_module, dict(ARGS, firmware="latest"))
+
+    assert result["failed"] is True
+    assert polls == []
+    assert result["msg"] == "firmware must be a version number such as 8.09, got latest"